@@ -44,6 +44,7 @@ def setup_database():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             latitude REAL NOT NULL,
             longitude REAL NOT NULL,
+            cell_id INTEGER,
             weather_data TEXT NOT NULL,
             cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             expires_at TIMESTAMP NOT NULL
@@ -54,6 +55,7 @@ def setup_database():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_weather_reports_location ON weather_reports (latitude, longitude)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_weather_reports_created ON weather_reports (created_at)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_location ON weather_api_cache (latitude, longitude)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_weather_cache_cell ON weather_api_cache (cell_id)')
     
     conn.commit()
     conn.close()
@@ -1,15 +1,39 @@
 import requests
 import json
-import sqlite3
+import sys
 from datetime import datetime, timedelta
 import os
+from pathlib import Path
+
+# Share the search backend's SQLite connection manager
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from search.database import get_connection_manager
+from search.tiling import encode_cell
+
+# Geohash precision of the weather cache cells (6 = ~1.2 km x 0.6 km)
+WEATHER_CELL_PRECISION = 6
 
 class WeatherAPI:
     def __init__(self):
         # You'll need to get a free API key from OpenWeatherMap
         self.weather_api_key = os.getenv('OPENWEATHER_API_KEY', 'your_openweather_api_key_here')
         self.weather_base_url = "http://api.openweathermap.org/data/2.5"
+        self.db = get_connection_manager('data/moto_weather.db')
+        self._ensure_cell_column()
         
+    def _ensure_cell_column(self):
+        """Add the cell_id column to caches created before it existed"""
+        try:
+            conn = self.db.get_connection()
+            with conn:
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(weather_api_cache)')}
+                if columns and 'cell_id' not in columns:
+                    conn.execute('ALTER TABLE weather_api_cache ADD COLUMN cell_id INTEGER')
+                if columns:
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_weather_cache_cell ON weather_api_cache (cell_id)')
+        except Exception as e:
+            print(f"Error migrating weather cache: {e}")
+    
     def get_weather_data(self, lat, lon):
         """Get current weather and forecast data"""
         try:
@@ -83,20 +107,16 @@ class WeatherAPI:
         return rain_prob
     
     def _get_cached_weather(self, lat, lon):
-        """Get cached weather data if still valid"""
+        """Get cached weather data for the cell containing the point, if still valid"""
         try:
-            conn = sqlite3.connect('data/moto_weather.db')
-            cursor = conn.cursor()
+            conn = self.db.get_connection()
             
-            cursor.execute('''
+            result = conn.execute('''
                 SELECT weather_data FROM weather_api_cache 
-                WHERE latitude = ? AND longitude = ? 
+                WHERE cell_id = ? 
                 AND expires_at > CURRENT_TIMESTAMP
                 ORDER BY cached_at DESC LIMIT 1
-            ''', (lat, lon))
-            
-            result = cursor.fetchone()
-            conn.close()
+            ''', (encode_cell(lat, lon, WEATHER_CELL_PRECISION),)).fetchone()
             
             return result[0] if result else None
         except:
@@ -105,18 +125,15 @@ class WeatherAPI:
     def _cache_weather_data(self, lat, lon, weather_data):
         """Cache weather data for 10 minutes"""
         try:
-            conn = sqlite3.connect('data/moto_weather.db')
-            cursor = conn.cursor()
+            conn = self.db.get_connection()
             
             expires_at = datetime.now() + timedelta(minutes=10)
             
-            cursor.execute('''
-                INSERT INTO weather_api_cache (latitude, longitude, weather_data, expires_at)
-                VALUES (?, ?, ?, ?)
-            ''', (lat, lon, weather_data, expires_at))
-            
-            conn.commit()
-            conn.close()
+            with conn:
+                conn.execute('''
+                    INSERT INTO weather_api_cache (latitude, longitude, cell_id, weather_data, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (lat, lon, encode_cell(lat, lon, WEATHER_CELL_PRECISION), weather_data, expires_at))
         except Exception as e:
             print(f"Error caching weather data: {e}")
 
@@ -3,19 +3,52 @@ API REST para o sistema de busca
 """
 from fastapi import FastAPI, HTTPException, Query, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict, Any
 import asyncio
+import json
 from .search_engine import SearchEngine
 from .rate_limiter import RateLimiter
 from .config import SearchConfig
+from .database import close_all_connections
+from .janitor import CacheJanitor
+from .http_client import close_http_client, get_http_client
+from .health import CLOSED, HealthMonitor, get_health_registry
+from .poi_updater import POIUpdater
+from .models import BatchSearchRequest, CorridorSearchRequest
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da aplicação"""
+    # Pool HTTP compartilhado pelas chamadas a SerpAPI, Overpass e Nominatim
+    await get_http_client().start()
+    # Manutenção do cache em segundo plano
+    cache_janitor.start()
+    # Sondas de recuperação dos provedores com circuito aberto
+    health_monitor.start()
+    # Atualização incremental da base local de POIs
+    if poi_updater:
+        poi_updater.start()
+    yield
+    if poi_updater:
+        await poi_updater.stop()
+    await health_monitor.stop()
+    await cache_janitor.stop()
+    # Fechar o pool de conexões HTTP das APIs externas
+    await close_http_client()
+    # Fechar conexões SQLite persistentes
+    close_all_connections()
+
 
 # Inicializar aplicação FastAPI
 app = FastAPI(
     title="RotaLivre Search API",
     description="API de busca de lugares para motociclistas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -30,6 +63,11 @@ app.add_middleware(
 # Inicializar serviços
 search_engine = SearchEngine()
 rate_limiter = RateLimiter()
+cache_janitor = CacheJanitor(search_engine.cache)
+poi_updater = (POIUpdater(search_engine.poi_store, cache=search_engine.cache,
+                          nearest=search_engine.nearest)
+               if search_engine.poi_store and SearchConfig.POI_UPDATE_ENABLED else None)
+health_monitor = HealthMonitor(get_health_registry(), get_http_client())
 
 
 def get_client_id(request: Request) -> str:
@@ -51,16 +89,24 @@ async def root():
 
 @app.get("/search")
 async def search_places(
-    query: str = Query(..., description="Termo de busca"),
-    lat: float = Query(..., description="Latitude"),
-    lng: float = Query(..., description="Longitude"),
+    query: Optional[str] = Query(None, description="Termo de busca"),
+    lat: Optional[float] = Query(None, description="Latitude"),
+    lng: Optional[float] = Query(None, description="Longitude"),
     radius: int = Query(5, description="Raio de busca em km"),
     category: Optional[str] = Query(None, description="Categoria específica"),
     use_cache: bool = Query(True, description="Usar cache"),
+    budget_ms: Optional[int] = Query(
+        None, ge=0, le=60000,
+        description="Tempo máximo de espera pelos provedores (0 = esperar todos)"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor de uma resposta anterior (dispensa os demais parâmetros)"),
     request: Request = None
 ):
     """
     Busca lugares próximos
+
+    Sem cursor, query, lat e lng são obrigatórios. Com cursor, retorna a
+    página seguinte do conjunto de resultados guardado pela busca original.
     """
     client_id = get_client_id(request)
 
@@ -76,6 +122,23 @@ async def search_places(
             }
         )
 
+    # Páginas seguintes vêm do conjunto guardado, sem chamar as APIs
+    if cursor:
+        try:
+            result = search_engine.get_page(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            **result,
+            "rate_limit": {
+                "remaining": rate_check['remaining'],
+                "limit": rate_check['limit']
+            }
+        }
+    if query is None or lat is None or lng is None:
+        raise HTTPException(
+            status_code=400, detail="Informe query, lat e lng ou um cursor")
+
     try:
         # Validar parâmetros
         if not -90 <= lat <= 90:
@@ -95,9 +158,117 @@ async def search_places(
             lng=lng,
             radius=radius,
             category=category,
-            use_cache=use_cache
+            use_cache=use_cache,
+            budget_ms=budget_ms
+        )
+
+        return {
+            **result,
+            "rate_limit": {
+                "remaining": rate_check['remaining'],
+                "limit": rate_check['limit']
+            }
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+@app.get("/search/stream")
+async def search_places_stream(
+    query: str = Query(..., description="Termo de busca"),
+    lat: float = Query(..., description="Latitude"),
+    lng: float = Query(..., description="Longitude"),
+    radius: int = Query(5, description="Raio de busca em km"),
+    category: Optional[str] = Query(None, description="Categoria específica"),
+    use_cache: bool = Query(True, description="Usar cache"),
+    budget_ms: Optional[int] = Query(
+        None, ge=0, le=60000,
+        description="Tempo máximo de espera pelos provedores (0 = esperar todos)"),
+    request: Request = None
+):
+    """
+    Busca lugares próximos em streaming (NDJSON)
+
+    Cada linha é um quadro JSON: "cache" com o resultado do cache, um
+    "results" por provedor assim que ele responde (sem repetir lugares já
+    enviados), "error" para provedores que falharam e "done" com o resumo.
+    """
+    client_id = get_client_id(request)
+
+    # Verificar rate limiting
+    rate_check = rate_limiter.is_allowed(client_id, 'search')
+    if not rate_check['allowed']:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "retry_after": rate_check['retry_after'],
+                "limit": rate_check['limit']
+            }
+        )
+
+    # Validar parâmetros antes de abrir o stream
+    if not -90 <= lat <= 90:
+        raise HTTPException(status_code=400, detail="Latitude inválida")
+    if not -180 <= lng <= 180:
+        raise HTTPException(status_code=400, detail="Longitude inválida")
+    if radius > SearchConfig.MAX_RADIUS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Raio máximo permitido: {SearchConfig.MAX_RADIUS}km"
+        )
+
+    async def frames():
+        try:
+            async for frame in search_engine.stream_places(
+                    query=query, lat=lat, lng=lng, radius=radius,
+                    category=category, use_cache=use_cache, budget_ms=budget_ms):
+                yield json.dumps(frame, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Cabeçalhos já enviados: o erro vai como último quadro
+            yield json.dumps({"type": "error", "message": f"Erro interno: {str(e)}"},
+                             ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        frames(),
+        media_type="application/x-ndjson",
+        headers={
+            "X-RateLimit-Remaining": str(rate_check['remaining']),
+            "X-RateLimit-Limit": str(rate_check['limit']),
+            # Evita que proxies segurem os quadros até o fim
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@app.post("/search/batch")
+async def search_places_batch(body: BatchSearchRequest, request: Request = None):
+    """
+    Busca lugares para vários pontos numa única requisição
+
+    Conta como uma requisição no rate limiting. Acertos de cache saem de
+    uma única leitura; áreas sobrepostas sem cache são buscadas juntas.
+    """
+    client_id = get_client_id(request)
+
+    # Verificar rate limiting
+    rate_check = rate_limiter.is_allowed(client_id, 'search')
+    if not rate_check['allowed']:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "retry_after": rate_check['retry_after'],
+                "limit": rate_check['limit']
+            }
         )
 
+    try:
+        result = await search_engine.search_batch(
+            [item.model_dump() for item in body.items], use_cache=body.use_cache)
+
         return {
             **result,
             "rate_limit": {
@@ -110,6 +281,51 @@ async def search_places(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
+@app.post("/search/corridor")
+async def search_corridor(body: CorridorSearchRequest, request: Request = None):
+    """
+    Busca lugares ao longo de uma rota
+
+    Retorna os lugares a até buffer_km da polilinha, na ordem em que
+    aparecem no trajeto. Conta como uma requisição no rate limiting.
+    """
+    client_id = get_client_id(request)
+
+    # Verificar rate limiting
+    rate_check = rate_limiter.is_allowed(client_id, 'search')
+    if not rate_check['allowed']:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "retry_after": rate_check['retry_after'],
+                "limit": rate_check['limit']
+            }
+        )
+
+    try:
+        result = await search_engine.search_corridor(
+            query=body.query,
+            polyline=body.polyline,
+            buffer_km=body.buffer_km,
+            category=body.category or '',
+            use_cache=body.use_cache,
+            precision=body.precision
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+    return {
+        **result,
+        "rate_limit": {
+            "remaining": rate_check['remaining'],
+            "limit": rate_check['limit']
+        }
+    }
+
+
 @app.get("/search/category/{category}")
 async def search_by_category(
     category: str,
@@ -155,6 +371,55 @@ async def search_by_category(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
+@app.get("/nearest/{category}")
+async def nearest_places(
+    category: str,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude"),
+    k: int = Query(SearchConfig.NEAREST_DEFAULT_K, ge=1, le=SearchConfig.NEAREST_MAX_K,
+                   description="Número de lugares"),
+    request: Request = None
+):
+    """
+    Os k lugares mais próximos de uma categoria, a qualquer distância
+
+    Pensado para emergências (hospital, polícia): responde do índice em
+    memória, formado pela base local e pelos resultados já vistos, sem raio.
+    """
+    client_id = get_client_id(request)
+
+    # Verificar rate limiting
+    rate_check = rate_limiter.is_allowed(client_id, 'search')
+    if not rate_check['allowed']:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "retry_after": rate_check['retry_after'],
+                "limit": rate_check['limit']
+            }
+        )
+
+    try:
+        result = await search_engine.nearest_places(category, lat, lng, k)
+
+        if not result['success']:
+            raise HTTPException(status_code=400, detail=result['error'])
+
+        return {
+            **result,
+            "rate_limit": {
+                "remaining": rate_check['remaining'],
+                "limit": rate_check['limit']
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
 @app.get("/autocomplete")
 async def get_autocomplete(
     query: str = Query(..., description="Termo de busca"),
@@ -206,20 +471,30 @@ async def get_categories():
 
 
 @app.get("/stats")
-async def get_stats(request: Request = None):
+async def get_stats(
+    detailed: bool = Query(
+        False, description="Incluir contagens do backend (varre a tabela de cache)"),
+    request: Request = None
+):
     """
     Retorna estatísticas do sistema
     """
     client_id = get_client_id(request)
 
     try:
-        cache_stats = search_engine.get_cache_stats()
+        cache_stats = search_engine.get_cache_stats(detailed)
         client_stats = rate_limiter.get_client_stats(client_id)
 
         return {
             "success": True,
             "cache": cache_stats,
-            "client": client_stats
+            "client": client_stats,
+            "janitor": cache_janitor.get_stats(),
+            "http": get_http_client().get_stats(),
+            "poi_store": (search_engine.poi_store.get_stats()
+                          if search_engine.poi_store else None),
+            "poi_updater": poi_updater.get_stats() if poi_updater else None,
+            "nearest": search_engine.nearest.get_stats()
         }
 
     except Exception as e:
@@ -259,15 +534,28 @@ async def clear_cache(
 async def health_check():
     """
     Verificação de saúde da API
+
+    Os provedores externos aparecem com o estado do circuit breaker
+    (closed, open ou half_open); qualquer circuito fora de closed deixa o
+    status como "degraded".
     """
+    registry = get_health_registry()
+    breakers = registry.get_status()
+    if not SearchConfig.SERPAPI_KEY:
+        breakers['serpapi'] = 'disabled'
+
+    degraded = any(state not in (CLOSED, 'disabled') for state in breakers.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "timestamp": asyncio.get_event_loop().time(),
         "services": {
             "search_engine": "active",
             "rate_limiter": "active",
-            "cache": "active"
-        }
+            "cache": "active",
+            **breakers
+        },
+        "providers": registry.get_stats(),
+        "probes": health_monitor.get_stats()
     }
 
 if __name__ == "__main__":
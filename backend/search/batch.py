@@ -0,0 +1,71 @@
+"""
+Agrupamento de buscas em lote em áreas compartilhadas
+"""
+import math
+from typing import Any, Dict, List, Tuple
+from .config import SearchConfig
+from .geocoding import GeocodingService
+
+# Círculo de busca: (lat, lng, raio em km)
+Circle = Tuple[float, float, float]
+
+
+def _bounding_circle(circles: List[Circle]) -> Circle:
+    """Círculo centrado no centróide dos centros que contém todos os círculos"""
+    lat = sum(circle[0] for circle in circles) / len(circles)
+    lng = sum(circle[1] for circle in circles) / len(circles)
+    radius = max(
+        GeocodingService.calculate_distance(lat, lng, circle[0], circle[1]) + circle[2]
+        for circle in circles
+    )
+    # Arredondado para cima em 100 m: a distância calculada já vem arredondada
+    return lat, lng, math.ceil(radius * 10) / 10
+
+
+def cluster_circles(
+    circles: List[Circle],
+    max_radius: float = SearchConfig.MAX_RADIUS,
+    max_area_ratio: float = SearchConfig.BATCH_CLUSTER_AREA_RATIO
+) -> List[Dict[str, Any]]:
+    """
+    Agrupa círculos sobrepostos em círculos envolventes.
+
+    Um círculo entra no grupo que já tem um membro sobreposto a ele se o
+    círculo envolvente resultante não passar de max_radius e sua área não
+    passar de max_area_ratio vezes a soma das áreas dos membros (evita
+    buscar muita área que nenhum item pediu). Entre os grupos possíveis,
+    fica no que resulta no menor círculo. Retorna, por grupo,
+    {'lat', 'lng', 'radius', 'members'} com os índices dos círculos.
+    """
+    clusters: List[Dict[str, Any]] = []
+
+    for index, circle in enumerate(circles):
+        best = None
+        best_bounds = None
+        for cluster in clusters:
+            members = [circles[member] for member in cluster['members']]
+            overlaps = any(
+                GeocodingService.calculate_distance(
+                    circle[0], circle[1], member[0], member[1]) < circle[2] + member[2]
+                for member in members
+            )
+            if not overlaps:
+                continue
+
+            bounds = _bounding_circle(members + [circle])
+            area = math.pi * bounds[2] ** 2
+            members_area = sum(math.pi * member[2] ** 2 for member in members + [circle])
+            if bounds[2] > max_radius or area > max_area_ratio * members_area:
+                continue
+            if best_bounds is None or bounds[2] < best_bounds[2]:
+                best = cluster
+                best_bounds = bounds
+
+        if best is None:
+            clusters.append({'lat': circle[0], 'lng': circle[1],
+                             'radius': circle[2], 'members': [index]})
+        else:
+            best['members'].append(index)
+            best['lat'], best['lng'], best['radius'] = best_bounds
+
+    return clusters
@@ -1,156 +1,591 @@
 """
 Sistema de cache para otimizar buscas
 """
-import json
 import time
 import hashlib
-from typing import Any, Optional, Dict
-import sqlite3
-import os
+import heapq
+import threading
+from typing import Any, Optional, Dict, Iterable, List, Tuple
+from .config import SearchConfig
+from .cache_backends import CacheBackend, MemoryBackend, MemoryCache, create_cache_backend
+from .geocoding import GeocodingService
+from .metrics import CacheMetrics
+from .tiling import cell_ranges, cover_circles, encode_cell
+
+
+# Motivos de uma entrada negativa
+NEGATIVE_EMPTY = 'empty'
+NEGATIVE_ERROR = 'error'
+
+# Prefixo que separa entradas negativas das positivas no backend
+_NEGATIVE_PREFIX = 'neg:'
+
+# Prefixo dos conjuntos de resultados usados na paginação
+_RESULT_SET_PREFIX = 'rs:'
+
+
+def rank_key(place: Dict[str, Any]) -> tuple:
+    """Ordem dos resultados: distância, com o id desempatando (páginas estáveis)"""
+    return (place.get('distance', float('inf')), place.get('id', ''))
 
 
 class SearchCache:
     """Sistema de cache para resultados de busca"""
 
-    def __init__(self, db_path: str = 'data/moto_weather.db'):
+    def __init__(self, db_path: str = 'data/moto_weather.db',
+                 memory_cache: Optional[MemoryCache] = None,
+                 precision: int = SearchConfig.CACHE_GEOHASH_PRECISION,
+                 backend: Optional[CacheBackend] = None):
         self.db_path = db_path
-        self.init_cache_table()
-
-    def init_cache_table(self):
-        """Inicializa tabela de cache se não existir"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS search_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cache_key TEXT UNIQUE NOT NULL,
-                data TEXT NOT NULL,
-                category TEXT,
-                location TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_cache_key ON search_cache (cache_key)
-        ''')
-
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_cache_expires ON search_cache (expires_at)
-        ''')
-
-        conn.commit()
-        conn.close()
+        self.backend = backend if backend is not None else create_cache_backend(
+            db_path=db_path)
+        if memory_cache is None:
+            # Com backend em memória a camada LRU seria redundante
+            memory_cache = MemoryCache(
+                max_size=0 if isinstance(self.backend, MemoryBackend)
+                else SearchConfig.MEMORY_CACHE_SIZE)
+        self.memory = memory_cache
+        self.precision = precision
+        self.containment_hits = 0
+        self.stale_hits = 0
+        self.negative_hits = {NEGATIVE_EMPTY: 0, NEGATIVE_ERROR: 0}
+        self.negative_stores = {NEGATIVE_EMPTY: 0, NEGATIVE_ERROR: 0}
+        self.invalidated = 0
+        self.metrics = CacheMetrics()
+        self._pending_access: Dict[str, int] = {}
+        self._access_lock = threading.Lock()
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normaliza a query para que variações triviais compartilhem cache"""
+        return ' '.join((query or '').lower().split())
+
+    def _generate_cell_key(self, query: str, lat: float, lng: float, category: str = '') -> str:
+        """Gera chave da célula (query + categoria + id da célula), sem o raio"""
+        cell = encode_cell(lat, lng, self.precision)
+        key_string = f"{self._normalize_query(query)}:{cell}:{category or ''}"
+        return hashlib.md5(key_string.encode()).hexdigest()
 
     def _generate_key(self, query: str, lat: float, lng: float, radius: int, category: str = '') -> str:
-        """Gera chave única para o cache"""
-        key_string = f"{query}:{lat}:{lng}:{radius}:{category}"
-        return hashlib.md5(key_string.encode()).hexdigest()
+        """Gera chave única para o cache a partir da célula e do raio"""
+        cell_key = self._generate_cell_key(query, lat, lng, category)
+        return hashlib.md5(f"{cell_key}:{float(radius)}".encode()).hexdigest()
+
+    def get_key(self, query: str, lat: float, lng: float, radius: int, category: str = '') -> str:
+        """Retorna a chave normalizada usada para uma busca"""
+        return self._generate_key(query, lat, lng, radius, category)
+
+    @staticmethod
+    def localize(places: List[Dict[str, Any]], lat: float, lng: float,
+                  radius: float) -> List[Dict[str, Any]]:
+        """Primeira página dos lugares vistos do ponto consultado (top-k por heap)"""
+        return heapq.nsmallest(
+            SearchConfig.MAX_RESULTS,
+            SearchCache._within_radius(places, lat, lng, radius),
+            key=rank_key)
+
+    @staticmethod
+    def rank(places: List[Dict[str, Any]], lat: float, lng: float,
+             radius: float) -> List[Dict[str, Any]]:
+        """Todos os lugares vistos do ponto consultado, na ordem das páginas"""
+        return sorted(SearchCache._within_radius(places, lat, lng, radius), key=rank_key)
+
+    @staticmethod
+    def _within_radius(places: List[Dict[str, Any]], lat: float, lng: float,
+                       radius: float) -> List[Dict[str, Any]]:
+        """Recalcula distâncias a partir do ponto consultado e filtra pelo raio"""
+        distances = GeocodingService.calculate_place_distances(lat, lng, places)
+        return [{**place, 'distance': distance}
+                for place, distance in zip(places, distances) if distance <= radius]
+
+    @staticmethod
+    def _compute_coverage(data: List[Dict[str, Any]], radius: float,
+                          complete: bool = True) -> float:
+        """
+        Raio em torno do centro original no qual a entrada está completa.
+
+        Resultados truncados em MAX_RESULTS só garantem completude até a
+        distância do último lugar retornado. Sem complete (a fonte cortou a
+        resposta fora da ordem de distância), nenhum raio é garantido.
+        """
+        if not complete:
+            return 0.0
+        if len(data) < SearchConfig.MAX_RESULTS:
+            return float(radius)
+        distances = [place.get('distance', 0) for place in data]
+        return max(0.0, min(float(radius), max(distances) - 0.01))
 
     def get(self, query: str, lat: float, lng: float, radius: int, category: str = '') -> Optional[Dict[str, Any]]:
-        """Recupera dados do cache"""
+        """Recupera dados do cache, ignorando entradas velhas (stale)"""
+        cached = self.lookup(query, lat, lng, radius, category)
+        if cached is None or cached.get('negative') or cached['stale']:
+            return None
+        return cached['data']
+
+    def lookup(self, query: str, lat: float, lng: float, radius: int,
+               category: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Recupera dados do cache (memória primeiro, depois o backend).
+
+        Retorna {'data': [...], 'stale': bool}; stale indica que a entrada
+        passou do TTL suave mas ainda não do TTL rígido. Consultas na mesma
+        célula compartilham a entrada; se não houver entrada para o raio
+        pedido, uma entrada de raio maior da mesma célula que contenha o
+        círculo consultado é refiltrada por distância. Sem entrada positiva,
+        retorna {'negative': motivo} se houver entrada negativa, como
+        lookup_many; cada consulta registra um único resultado nas métricas.
+        """
+        started = time.perf_counter()
+        result = self._lookup(query, lat, lng, radius, category)
+
+        if result is not None:
+            outcome = 'stale' if result['stale'] else 'hit'
+        else:
+            reason = self._lookup_negative(query, lat, lng, radius, category)
+            outcome = 'negative' if reason else 'miss'
+            result = {'negative': reason} if reason else None
+        self.metrics.record_lookup(
+            category, radius, outcome, (time.perf_counter() - started) * 1000)
+        return result
+
+    def _lookup(self, query: str, lat: float, lng: float, radius: int,
+                category: str = '') -> Optional[Dict[str, Any]]:
+        """Consulta as camadas do cache sem registrar métricas"""
         cache_key = self._generate_key(query, lat, lng, radius, category)
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        record = self.memory.get(cache_key)
+        if record is None:
+            record = self._get_record(cache_key)
+        return self._resolve(cache_key, record, query, lat, lng, radius, category)
+
+    def _resolve(self, cache_key: str, record: Optional[Dict[str, Any]], query: str,
+                 lat: float, lng: float, radius: int,
+                 category: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Resultado da entrada exata (se houver) ou de uma entrada que contenha
+        o círculo. A entrada exata pode ter sido gravada a partir de outro
+        ponto da célula; se ela não garantir a página do ponto consultado,
+        é tratada como ausente.
+        """
+        data = None
+        if record is not None:
+            data = self._exact_page(record, lat, lng, radius)
+            if data is None:
+                record = None
+        if record is None:
+            cell_key = self._generate_cell_key(query, lat, lng, category)
+            record = self._get_containing(cell_key, lat, lng, radius)
+            if record is None:
+                return None
+
+            self.containment_hits += 1
+            self.memory.set(cache_key, record,
+                            max(int(record['expires_at'] - time.time()), 1),
+                            record['category'])
+            data = self.localize(record['data'], lat, lng, radius)
+
+        self._record_access(record['key'])
+
+        stale = record['fresh_until'] <= time.time()
+        if stale:
+            self.stale_hits += 1
+        return {
+            'data': data,
+            'stale': stale
+        }
 
-        cursor.execute('''
-            SELECT data FROM search_cache 
-            WHERE cache_key = ? AND expires_at > datetime('now')
-        ''', (cache_key,))
+    def _exact_page(self, record: Dict[str, Any], lat: float, lng: float,
+                    radius: float) -> Optional[List[Dict[str, Any]]]:
+        """
+        Primeira página da entrada exata vista do ponto consultado, ou None
+        se a entrada não a garante.
+
+        Vale se a cobertura contém o círculo, como na contenção, ou se a
+        página está cheia e nenhum lugar dela passa do alcance da busca
+        original: o lugar mais distante retornado, quando ela foi truncada.
+        Assim uma busca truncada ainda atende o próprio ponto. Entradas sem
+        cobertura (fonte truncada) só atendem o ponto original.
+        """
+        offset = GeocodingService.calculate_distance(lat, lng, record['lat'], record['lng'])
+        page = self.localize(record['data'], lat, lng, radius)
+        if offset + radius <= record['coverage']:
+            return page
+        if record['coverage'] <= 0:
+            return page if offset == 0 else None
+
+        reach = max([record['coverage']] +
+                    [place.get('distance', 0) for place in record['data']])
+        if len(page) >= SearchConfig.MAX_RESULTS and offset + page[-1]['distance'] <= reach:
+            return page
+        return None
 
-        result = cursor.fetchone()
-        conn.close()
+    def lookup_many(self, searches: Iterable[Tuple[str, float, float, int, str]]
+                    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Consulta várias buscas (query, lat, lng, radius, category) de uma vez.
+
+        As entradas exatas, positivas e negativas, que não estão em memória
+        são lidas do backend numa única consulta; só as buscas sem entrada
+        exata recorrem à busca por contenção. Para cada busca retorna o
+        mesmo que lookup, {'negative': motivo} se houver entrada negativa,
+        ou None.
+        """
+        started = time.perf_counter()
+        searches = list(searches)
+        keys = [self._generate_key(*search) for search in searches]
+
+        records: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for key in keys:
+            for candidate in (key, _NEGATIVE_PREFIX + key):
+                record = self.memory.get(candidate)
+                if record is not None:
+                    records[candidate] = record
+                elif candidate not in records:
+                    missing.append(candidate)
+
+        if missing:
+            try:
+                fetched = self.backend.get_many(set(missing))
+            except Exception as e:
+                print(f"Erro ao ler do cache: {e}")
+                fetched = {}
+            for key, record in fetched.items():
+                remaining = int(record['expires_at'] - time.time())
+                self.memory.set(key, record, max(remaining, 1), record['category'])
+                records[key] = record
+
+        elapsed_ms = (time.perf_counter() - started) * 1000 / max(len(searches), 1)
+        results = []
+        for key, (query, lat, lng, radius, category) in zip(keys, searches):
+            item_started = time.perf_counter()
+            result = self._resolve(
+                key, records.get(key), query, lat, lng, radius, category)
+            if result is not None:
+                outcome = 'stale' if result['stale'] else 'hit'
+            else:
+                reason = self._resolve_negative(
+                    records.get(_NEGATIVE_PREFIX + key), query, lat, lng, radius, category)
+                outcome = 'negative' if reason else 'miss'
+                result = {'negative': reason} if reason else None
+
+            self.metrics.record_lookup(
+                category, radius, outcome,
+                elapsed_ms + (time.perf_counter() - item_started) * 1000)
+            results.append(result)
+        return results
+
+    def _get_record(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Busca entrada exata no backend e popula o cache em memória"""
+        try:
+            record = self.backend.get(cache_key)
+        except Exception as e:
+            print(f"Erro ao ler do cache: {e}")
+            return None
+
+        if record is None:
+            return None
+
+        remaining = int(record['expires_at'] - time.time())
+        self.memory.set(cache_key, record, max(remaining, 1), record['category'])
+        return record
+
+    def _get_containing(self, cell_key: str, lat: float, lng: float,
+                        radius: float) -> Optional[Dict[str, Any]]:
+        """
+        Procura entrada de raio maior na mesma célula que contenha o círculo
+        e retorna um registro derivado para o ponto e raio consultados
+        """
+        try:
+            candidates = self.backend.find_containing(cell_key, radius)
+        except Exception as e:
+            print(f"Erro ao ler do cache: {e}")
+            return None
+
+        for record in candidates:
+            offset = GeocodingService.calculate_distance(
+                lat, lng, record['lat'], record['lng'])
+            if offset + radius <= record['coverage']:
+                data = record['data']
+                if isinstance(data, list):
+                    data = self.localize(data, lat, lng, radius)
+                return {
+                    **record,
+                    'data': data,
+                    'lat': lat,
+                    'lng': lng,
+                    'radius': float(radius),
+                    'coverage': float(radius)
+                }
 
-        if result:
-            return json.loads(result[0])
         return None
 
-    def set(self, query: str, lat: float, lng: float, radius: int,
-            data: Dict[str, Any], category: str = '', ttl: int = 3600) -> bool:
-        """Armazena dados no cache"""
-        cache_key = self._generate_key(query, lat, lng, radius, category)
-        expires_at = time.time() + ttl
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _build_record(self, query: str, lat: float, lng: float, radius: int,
+                      data: List[Dict[str, Any]], category: str, ttl: int,
+                      stale_ttl: int, complete: bool = True) -> Dict[str, Any]:
+        """Monta o registro armazenado no backend"""
+        fresh_until = time.time() + ttl
+        return {
+            'key': self._generate_key(query, lat, lng, radius, category),
+            'data': data,
+            'category': category or '',
+            'cell_key': self._generate_cell_key(query, lat, lng, category),
+            'cell_id': encode_cell(lat, lng, self.precision),
+            'lat': lat,
+            'lng': lng,
+            'radius': float(radius),
+            'coverage': self._compute_coverage(data, radius, complete),
+            'fresh_until': fresh_until,
+            'expires_at': fresh_until + stale_ttl
+        }
 
+    def set(self, query: str, lat: float, lng: float, radius: int,
+            data: Dict[str, Any], category: str = '', ttl: int = SearchConfig.CACHE_TTL,
+            stale_ttl: int = SearchConfig.CACHE_STALE_TTL, complete: bool = True) -> bool:
+        """
+        Armazena dados no cache.
+
+        A entrada é fresca por ttl segundos e pode ser servida como velha
+        (stale) por mais stale_ttl segundos enquanto é revalidada. Com
+        complete=False (resposta truncada pela fonte) ela não cobre raio
+        nenhum: fica fora da busca por contenção.
+        """
+        record = self._build_record(
+            query, lat, lng, radius, data, category, ttl, stale_ttl, complete)
+
+        started = time.perf_counter()
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO search_cache 
-                (cache_key, data, category, location, expires_at)
-                VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))
-            ''', (cache_key, json.dumps(data), category, f"{lat},{lng}", expires_at))
-
-            conn.commit()
+            self.backend.set(record)
+            self.memory.set(record['key'], record, ttl + stale_ttl, record['category'])
             return True
         except Exception as e:
             print(f"Erro ao salvar no cache: {e}")
             return False
         finally:
-            conn.close()
+            self.metrics.record_write((time.perf_counter() - started) * 1000)
+
+    def set_negative(self, query: str, lat: float, lng: float, radius: int,
+                     category: str = '', reason: str = NEGATIVE_EMPTY,
+                     ttl: Optional[int] = None) -> bool:
+        """
+        Armazena uma entrada negativa (busca sem resultado ou falha das APIs).
+
+        Entradas negativas usam chaves próprias, nunca são servidas como
+        velhas e expiram depois de um TTL curto que depende do motivo.
+        """
+        if ttl is None:
+            ttl = (SearchConfig.NEGATIVE_CACHE_ERROR_TTL if reason == NEGATIVE_ERROR
+                   else SearchConfig.NEGATIVE_CACHE_TTL)
+
+        record = self._build_record(
+            query, lat, lng, radius, [], category, ttl, 0)
+        record['key'] = _NEGATIVE_PREFIX + record['key']
+        record['cell_key'] = _NEGATIVE_PREFIX + record['cell_key']
+        record['data'] = {'negative': reason}
+
+        started = time.perf_counter()
+        try:
+            self.backend.set(record)
+            self.memory.set(record['key'], record, ttl, record['category'])
+            self.negative_stores[reason] = self.negative_stores.get(reason, 0) + 1
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar no cache: {e}")
+            return False
+        finally:
+            self.metrics.record_write((time.perf_counter() - started) * 1000)
+
+    def _lookup_negative(self, query: str, lat: float, lng: float, radius: int,
+                         category: str = '') -> Optional[str]:
+        """
+        Retorna o motivo da entrada negativa que cobre a busca, se houver.
+
+        Uma entrada negativa de raio maior na mesma célula também vale para
+        círculos contidos nela.
+        """
+        cache_key = _NEGATIVE_PREFIX + self._generate_key(
+            query, lat, lng, radius, category)
+
+        record = self.memory.get(cache_key)
+        if record is None:
+            record = self._get_record(cache_key)
+
+        return self._resolve_negative(record, query, lat, lng, radius, category)
+
+    def _resolve_negative(self, record: Optional[Dict[str, Any]], query: str,
+                          lat: float, lng: float, radius: int,
+                          category: str = '') -> Optional[str]:
+        """Motivo da entrada negativa exata ou de uma que contenha o círculo"""
+        if record is None:
+            cell_key = _NEGATIVE_PREFIX + self._generate_cell_key(
+                query, lat, lng, category)
+            record = self._get_containing(cell_key, lat, lng, radius)
+            if record is None:
+                return None
+
+        reason = record['data'].get('negative', NEGATIVE_EMPTY)
+        self.negative_hits[reason] = self.negative_hits.get(reason, 0) + 1
+        return reason
+
+    def set_result_set(self, rs_id: str, query: str, lat: float, lng: float,
+                       radius: int, places: List[Dict[str, Any]], category: str = '',
+                       ttl: int = SearchConfig.RESULT_SET_TTL) -> bool:
+        """
+        Guarda o conjunto completo de resultados de uma busca para paginação.
+
+        O conjunto é imutável e fica sob o próprio id; a chave da busca
+        aponta para o conjunto mais recente, para que respostas servidas do
+        cache também possam oferecer a próxima página.
+        """
+        snapshot = self._build_record(
+            query, lat, lng, radius, [], category, ttl, 0)
+        pointer = dict(snapshot)
+        snapshot.update(key=_RESULT_SET_PREFIX + rs_id,
+                        cell_key=_RESULT_SET_PREFIX + rs_id,
+                        data={'places': places})
+        pointer.update(key=_RESULT_SET_PREFIX + pointer['key'],
+                       cell_key=_RESULT_SET_PREFIX + rs_id,
+                       data={'result_set': rs_id})
+
+        started = time.perf_counter()
+        try:
+            self.backend.set_many([snapshot, pointer])
+            self.memory.set(snapshot['key'], snapshot, ttl, snapshot['category'])
+            self.memory.set(pointer['key'], pointer, ttl, pointer['category'])
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar no cache: {e}")
+            return False
+        finally:
+            self.metrics.record_write((time.perf_counter() - started) * 1000)
+
+    def get_result_set(self, rs_id: str) -> Optional[Dict[str, Any]]:
+        """Registro do conjunto de resultados (lugares em data['places'])"""
+        key = _RESULT_SET_PREFIX + rs_id
+        record = self.memory.get(key)
+        if record is None:
+            record = self._get_record(key)
+        return record
+
+    def get_result_set_id(self, query: str, lat: float, lng: float, radius: int,
+                          category: str = '') -> Optional[str]:
+        """Id do conjunto de resultados mais recente da busca, se houver"""
+        key = _RESULT_SET_PREFIX + self._generate_key(query, lat, lng, radius, category)
+        record = self.memory.get(key)
+        if record is None:
+            record = self._get_record(key)
+        return record['data']['result_set'] if record else None
+
+    def _record_access(self, cache_key: str):
+        """Registra acesso em memória; gravado no backend pelo janitor"""
+        with self._access_lock:
+            self._pending_access[cache_key] = self._pending_access.get(cache_key, 0) + 1
+
+    def flush_access_stats(self) -> int:
+        """Grava em lote os acessos pendentes (usados na remoção LRU/LFU)"""
+        with self._access_lock:
+            pending, self._pending_access = self._pending_access, {}
+        if pending:
+            self.backend.record_access(pending)
+        return len(pending)
+
+    def purge_expired(self, batch_size: int = SearchConfig.JANITOR_BATCH_SIZE) -> int:
+        """Remove um lote de entradas expiradas (transação curta)"""
+        return self.backend.purge_expired(batch_size)
+
+    def count_entries(self) -> int:
+        """Número de entradas no backend"""
+        return self.backend.count_entries()
+
+    def get_database_size(self) -> int:
+        """Bytes ocupados pelo backend"""
+        return self.backend.get_size_bytes()
+
+    def evict(self, count: int, policy: str = SearchConfig.CACHE_EVICTION_POLICY) -> int:
+        """Remove até count entradas menos usadas (lru) ou menos frequentes (lfu)"""
+        keys = self.backend.evict(count, policy)
+        for key in keys:
+            self.memory.delete(key)
+        return len(keys)
+
+    def incremental_vacuum(self, pages: int = SearchConfig.JANITOR_VACUUM_PAGES) -> int:
+        """Devolve páginas livres ao sistema de arquivos"""
+        return self.backend.incremental_vacuum(pages)
 
     def clear_expired(self) -> int:
         """Remove entradas expiradas do cache"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            DELETE FROM search_cache WHERE expires_at <= datetime('now')
-        ''')
-
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
-
-        return deleted_count
+        self.memory.clear_expired()
+        return self.backend.clear_expired()
 
     def clear_category(self, category: str) -> int:
         """Remove cache de uma categoria específica"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            DELETE FROM search_cache WHERE category = ?
-        ''', (category,))
-
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
-
-        return deleted_count
+        self.memory.clear_category(category)
+        return self.backend.clear_category(category)
+
+    def invalidate_points(self, points: Iterable[Tuple[float, float]],
+                          radius: float = SearchConfig.MAX_RADIUS) -> int:
+        """
+        Remove as entradas cujo círculo contém algum dos pontos (POIs
+        criados, alterados ou removidos).
+
+        As candidatas são as entradas das células que cobrem um círculo de
+        raio radius (o maior raio de busca) em torno de cada ponto,
+        consultadas como intervalos de cell_id; só as que contêm algum ponto
+        são removidas. Conjuntos de resultados da paginação são instantâneos
+        e ficam.
+        """
+        points = list(points)
+        if not points:
+            return 0
+
+        cells = cover_circles(((lat, lng, radius) for lat, lng in points),
+                              SearchConfig.CACHE_INVALIDATION_PRECISION)
+        ranges = cell_ranges(cells, self.precision)
+        lats = [point[0] for point in points]
+        lngs = [point[1] for point in points]
+
+        def affected(record: Any) -> bool:
+            if not isinstance(record, dict) or 'radius' not in record:
+                return False
+            if record['key'].startswith(_RESULT_SET_PREFIX):
+                return False
+            distances = GeocodingService.calculate_distances(
+                record['lat'], record['lng'], lats, lngs)
+            return min(distances) <= record['radius']
 
-    def get_stats(self) -> Dict[str, Any]:
-        """Retorna estatísticas do cache"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Total de entradas
-        cursor.execute('SELECT COUNT(*) FROM search_cache')
-        total_entries = cursor.fetchone()[0]
-
-        # Entradas por categoria
-        cursor.execute('''
-            SELECT category, COUNT(*) as count 
-            FROM search_cache 
-            GROUP BY category
-        ''')
-        category_stats = dict(cursor.fetchall())
+        try:
+            keys = [candidate['key'] for candidate in self.backend.find_in_cells(ranges)
+                    if affected(candidate)]
+            removed = self.backend.delete_many(keys) if keys else 0
+        except Exception as e:
+            print(f"Erro ao invalidar o cache: {e}")
+            return 0
 
-        # Entradas expiradas
-        cursor.execute('''
-            SELECT COUNT(*) FROM search_cache 
-            WHERE expires_at <= datetime('now')
-        ''')
-        expired_entries = cursor.fetchone()[0]
+        # Inclui registros derivados por contenção, que só existem em memória
+        self.memory.delete_where(affected)
+        self.invalidated += removed
+        return removed
 
-        conn.close()
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do cache.
 
+        Os contadores são mantidos em memória; detailed=True também consulta
+        o backend (contagens por categoria, que varrem a tabela no SQLite).
+        """
         return {
-            'total_entries': total_entries,
-            'category_stats': category_stats,
-            'expired_entries': expired_entries,
-            'active_entries': total_entries - expired_entries
+            **self.backend.get_stats(detailed),
+            'metrics': self.metrics.get_stats(),
+            'containment_hits': self.containment_hits,
+            'stale_hits': self.stale_hits,
+            'invalidated': self.invalidated,
+            'negative': {
+                'hits': dict(self.negative_hits),
+                'stores': dict(self.negative_stores)
+            },
+            'memory': self.memory.get_stats()
         }
+
+    def close(self):
+        """Libera recursos do backend"""
+        self.backend.close()
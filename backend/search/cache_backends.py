@@ -0,0 +1,884 @@
+"""
+Backends de armazenamento do cache de busca (SQLite, memória e Redis)
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+try:
+    import redis
+except ImportError:
+    redis = None
+from .config import SearchConfig
+from .database import get_connection_manager
+from .codec import PayloadCodec
+
+
+# Campos de metadados de um registro (além de 'key' e 'data')
+RECORD_FIELDS = ('category', 'cell_key', 'cell_id', 'lat', 'lng', 'radius', 'coverage',
+                 'fresh_until', 'expires_at')
+
+
+def _in_ranges(cell_id: Optional[int], ranges: List[Tuple[int, int]]) -> bool:
+    """Indica se o id da célula está em algum dos intervalos fechados"""
+    return cell_id is not None and any(low <= cell_id <= high for low, high in ranges)
+
+
+class MemoryCache:
+    """Cache LRU em memória com expiração por TTL"""
+
+    def __init__(self, max_size: int = SearchConfig.MEMORY_CACHE_SIZE,
+                 ttl: int = SearchConfig.MEMORY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Any, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Recupera valor se presente e não expirado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value, _ = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, category: str = ''):
+        """Armazena valor, removendo o menos usado se o limite for atingido"""
+        if self.max_size <= 0:
+            return
+
+        # O TTL da memória nunca ultrapassa o TTL da entrada persistida
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value, category)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Remove uma entrada"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear_expired(self) -> int:
+        """Remove entradas expiradas"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _, _) in self._entries.items()
+                       if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+            return len(expired)
+
+    def clear_category(self, category: str) -> int:
+        """Remove entradas de uma categoria específica"""
+        with self._lock:
+            keys = [key for key, (_, _, entry_category) in self._entries.items()
+                    if entry_category == category]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove as entradas cujo valor satisfaz o predicado"""
+        with self._lock:
+            keys = [key for key, (_, value, _) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache em memória"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class CacheBackend:
+    """
+    Interface dos backends do cache.
+
+    Um registro é um dicionário com 'key', 'data' e os campos de
+    RECORD_FIELDS; fresh_until e expires_at são timestamps Unix.
+    """
+
+    name = 'base'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Recupera um registro não expirado"""
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Recupera vários registros de uma vez"""
+        found = {}
+        for key in keys:
+            record = self.get(key)
+            if record is not None:
+                found[key] = record
+        return found
+
+    def set(self, record: Dict[str, Any]) -> bool:
+        """Armazena um registro até o seu expires_at"""
+        raise NotImplementedError
+
+    def set_many(self, records: List[Dict[str, Any]]) -> int:
+        """Armazena vários registros de uma vez"""
+        return sum(1 for record in records if self.set(record))
+
+    def delete(self, key: str) -> bool:
+        """Remove um registro"""
+        raise NotImplementedError
+
+    def find_containing(self, cell_key: str, radius: float) -> List[Dict[str, Any]]:
+        """Registros da célula com raio maior, frescos primeiro e depois por raio"""
+        raise NotImplementedError
+
+    def find_in_cells(self, ranges: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """
+        Centro e raio ({'key', 'lat', 'lng', 'radius'}) dos registros cujo
+        cell_id está em algum dos intervalos (usado na invalidação espacial)
+        """
+        raise NotImplementedError
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove vários registros"""
+        return sum(1 for key in keys if self.delete(key))
+
+    def clear_expired(self) -> int:
+        """Remove registros expirados"""
+        return 0
+
+    def clear_category(self, category: str) -> int:
+        """Remove registros de uma categoria"""
+        raise NotImplementedError
+
+    def record_access(self, counts: Dict[str, int]):
+        """Registra acessos agregados (usados na remoção LRU/LFU)"""
+
+    # Manutenção: só faz sentido em backends sem expiração nativa
+
+    def purge_expired(self, batch_size: int) -> int:
+        """Remove um lote de registros expirados"""
+        return 0
+
+    def count_entries(self) -> int:
+        """Número de registros armazenados"""
+        return 0
+
+    def get_size_bytes(self) -> int:
+        """Espaço ocupado pelo armazenamento"""
+        return 0
+
+    def evict(self, count: int, policy: str) -> List[str]:
+        """Remove até count registros segundo a política; retorna as chaves"""
+        return []
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """Devolve espaço livre ao sistema de arquivos"""
+        return 0
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        """Estatísticas do backend; detailed permite consultas mais caras"""
+        return {'backend': self.name}
+
+    def close(self):
+        """Libera recursos do backend"""
+
+    @staticmethod
+    def _sort_candidates(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ordena candidatos de contenção: frescos primeiro, depois menor raio"""
+        now = time.time()
+        return sorted(records, key=lambda r: (r['fresh_until'] <= now, r['radius']))
+
+
+class SQLiteBackend(CacheBackend):
+    """Backend padrão: tabela search_cache no SQLite"""
+
+    name = 'sqlite'
+
+    # Colunas adicionadas depois da criação original da tabela
+    EXTRA_COLUMNS = {
+        'cell_key': 'TEXT',
+        'cell_id': 'INTEGER',
+        'lat': 'REAL',
+        'lng': 'REAL',
+        'radius': 'REAL',
+        'coverage': 'REAL',
+        'fresh_until': 'TIMESTAMP',
+        'last_accessed': 'TIMESTAMP',
+        'hit_count': 'INTEGER DEFAULT 0'
+    }
+
+    # Ordem de remoção quando o cache excede o orçamento
+    EVICTION_ORDER = {
+        'lru': 'last_accessed ASC',
+        'lfu': 'hit_count ASC, last_accessed ASC'
+    }
+
+    SELECT_COLUMNS = '''
+        cache_key, data, category, location, cell_key, cell_id, lat, lng, radius, coverage,
+        strftime('%s', fresh_until), strftime('%s', expires_at)
+    '''
+
+    def __init__(self, db_path: str = 'data/moto_weather.db',
+                 codec: Optional[PayloadCodec] = None):
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+        self.codec = codec if codec is not None else PayloadCodec()
+        self.init_cache_table()
+
+    def init_cache_table(self):
+        """Inicializa tabela de cache se não existir"""
+        conn = self.db.get_connection()
+
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT UNIQUE NOT NULL,
+                    data BLOB NOT NULL,
+                    category TEXT,
+                    location TEXT,
+                    cell_key TEXT,
+                    cell_id INTEGER,
+                    lat REAL,
+                    lng REAL,
+                    radius REAL,
+                    coverage REAL,
+                    fresh_until TIMESTAMP,
+                    last_accessed TIMESTAMP,
+                    hit_count INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL
+                )
+            ''')
+
+            # Migrar tabelas criadas antes das colunas novas
+            existing = {row[1] for row in conn.execute(
+                'PRAGMA table_info(search_cache)')}
+            for column, column_type in self.EXTRA_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(
+                        f'ALTER TABLE search_cache ADD COLUMN {column} {column_type}')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cache_key ON search_cache (cache_key)
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cache_expires ON search_cache (expires_at)
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cache_cell ON search_cache (cell_key, radius)
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cache_cell_id ON search_cache (cell_id)
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cache_accessed ON search_cache (last_accessed)
+            ''')
+
+    def _build_record(self, cache_key: str, data: Any, category: Optional[str],
+                      location: Optional[str], cell_key: Optional[str],
+                      cell_id: Optional[int], lat: Optional[float], lng: Optional[float],
+                      radius: Optional[float], coverage: Optional[float],
+                      fresh_until: Optional[str], expires_at: str) -> Optional[Dict[str, Any]]:
+        """Monta o registro a partir de uma linha da tabela"""
+        try:
+            payload = self.codec.decode(data)
+        except Exception as e:
+            print(f"Erro ao decodificar entrada do cache: {e}")
+            return None
+
+        if lat is None:
+            # Linhas anteriores às colunas lat/lng guardam o centro em texto
+            lat, lng = (float(value) for value in location.split(','))
+        return {
+            'key': cache_key,
+            'data': payload,
+            'category': category or '',
+            'cell_key': cell_key,
+            'cell_id': cell_id,
+            'lat': lat,
+            'lng': lng,
+            'radius': radius or 0.0,
+            'coverage': coverage or 0.0,
+            # Linhas antigas não têm TTL suave: ficam frescas até expirar
+            'fresh_until': float(fresh_until or expires_at),
+            'expires_at': float(expires_at)
+        }
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self.db.get_connection()
+        row = conn.execute(f'''
+            SELECT {self.SELECT_COLUMNS}
+            FROM search_cache
+            WHERE cache_key = ? AND expires_at > datetime('now')
+        ''', (key,)).fetchone()
+
+        return self._build_record(*row) if row else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(keys)
+        found = {}
+        conn = self.db.get_connection()
+        # Limite de parâmetros do SQLite por consulta
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f'''
+                SELECT {self.SELECT_COLUMNS}
+                FROM search_cache
+                WHERE cache_key IN ({placeholders}) AND expires_at > datetime('now')
+            ''', chunk).fetchall()
+            for row in rows:
+                record = self._build_record(*row)
+                if record is not None:
+                    found[record['key']] = record
+        return found
+
+    def _row_values(self, record: Dict[str, Any]) -> tuple:
+        """Valores de INSERT para um registro"""
+        return (
+            record['key'], self.codec.encode(record['data']), record['category'],
+            record['cell_key'], record.get('cell_id'), record['lat'], record['lng'],
+            record['radius'], record['coverage'],
+            record['fresh_until'], record['expires_at']
+        )
+
+    INSERT_SQL = '''
+        INSERT OR REPLACE INTO search_cache
+        (cache_key, data, category, cell_key, cell_id, lat, lng, radius, coverage,
+         fresh_until, expires_at, last_accessed)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'), datetime(?, 'unixepoch'),
+                datetime('now'))
+    '''
+
+    def set(self, record: Dict[str, Any]) -> bool:
+        conn = self.db.get_connection()
+        with conn:
+            conn.execute(self.INSERT_SQL, self._row_values(record))
+        return True
+
+    def set_many(self, records: List[Dict[str, Any]]) -> int:
+        conn = self.db.get_connection()
+        with conn:
+            conn.executemany(self.INSERT_SQL,
+                             [self._row_values(record) for record in records])
+        return len(records)
+
+    def delete(self, key: str) -> bool:
+        conn = self.db.get_connection()
+        with conn:
+            cursor = conn.execute(
+                'DELETE FROM search_cache WHERE cache_key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def find_containing(self, cell_key: str, radius: float) -> List[Dict[str, Any]]:
+        conn = self.db.get_connection()
+        rows = conn.execute(f'''
+            SELECT {self.SELECT_COLUMNS}
+            FROM search_cache
+            WHERE cell_key = ? AND radius > ? AND expires_at > datetime('now')
+            ORDER BY fresh_until DESC, radius ASC
+        ''', (cell_key, float(radius))).fetchall()
+
+        records = [self._build_record(*row) for row in rows]
+        return self._sort_candidates([r for r in records if r is not None])
+
+    def find_in_cells(self, ranges: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        conn = self.db.get_connection()
+        found = []
+        for low, high in ranges:
+            rows = conn.execute('''
+                SELECT cache_key, lat, lng, radius
+                FROM search_cache
+                WHERE cell_id BETWEEN ? AND ? AND expires_at > datetime('now')
+            ''', (low, high)).fetchall()
+            found.extend({'key': key, 'lat': lat, 'lng': lng, 'radius': radius or 0.0}
+                         for key, lat, lng, radius in rows)
+        return found
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        conn = self.db.get_connection()
+        with conn:
+            cursor = conn.executemany(
+                'DELETE FROM search_cache WHERE cache_key = ?', [(key,) for key in keys])
+        return cursor.rowcount
+
+    def clear_expired(self) -> int:
+        conn = self.db.get_connection()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM search_cache WHERE expires_at <= datetime('now')
+            ''')
+
+        return cursor.rowcount
+
+    def clear_category(self, category: str) -> int:
+        conn = self.db.get_connection()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM search_cache WHERE category = ?
+            ''', (category,))
+
+        return cursor.rowcount
+
+    def record_access(self, counts: Dict[str, int]):
+        conn = self.db.get_connection()
+        with conn:
+            conn.executemany('''
+                UPDATE search_cache
+                SET hit_count = COALESCE(hit_count, 0) + ?, last_accessed = datetime('now')
+                WHERE cache_key = ?
+            ''', [(count, key) for key, count in counts.items()])
+
+    def purge_expired(self, batch_size: int) -> int:
+        conn = self.db.get_connection()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM search_cache WHERE id IN (
+                    SELECT id FROM search_cache
+                    WHERE expires_at <= datetime('now')
+                    LIMIT ?
+                )
+            ''', (batch_size,))
+
+        return cursor.rowcount
+
+    def count_entries(self) -> int:
+        conn = self.db.get_connection()
+        return conn.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0]
+
+    def get_size_bytes(self) -> int:
+        """Bytes ocupados pelo banco, sem contar páginas livres"""
+        conn = self.db.get_connection()
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def evict(self, count: int, policy: str) -> List[str]:
+        order = self.EVICTION_ORDER.get(policy, self.EVICTION_ORDER['lru'])
+        conn = self.db.get_connection()
+        with conn:
+            keys = [row[0] for row in conn.execute(f'''
+                SELECT cache_key FROM search_cache
+                ORDER BY {order}
+                LIMIT ?
+            ''', (count,))]
+            conn.executemany(
+                'DELETE FROM search_cache WHERE cache_key = ?',
+                [(key,) for key in keys])
+
+        return keys
+
+    def incremental_vacuum(self, pages: int) -> int:
+        conn = self.db.get_connection()
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            return 0
+
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return before - after
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        stats = {'backend': self.name, 'size_bytes': self.get_size_bytes()}
+        if not detailed:
+            return stats
+
+        conn = self.db.get_connection()
+
+        # Total de entradas
+        total_entries = conn.execute(
+            'SELECT COUNT(*) FROM search_cache').fetchone()[0]
+
+        # Entradas por categoria
+        category_stats = dict(conn.execute('''
+            SELECT category, COUNT(*) as count
+            FROM search_cache
+            GROUP BY category
+        ''').fetchall())
+
+        # Entradas expiradas
+        expired_entries = conn.execute('''
+            SELECT COUNT(*) FROM search_cache
+            WHERE expires_at <= datetime('now')
+        ''').fetchone()[0]
+
+        return {
+            **stats,
+            'total_entries': total_entries,
+            'category_stats': category_stats,
+            'expired_entries': expired_entries,
+            'active_entries': total_entries - expired_entries
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """Backend em memória do processo, limitado por LRU"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = SearchConfig.CACHE_MAX_ENTRIES):
+        # TTL máximo: a expiração real vem de expires_at de cada registro
+        self.store = MemoryCache(max_size=max_entries, ttl=2 ** 31)
+        self._cells: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(key)
+
+    def set(self, record: Dict[str, Any]) -> bool:
+        ttl = record['expires_at'] - time.time()
+        if ttl <= 0:
+            return False
+        self.store.set(record['key'], record, ttl, record['category'])
+        with self._lock:
+            self._cells.setdefault(record['cell_key'], set()).add(record['key'])
+        return True
+
+    def delete(self, key: str) -> bool:
+        return self.store.delete(key)
+
+    def find_containing(self, cell_key: str, radius: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = list(self._cells.get(cell_key, ()))
+
+        records = []
+        for key in keys:
+            record = self.store.get(key)
+            if record is None:
+                # Chave removida ou expirada: limpar o índice da célula
+                with self._lock:
+                    self._cells.get(cell_key, set()).discard(key)
+            elif record['radius'] > radius:
+                records.append(record)
+        return self._sort_candidates(records)
+
+    def find_in_cells(self, ranges: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self.store._lock:
+            records = [record for expires_at, record, _ in self.store._entries.values()
+                       if expires_at > now]
+        return [{'key': record['key'], 'lat': record['lat'], 'lng': record['lng'],
+                 'radius': record['radius']}
+                for record in records if _in_ranges(record.get('cell_id'), ranges)]
+
+    def clear_expired(self) -> int:
+        return self.store.clear_expired()
+
+    def clear_category(self, category: str) -> int:
+        return self.store.clear_category(category)
+
+    def count_entries(self) -> int:
+        return len(self.store._entries)
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        return {
+            'backend': self.name,
+            'total_entries': self.count_entries(),
+            **self.store.get_stats()
+        }
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend compartilhado entre réplicas da API.
+
+    Cada registro é um hash com expiração nativa do Redis; um sorted set
+    por célula (score = raio), um set por categoria e um sorted set global
+    com score = cell_id servem de índices. Os índices globais não expiram:
+    um segundo sorted set com score = expires_at permite ao janitor tirar
+    deles os registros já expirados (purge_expired).
+    """
+
+    name = 'redis'
+
+    def __init__(self, client: Any = None, url: str = SearchConfig.REDIS_URL,
+                 prefix: str = SearchConfig.CACHE_PREFIX,
+                 codec: Optional[PayloadCodec] = None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("Pacote redis não instalado")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.codec = codec if codec is not None else PayloadCodec()
+        # Contadores do processo: contar as chaves exige varrer o banco
+        self.writes = 0
+        self.deletes = 0
+        self.purged = 0
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}entry:{key}"
+
+    def _cell_key(self, cell_key: str) -> str:
+        return f"{self.prefix}cell:{cell_key}"
+
+    def _category_key(self, category: str) -> str:
+        return f"{self.prefix}category:{category}"
+
+    def _cells_index_key(self) -> str:
+        return f"{self.prefix}cells"
+
+    def _expiry_index_key(self) -> str:
+        return f"{self.prefix}expiry"
+
+    def _decode(self, key: str, fields: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        """Converte o hash do Redis em registro"""
+        if not fields:
+            return None
+        fields = {(k.decode() if isinstance(k, bytes) else k): v
+                  for k, v in fields.items()}
+        try:
+            meta = json.loads(fields['meta'])
+            data = self.codec.decode(fields['data'])
+        except Exception as e:
+            print(f"Erro ao decodificar entrada do cache: {e}")
+            return None
+        return {'key': key, 'data': data, **meta}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._decode(key, self.client.hgetall(self._entry_key(key)))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(keys)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(self._entry_key(key))
+
+        found = {}
+        for key, fields in zip(keys, pipe.execute()):
+            record = self._decode(key, fields)
+            if record is not None:
+                found[key] = record
+        return found
+
+    def _queue_set(self, pipe: Any, record: Dict[str, Any]) -> bool:
+        """Enfileira a gravação de um registro e de seus índices"""
+        ttl = int(record['expires_at'] - time.time())
+        if ttl <= 0:
+            return False
+
+        entry_key = self._entry_key(record['key'])
+        meta = {field: record[field] for field in RECORD_FIELDS}
+        pipe.hset(entry_key, mapping={
+            'data': self.codec.encode(record['data']),
+            'meta': json.dumps(meta)
+        })
+        pipe.expire(entry_key, ttl)
+
+        cell_key = self._cell_key(record['cell_key'])
+        pipe.zadd(cell_key, {record['key']: record['radius']})
+        self._queue_extend(pipe, cell_key, ttl)
+
+        category_key = self._category_key(record['category'])
+        pipe.sadd(category_key, record['key'])
+        self._queue_extend(pipe, category_key, ttl)
+
+        if record.get('cell_id') is not None:
+            # Ids de célula até a precisão 10 são exatos no score (double)
+            pipe.zadd(self._cells_index_key(), {record['key']: record['cell_id']})
+            pipe.zadd(self._expiry_index_key(), {record['key']: record['expires_at']})
+        return True
+
+    @staticmethod
+    def _queue_extend(pipe: Any, index_key: str, ttl: int):
+        """
+        Enfileira a expiração de um índice compartilhado sem nunca reduzi-la:
+        uma entrada curta (negativa, parcial) não pode fazer o índice
+        expirar antes das entradas longas que ele lista (Redis 7+)
+        """
+        pipe.expire(index_key, ttl, nx=True)
+        pipe.expire(index_key, ttl, gt=True)
+
+    def set(self, record: Dict[str, Any]) -> bool:
+        pipe = self.client.pipeline(transaction=False)
+        stored = self._queue_set(pipe, record)
+        pipe.execute()
+        self.writes += int(stored)
+        return stored
+
+    def set_many(self, records: List[Dict[str, Any]]) -> int:
+        pipe = self.client.pipeline(transaction=False)
+        stored = sum(1 for record in records if self._queue_set(pipe, record))
+        pipe.execute()
+        self.writes += stored
+        return stored
+
+    def _remove(self, keys: List[str]) -> int:
+        """Remove registros e seus membros nos índices de célula e categoria"""
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(self._entry_key(key), 'meta')
+        metas = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, raw in zip(keys, metas):
+            pipe.delete(self._entry_key(key))
+            pipe.zrem(self._cells_index_key(), key)
+            pipe.zrem(self._expiry_index_key(), key)
+            if raw is None:
+                continue
+            try:
+                meta = json.loads(raw)
+            except ValueError:
+                continue
+            pipe.zrem(self._cell_key(meta['cell_key']), key)
+            pipe.srem(self._category_key(meta['category']), key)
+        results = pipe.execute()
+
+        # Um DELETE por chave, na ordem em que foram enfileirados
+        deleted = 0
+        position = 0
+        for raw in metas:
+            deleted += results[position]
+            position += 3 if raw is None else 5
+        self.deletes += deleted
+        return deleted
+
+    def delete(self, key: str) -> bool:
+        return bool(self._remove([key]))
+
+    def find_containing(self, cell_key: str, radius: float) -> List[Dict[str, Any]]:
+        index_key = self._cell_key(cell_key)
+        members = self.client.zrangebyscore(index_key, f"({float(radius)}", '+inf')
+        keys = [m.decode() if isinstance(m, bytes) else m for m in members]
+        if not keys:
+            return []
+
+        found = self.get_many(keys)
+        # Registros expirados somem sozinhos; o índice é limpo sob demanda
+        missing = [key for key in keys if key not in found]
+        if missing:
+            self.client.zrem(index_key, *missing)
+        return self._sort_candidates(list(found.values()))
+
+    def find_in_cells(self, ranges: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        index_key = self._cells_index_key()
+        pipe = self.client.pipeline(transaction=False)
+        for low, high in ranges:
+            pipe.zrangebyscore(index_key, low, high)
+        keys = {m.decode() if isinstance(m, bytes) else m
+                for members in pipe.execute() for m in members}
+        if not keys:
+            return []
+
+        found = self.get_many(keys)
+        # O índice global não expira: membros expirados saem sob demanda
+        missing = [key for key in keys if key not in found]
+        if missing:
+            self.client.zrem(index_key, *missing)
+        return [{'key': key, 'lat': record['lat'], 'lng': record['lng'],
+                 'radius': record['radius']}
+                for key, record in found.items() if _in_ranges(record.get('cell_id'), ranges)]
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        return self._remove(keys)
+
+    def clear_category(self, category: str) -> int:
+        category_key = self._category_key(category)
+        members = self.client.smembers(category_key)
+        keys = [m.decode() if isinstance(m, bytes) else m for m in members]
+
+        deleted = self._remove(keys) if keys else 0
+        self.client.delete(category_key)
+        return deleted
+
+    def purge_expired(self, batch_size: int) -> int:
+        """
+        Tira dos índices globais um lote de registros expirados (os hashes
+        já expiraram sozinhos; os índices de célula e categoria têm TTL)
+        """
+        members = self.client.zrangebyscore(
+            self._expiry_index_key(), '-inf', time.time(), start=0, num=batch_size)
+        keys = [m.decode() if isinstance(m, bytes) else m for m in members]
+        if not keys:
+            return 0
+
+        # Regravado depois da leitura: o registro continua e fica indexado
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.exists(self._entry_key(key))
+        expired = [key for key, alive in zip(keys, pipe.execute()) if not alive]
+        if expired:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zrem(self._cells_index_key(), *expired)
+            pipe.zrem(self._expiry_index_key(), *expired)
+            pipe.execute()
+        self.purged += len(expired)
+        return len(expired)
+
+    def count_entries(self) -> int:
+        # Só as chaves de registro: os índices dividem o mesmo banco
+        return sum(1 for _ in self.client.scan_iter(
+            match=f"{self.prefix}entry:*", count=1000))
+
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
+        stats = {
+            'backend': self.name,
+            'writes': self.writes,
+            'deletes': self.deletes,
+            'purged': self.purged
+        }
+        try:
+            stats['used_memory'] = self.client.info('memory').get('used_memory')
+        except Exception as e:
+            print(f"Erro ao obter estatísticas do Redis: {e}")
+        if detailed:
+            # SCAN de todas as chaves de registro: só sob demanda
+            stats['total_keys'] = self.count_entries()
+        return stats
+
+    def close(self):
+        self.client.close()
+
+
+def create_cache_backend(name: str = SearchConfig.CACHE_BACKEND,
+                         db_path: str = 'data/moto_weather.db') -> CacheBackend:
+    """Cria o backend configurado em SearchConfig.CACHE_BACKEND"""
+    if name == 'redis':
+        return RedisBackend()
+    if name == 'memory':
+        return MemoryBackend()
+    return SQLiteBackend(db_path)
@@ -0,0 +1,168 @@
+"""
+Codificação compacta dos resultados armazenados no cache
+"""
+import json
+import zlib
+from typing import Any, Dict, List, Union
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+from .config import SearchConfig
+
+
+# Cabeçalho de 3 bytes: versão do formato, serializador e compressão
+FORMAT_VERSION = 1
+
+SERIALIZER_JSON = 0
+SERIALIZER_MSGPACK = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# Marcador de lista de dicionários empacotada em colunas
+_PACKED_MARKER = '__packed__'
+
+
+class PayloadCodec:
+    """Serializa payloads do cache em binário compacto com compressão opcional"""
+
+    SERIALIZERS = {'json': SERIALIZER_JSON, 'msgpack': SERIALIZER_MSGPACK}
+    COMPRESSIONS = {'none': COMPRESSION_NONE, 'zlib': COMPRESSION_ZLIB,
+                    'zstd': COMPRESSION_ZSTD}
+
+    def __init__(
+        self,
+        serializer: str = SearchConfig.CACHE_CODEC_SERIALIZER,
+        compression: str = SearchConfig.CACHE_CODEC_COMPRESSION,
+        level: int = SearchConfig.CACHE_COMPRESSION_LEVEL,
+        min_compress_size: int = SearchConfig.CACHE_COMPRESS_MIN_BYTES
+    ):
+        if serializer == 'auto':
+            serializer = 'msgpack' if msgpack else 'json'
+        if compression == 'auto':
+            compression = 'zstd' if zstandard else 'zlib'
+        if serializer == 'msgpack' and not msgpack:
+            print("msgpack não disponível, usando JSON")
+            serializer = 'json'
+        if compression == 'zstd' and not zstandard:
+            print("zstandard não disponível, usando zlib")
+            compression = 'zlib'
+
+        self.serializer = self.SERIALIZERS[serializer]
+        self.compression = self.COMPRESSIONS[compression]
+        self.level = level
+        self.min_compress_size = min_compress_size
+
+    def encode(self, data: Any) -> bytes:
+        """Codifica o payload com cabeçalho de versão"""
+        body = self._serialize(self._pack(data))
+
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(body) >= self.min_compress_size:
+            compression = self.compression
+            body = self._compress(body, compression)
+
+        return bytes((FORMAT_VERSION, self.serializer, compression)) + body
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        """Decodifica um payload, aceitando linhas antigas em JSON texto"""
+        if isinstance(raw, str):
+            return json.loads(raw)
+
+        raw = bytes(raw)
+        if raw[:1] in (b'[', b'{'):
+            return json.loads(raw)
+        if len(raw) < 3 or raw[0] != FORMAT_VERSION:
+            raise ValueError(f"Versão de payload desconhecida: {raw[:1]!r}")
+
+        serializer, compression = raw[1], raw[2]
+        body = self._decompress(raw[3:], compression)
+        return self._unpack(self._deserialize(body, serializer))
+
+    @staticmethod
+    def _pack(data: Any) -> Any:
+        """
+        Converte listas de dicionários em colunas (chaves uma única vez),
+        evitando repetir 'coordinates', 'source', 'opening_hours' em cada linha
+        """
+        if not isinstance(data, list) or not data or \
+                not all(isinstance(item, dict) for item in data):
+            return data
+
+        keys: List[str] = []
+        index: Dict[str, int] = {}
+        for item in data:
+            for key in item:
+                if key not in index:
+                    index[key] = len(keys)
+                    keys.append(key)
+
+        missing = object()
+        rows = []
+        absent = []
+        for position, item in enumerate(data):
+            row = [item.get(key, missing) for key in keys]
+            # Chaves ausentes viram None e têm a posição registrada à parte
+            missing_keys = [i for i, value in enumerate(row) if value is missing]
+            if missing_keys:
+                absent.append([position, missing_keys])
+                for i in missing_keys:
+                    row[i] = None
+            rows.append(row)
+
+        return {_PACKED_MARKER: 1, 'k': keys, 'r': rows, 'a': absent}
+
+    @staticmethod
+    def _unpack(data: Any) -> Any:
+        """Reconstrói a lista de dicionários empacotada"""
+        if not isinstance(data, dict) or _PACKED_MARKER not in data:
+            return data
+
+        keys = data['k']
+        items = [dict(zip(keys, row)) for row in data['r']]
+        for position, missing_keys in data.get('a', []):
+            for i in missing_keys:
+                del items[position][keys[i]]
+        return items
+
+    def _serialize(self, data: Any) -> bytes:
+        """Serializa com msgpack ou JSON compacto"""
+        if self.serializer == SERIALIZER_MSGPACK:
+            return msgpack.packb(data, use_bin_type=True)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def _deserialize(body: bytes, serializer: int) -> Any:
+        """Desserializa de acordo com o byte do cabeçalho"""
+        if serializer == SERIALIZER_MSGPACK:
+            if not msgpack:
+                raise ValueError("Payload em msgpack, mas msgpack não está instalado")
+            return msgpack.unpackb(body, raw=False)
+        if serializer == SERIALIZER_JSON:
+            return json.loads(body)
+        raise ValueError(f"Serializador desconhecido: {serializer}")
+
+    def _compress(self, body: bytes, compression: int) -> bytes:
+        """Comprime o corpo do payload"""
+        if compression == COMPRESSION_ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(body)
+        return zlib.compress(body, min(self.level, 9))
+
+    @staticmethod
+    def _decompress(body: bytes, compression: int) -> bytes:
+        """Descomprime de acordo com o byte do cabeçalho"""
+        if compression == COMPRESSION_NONE:
+            return body
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(body)
+        if compression == COMPRESSION_ZSTD:
+            if not zstandard:
+                raise ValueError("Payload em zstd, mas zstandard não está instalado")
+            return zstandard.ZstdDecompressor().decompress(body)
+        raise ValueError(f"Compressão desconhecida: {compression}")
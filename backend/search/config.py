@@ -12,54 +12,164 @@ class SearchConfig:
     SERPAPI_KEY = os.getenv('SERPAPI_KEY', '')
     GOOGLE_MAPS_KEY = os.getenv('GOOGLE_MAPS_KEY', '')
     OPENSTREETMAP_URL = 'https://overpass-api.de/api/interpreter'
+    NOMINATIM_URL = 'https://nominatim.openstreetmap.org'
+    SERPAPI_URL = 'https://serpapi.com/search.json'
+    OVERPASS_STATUS_URL = 'https://overpass-api.de/api/status'
+    SERPAPI_ACCOUNT_URL = 'https://serpapi.com/account.json'
+    HTTP_USER_AGENT = 'RotaLivre-Search/1.0'
+
+    # Pool de conexões HTTP compartilhado (uma sessão por worker)
+    HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+    HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '20'))
+    HTTP_KEEPALIVE_TIMEOUT = 30  # segundos com a conexão ociosa aberta
+    HTTP_DNS_CACHE_TTL = 300  # segundos
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '30'))  # total por requisição
 
     # Configurações de cache
-    CACHE_TTL = 3600  # 1 hora em segundos
+    CACHE_TTL = 3600  # 1 hora em segundos (TTL suave)
+    CACHE_STALE_TTL = 86400  # servir dados velhos por mais 24 horas enquanto revalida
     CACHE_PREFIX = 'search:'
 
+    # Cache negativo: buscas sem resultado e falhas das APIs externas
+    NEGATIVE_CACHE_TTL = 900  # 15 minutos para buscas sem resultado
+    NEGATIVE_CACHE_ERROR_TTL = 60  # 1 minuto após falha das APIs
+
+    # Backend do cache: 'sqlite', 'memory' ou 'redis'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    # Cache em memória (LRU) na frente da tabela search_cache
+    MEMORY_CACHE_SIZE = 512  # entradas
+    MEMORY_CACHE_TTL = 300  # 5 minutos em segundos
+
+    # Codificação dos payloads do cache ('auto' usa msgpack/zstd se instalados)
+    CACHE_CODEC_SERIALIZER = 'auto'  # 'auto', 'msgpack' ou 'json'
+    CACHE_CODEC_COMPRESSION = 'auto'  # 'auto', 'zstd', 'zlib' ou 'none'
+    CACHE_COMPRESSION_LEVEL = 3
+    CACHE_COMPRESS_MIN_BYTES = 256
+
+    # Manutenção do cache (janitor em segundo plano)
+    JANITOR_INTERVAL = 300  # segundos entre execuções
+    JANITOR_BATCH_SIZE = 500  # linhas por transação
+    JANITOR_VACUUM_PAGES = 1000  # páginas devolvidas por execução
+    CACHE_MAX_ENTRIES = 50000
+    CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+    CACHE_EVICTION_POLICY = 'lru'  # 'lru' ou 'lfu'
+
+    # Instrumentação do cache (limites dos baldes)
+    METRICS_LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+    METRICS_RADIUS_BUCKETS = (1, 3, 5, 10, 25, 50)  # km
+
+    # Precisão do geohash usado nas chaves de cache (7 = células de ~150 m)
+    CACHE_GEOHASH_PRECISION = 7
+    # Precisão das células percorridas na invalidação espacial (4 = ~39 x 20 km)
+    CACHE_INVALIDATION_PRECISION = 4
+
+    # Base local de POIs importada de extratos OSM (Overpass vira fallback)
+    POI_STORE_ENABLED = os.getenv('POI_STORE_ENABLED', 'true').lower() == 'true'
+    POI_STORE_PATH = os.getenv('POI_STORE_PATH', 'data/poi_store.db')
+    POI_IMPORT_BATCH_SIZE = 5000  # elementos por transação na importação
+    POI_UPDATE_ENABLED = os.getenv('POI_UPDATE_ENABLED', 'true').lower() == 'true'
+    POI_UPDATE_INTERVAL = int(os.getenv('POI_UPDATE_INTERVAL', '300'))  # segundos
+
+    # Vizinhos mais próximos (/nearest): k padrão e máximo, inserções no
+    # buffer linear e fração de entradas obsoletas antes de reconstruir a árvore
+    NEAREST_DEFAULT_K = 5
+    NEAREST_MAX_K = 50
+    NEAREST_BUFFER_SIZE = 256
+    NEAREST_STALE_RATIO = 0.25
+    # Lugares vindos de buscas (fora da base local) por categoria e por
+    # quanto tempo ficam no índice: o mesmo prazo das entradas do cache
+    NEAREST_SEARCH_MAX_PLACES = int(os.getenv('NEAREST_SEARCH_MAX_PLACES', '5000'))
+    NEAREST_SEARCH_TTL = CACHE_TTL + CACHE_STALE_TTL
+
     # Configurações de rate limiting
     RATE_LIMIT_PER_MINUTE = 60
     RATE_LIMIT_PER_HOUR = 1000
 
+    # Overpass: limite de elementos por resposta e timeout do servidor
+    OVERPASS_RESULT_LIMIT = int(os.getenv('OVERPASS_RESULT_LIMIT', '200'))
+    OVERPASS_TIMEOUT = 25  # segundos
+
     # Configurações de busca
     DEFAULT_RADIUS = 5  # km
     MAX_RADIUS = 50  # km
     MAX_RESULTS = 20
 
+    # Fusão de duplicados entre provedores (mesmo lugar no OSM e na SerpAPI)
+    MERGE_DISTANCE_M = 75  # metros entre os dois registros
+    MERGE_NAME_SIMILARITY = 0.7  # semelhança mínima dos nomes normalizados
+
+    # Paginação: conjunto completo de resultados guardado para as próximas páginas
+    RESULT_SET_TTL = 600  # segundos de validade dos cursores
+    RESULT_SET_MAX = 200  # lugares guardados por busca
+
+    # Busca em lote: quanto a área agrupada pode exceder a soma das áreas
+    # dos itens que ela atende
+    BATCH_CLUSTER_AREA_RATIO = 1.5
+    # Lugares pedidos por área de lote (a área cobre vários itens)
+    BATCH_AREA_MAX_PLACES = 2000
+
+    # Busca ao longo de rota: número máximo de círculos e de lugares retornados
+    CORRIDOR_MAX_TILES = 500
+    CORRIDOR_MAX_RESULTS = 200
+
+    # Orçamento de latência da busca: provedores mais lentos ficam de fora
+    # da resposta, mas continuam rodando para aquecer o cache
+    SEARCH_LATENCY_BUDGET_MS = int(os.getenv('SEARCH_LATENCY_BUDGET_MS', '3000'))
+    PARTIAL_CACHE_TTL = 60  # segundos para respostas parciais
+
+    # Circuit breakers dos provedores: abre com BREAKER_ERROR_RATE de falhas
+    # nas últimas BREAKER_WINDOW chamadas e tenta de novo após BREAKER_OPEN_SECONDS
+    BREAKER_WINDOW = 20
+    BREAKER_MIN_REQUESTS = 5
+    BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', '0.5'))
+    BREAKER_SLOW_CALL_MS = 20000  # chamadas mais lentas contam como falha
+    BREAKER_OPEN_SECONDS = int(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+    HEALTH_PROBE_INTERVAL = 15  # segundos entre sondas dos circuitos abertos
+
     # Categorias de busca
     CATEGORIES = {
         'gasolina': {
             'keywords': ['posto de gasolina', 'gasolina', 'combustível'],
+            'osm_tags': {'amenity': ['fuel']},
             'radius': 5,
             'priority': 1
         },
         'hospedagem': {
             'keywords': ['hotel', 'pousada', 'camping', 'hospedagem'],
+            'osm_tags': {'tourism': ['hotel', 'motel', 'guest_house', 'hostel', 'camp_site']},
             'radius': 10,
             'priority': 2
         },
         'oficina': {
             'keywords': ['oficina mecânica', 'mecânica', 'oficina moto'],
+            'osm_tags': {'shop': ['car_repair', 'motorcycle', 'motorcycle_repair', 'tyres']},
             'radius': 5,
             'priority': 1
         },
         'restaurante': {
             'keywords': ['restaurante', 'lanchonete', 'comida'],
+            'osm_tags': {'amenity': ['restaurant', 'fast_food', 'cafe']},
             'radius': 3,
             'priority': 3
         },
         'farmacia': {
             'keywords': ['farmácia', 'drogaria', 'medicamento'],
+            'osm_tags': {'amenity': ['pharmacy']},
             'radius': 3,
             'priority': 2
         },
         'hospital': {
             'keywords': ['hospital', 'pronto socorro', 'emergência'],
+            'osm_tags': {'amenity': ['hospital', 'clinic']},
             'radius': 10,
             'priority': 1
         },
         'policia': {
             'keywords': ['polícia', 'delegacia', 'segurança'],
+            'osm_tags': {'amenity': ['police']},
             'radius': 10,
             'priority': 1
         }
@@ -68,11 +178,25 @@ class SearchConfig:
     # Configurações de banco de dados
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///data/moto_weather.db')
 
+    # Conexões SQLite (WAL + pragmas de desempenho)
+    SQLITE_BUSY_TIMEOUT = 5000  # ms
+    SQLITE_STATEMENT_CACHE = 256
+    SQLITE_PRAGMAS = {
+        'auto_vacuum': 'INCREMENTAL',  # só tem efeito em bancos novos
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,  # 256 MB
+        'cache_size': -16000,  # 16 MB
+        'busy_timeout': SQLITE_BUSY_TIMEOUT,
+        'temp_store': 'MEMORY'
+    }
+
     @classmethod
     def get_category_config(cls, category: str) -> Dict[str, Any]:
         """Retorna configuração de uma categoria específica"""
         return cls.CATEGORIES.get(category.lower(), {
             'keywords': [category],
+            'osm_tags': {},
             'radius': cls.DEFAULT_RADIUS,
             'priority': 5
         })
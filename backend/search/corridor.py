@@ -0,0 +1,223 @@
+"""
+Busca ao longo de uma rota (corredor em torno de uma polilinha)
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from .geocoding import EARTH_RADIUS_KM
+
+KM_PER_DEGREE = 111.32
+
+# Ponto da rota: (lat, lng)
+Point = Tuple[float, float]
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Point]:
+    """
+    Decodifica uma polilinha no formato do Google (Encoded Polyline
+    Algorithm). precision=6 para as polilinhas do OSRM/Valhalla com 6 casas.
+    """
+    factor = 10 ** precision
+    points: List[Point] = []
+    index = 0
+    lat = 0
+    lng = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = 0
+            value = 0
+            while True:
+                if index >= len(encoded):
+                    raise ValueError('Polilinha inválida')
+                byte = ord(encoded[index]) - 63
+                index += 1
+                if byte < 0 or byte > 63:
+                    raise ValueError('Polilinha inválida')
+                value |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+
+        lat += deltas[0]
+        lng += deltas[1]
+        point = (lat / factor, lng / factor)
+        if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+            raise ValueError('Polilinha inválida')
+        points.append(point)
+
+    return points
+
+
+def encode_polyline(points: List[Point], precision: int = 5) -> str:
+    """Codifica pontos no formato do Google (inverso de decode_polyline)"""
+    factor = 10 ** precision
+    chunks = []
+    previous = (0, 0)
+
+    for lat, lng in points:
+        current = (int(round(lat * factor)), int(round(lng * factor)))
+        for delta in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous = current
+
+    return ''.join(chunks)
+
+
+class RouteCorridor:
+    """
+    Corredor de largura buffer_km de cada lado de uma rota.
+
+    Divide o corredor em círculos de busca e filtra candidatos pela
+    distância exata ponto-segmento. Os segmentos ficam numa grade de
+    células de pelo menos buffer_km (projeção equirretangular da rota),
+    então cada candidato só é comparado com os segmentos das células
+    vizinhas.
+    """
+
+    def __init__(self, points: List[Point], buffer_km: float):
+        if not points:
+            raise ValueError('Rota vazia')
+        if buffer_km <= 0:
+            raise ValueError('Largura do corredor deve ser positiva')
+
+        # Pontos repetidos viram segmentos de comprimento zero
+        self.points = [point for index, point in enumerate(points)
+                       if index == 0 or point != points[index - 1]]
+        self.buffer_km = buffer_km
+        self._lng_scale = max(math.cos(math.radians(
+            sum(point[0] for point in self.points) / len(self.points))), 0.01)
+        # Rotas longas em latitude: a projeção única estica as longitudes
+        # onde o cosseno é menor, então a célula cresce na mesma proporção
+        min_scale = max(min(math.cos(math.radians(point[0])) for point in self.points), 0.01)
+        self._cell_km = buffer_km * max(1.0, self._lng_scale / min_scale)
+
+        # Distância acumulada até o início de cada segmento
+        self.offsets = [0.0]
+        for start, end in zip(self.points, self.points[1:]):
+            self.offsets.append(self.offsets[-1] + self._segment_length(start, end))
+        self.length_km = self.offsets[-1]
+
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._index_segments()
+
+    @staticmethod
+    def _segment_length(start: Point, end: Point) -> float:
+        """Comprimento do segmento em km (Haversine sem arredondar)"""
+        lat1, lat2 = math.radians(start[0]), math.radians(end[0])
+        dlat = lat2 - lat1
+        dlon = math.radians(end[1] - start[1])
+        a = (math.sin(dlat / 2) ** 2 +
+             math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    def _project(self, point: Point) -> Tuple[float, float]:
+        """Coordenadas em km na projeção da rota (só para a grade)"""
+        return point[0] * KM_PER_DEGREE, point[1] * KM_PER_DEGREE * self._lng_scale
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """Célula da grade que contém o ponto projetado"""
+        return int(math.floor(x / self._cell_km)), int(math.floor(y / self._cell_km))
+
+    def _index_segments(self):
+        """Coloca cada segmento nas células que sua caixa envolvente toca"""
+        for segment in range(max(len(self.points) - 1, 1)):
+            start = self._project(self.points[segment])
+            end = self._project(self.points[min(segment + 1, len(self.points) - 1)])
+            min_row, min_col = self._cell(min(start[0], end[0]), min(start[1], end[1]))
+            max_row, max_col = self._cell(max(start[0], end[0]), max(start[1], end[1]))
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self._grid.setdefault((row, col), []).append(segment)
+
+    def tiles(self) -> List[Tuple[float, float, float]]:
+        """
+        Círculos (lat, lng, raio) que cobrem o corredor.
+
+        Centros sobre a rota a cada 2 x buffer_km, com raio 2 x buffer_km:
+        qualquer ponto a até buffer_km da rota está a até buffer_km + metade
+        do espaçamento de um centro, mesmo nas curvas.
+        """
+        spacing = 2 * self.buffer_km
+        radius = math.ceil(spacing * 10) / 10
+        centers = [self.points[0]]
+        segment = 0
+        along = spacing
+
+        while along < self.length_km:
+            while self.offsets[segment + 1] < along:
+                segment += 1
+            centers.append(self._interpolate(segment, along))
+            along += spacing
+
+        if len(self.points) > 1:
+            centers.append(self.points[-1])
+        return [(lat, lng, radius) for lat, lng in centers]
+
+    def _interpolate(self, segment: int, along: float) -> Point:
+        """Ponto do segmento a 'along' km do início da rota"""
+        start, end = self.points[segment], self.points[segment + 1]
+        length = self.offsets[segment + 1] - self.offsets[segment]
+        fraction = (along - self.offsets[segment]) / length if length else 0.0
+        return (start[0] + (end[0] - start[0]) * fraction,
+                start[1] + (end[1] - start[1]) * fraction)
+
+    def locate(self, lat: float, lng: float) -> Optional[Tuple[float, float]]:
+        """
+        (distância até a rota, posição ao longo da rota) em km, ou None se o
+        ponto está fora do corredor.
+
+        A distância ponto-segmento é calculada num plano local centrado no
+        ponto, preciso nas distâncias de alguns km usadas no corredor.
+        """
+        row, col = self._cell(*self._project((lat, lng)))
+        candidates = set()
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                candidates.update(self._grid.get((row + d_row, col + d_col), ()))
+
+        lng_scale = KM_PER_DEGREE * math.cos(math.radians(lat))
+        best = None
+        for segment in candidates:
+            start = self.points[segment]
+            end = self.points[min(segment + 1, len(self.points) - 1)]
+            # Plano local com origem no ponto consultado
+            ax = (start[1] - lng) * lng_scale
+            ay = (start[0] - lat) * KM_PER_DEGREE
+            bx = (end[1] - lng) * lng_scale
+            by = (end[0] - lat) * KM_PER_DEGREE
+
+            dx, dy = bx - ax, by - ay
+            length_sq = dx * dx + dy * dy
+            t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+            distance = math.hypot(ax + t * dx, ay + t * dy)
+
+            if distance <= self.buffer_km and (best is None or distance < best[0]):
+                end_offset = self.offsets[min(segment + 1, len(self.offsets) - 1)]
+                best = (distance, self.offsets[segment] + t * (end_offset - self.offsets[segment]))
+
+        return best
+
+    def filter_places(self, places: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Lugares dentro do corredor, ordenados pela posição ao longo da rota.
+
+        'distance' passa a ser a distância até a rota e 'route_km' a posição
+        do ponto mais próximo da rota a partir do início.
+        """
+        located = []
+        for place in places:
+            coords = place.get('coordinates', {})
+            position = self.locate(coords.get('lat', 0),
+                                   coords.get('lon', coords.get('lng', 0)))
+            if position is not None:
+                located.append({**place, 'distance': round(position[0], 2),
+                                'route_km': round(position[1], 2)})
+
+        located.sort(key=lambda place: (place['route_km'], place['distance'], place.get('id', '')))
+        return located
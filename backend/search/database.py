@@ -0,0 +1,103 @@
+"""
+Gerenciador de conexões SQLite compartilhado pelo cache, rate limiting e clima
+"""
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from .config import SearchConfig
+
+
+class ConnectionManager:
+    """Mantém uma conexão SQLite de longa duração por thread, em modo WAL"""
+
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.pragmas = dict(SearchConfig.SQLITE_PRAGMAS if pragmas is None else pragmas)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão da thread atual, criando-a na primeira chamada.
+
+        O sqlite3 mantém um cache de statements compilados por conexão
+        (cached_statements), então manter a conexão viva reaproveita os
+        prepared statements de consultas com o mesmo SQL.
+        """
+        # Após um fork as conexões herdadas não podem ser reutilizadas
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=SearchConfig.SQLITE_BUSY_TIMEOUT / 1000,
+                check_same_thread=False,
+                cached_statements=SearchConfig.SQLITE_STATEMENT_CACHE
+            )
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        """Aplica os pragmas de desempenho na conexão"""
+        for name, value in self.pragmas.items():
+            try:
+                conn.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.DatabaseError as e:
+                print(f"Erro ao aplicar PRAGMA {name}: {e}")
+
+    def _reset_after_fork(self):
+        """Descarta conexões herdadas do processo pai"""
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def close_all(self):
+        """Fecha todas as conexões abertas pelo gerenciador"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Erro ao fechar conexão: {e}")
+        self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do gerenciador"""
+        return {
+            'db_path': self.db_path,
+            'open_connections': len(self._connections),
+            'pragmas': self.pragmas
+        }
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> ConnectionManager:
+    """Retorna o gerenciador compartilhado para um arquivo de banco"""
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
+
+
+def close_all_connections():
+    """Fecha as conexões de todos os gerenciadores"""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
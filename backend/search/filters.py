@@ -4,6 +4,7 @@ Sistema de filtros para busca de lugares
 from typing import List, Dict, Any, Optional, Callable
 from .models import Place
 from .config import SearchConfig
+from .geocoding import GeocodingService
 
 
 class SearchFilters:
@@ -17,6 +18,7 @@ class SearchFilters:
         """Registra filtros padrão"""
         self.filters.update({
             'distance': self._filter_by_distance,
+            'near': self._filter_by_point,
             'rating': self._filter_by_rating,
             'price': self._filter_by_price,
             'open_now': self._filter_by_open_status,
@@ -39,6 +41,20 @@ class SearchFilters:
         """Filtra por distância máxima"""
         return [place for place in places if place.distance <= max_distance]
 
+    def _filter_by_point(self, places: List[Place], point: Dict[str, float]) -> List[Place]:
+        """
+        Filtra pelo raio em torno de outro ponto ({'lat', 'lng', 'radius'}),
+        recalculando as distâncias a partir dele numa única passada
+        """
+        distances = GeocodingService.calculate_distances(
+            point['lat'], point['lng'],
+            [place.coordinates.lat for place in places],
+            [place.coordinates.lng for place in places])
+
+        return [place.model_copy(update={'distance': distance})
+                for place, distance in zip(places, distances)
+                if distance <= point['radius']]
+
     def _filter_by_rating(self, places: List[Place], min_rating: float) -> List[Place]:
         """Filtra por avaliação mínima"""
         return [place for place in places if place.rating and place.rating >= min_rating]
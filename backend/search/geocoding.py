@@ -3,39 +3,279 @@ Serviços de geocodificação e busca por localização
 """
 import requests
 import json
-from typing import Dict, List, Optional, Tuple
+import math
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+try:
+    import numpy as np
+except ImportError:
+    np = None
 from .config import SearchConfig
+from .http_client import HTTPClient, get_http_client
+
+
+# Caracteres especiais de expressão regular (POSIX) nas queries do Overpass
+_REGEX_SPECIAL = set('\\^$.|?*+()[]{}')
+
+EARTH_RADIUS_KM = 6371
+
+# Abaixo disso o custo de montar os arrays supera o ganho do NumPy
+_VECTORIZE_MIN_POINTS = 16
+
+
+class TruncatedPlaces(list):
+    """
+    Lugares de uma resposta do Overpass cortada no limite pedido.
+
+    O corte segue a ordem de quadtile (out qt), não a distância: lugares
+    mais próximos que os retornados podem ter ficado de fora, então a
+    resposta não garante completude em raio nenhum.
+    """
 
 
 class GeocodingService:
     """Serviço de geocodificação usando APIs gratuitas"""
 
+    @staticmethod
+    def _geocode_params(address: str) -> Dict[str, Any]:
+        """Parâmetros do Nominatim para geocodificação"""
+        return {
+            'q': address,
+            'format': 'json',
+            'limit': 1,
+            'countrycodes': 'br',  # Priorizar Brasil
+            'addressdetails': 1
+        }
+
+    @staticmethod
+    def _parse_geocode(data: List[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+        """Extrai coordenadas da resposta de geocodificação"""
+        if data and len(data) > 0:
+            lat = float(data[0]['lat'])
+            lon = float(data[0]['lon'])
+            return (lat, lon)
+
+        return None
+
+    @staticmethod
+    def _reverse_params(lat: float, lng: float) -> Dict[str, Any]:
+        """Parâmetros do Nominatim para geocodificação reversa"""
+        return {
+            'lat': lat,
+            'lon': lng,
+            'format': 'json',
+            'addressdetails': 1,
+            'accept-language': 'pt-BR'
+        }
+
+    @staticmethod
+    def _parse_reverse(data: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Extrai o endereço da resposta de geocodificação reversa"""
+        if 'address' in data:
+            address = data['address']
+            return {
+                'display_name': data.get('display_name', ''),
+                'city': address.get('city', address.get('town', address.get('village', ''))),
+                'state': address.get('state', ''),
+                'country': address.get('country', ''),
+                'postcode': address.get('postcode', ''),
+                'road': address.get('road', ''),
+                'house_number': address.get('house_number', '')
+            }
+
+        return None
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Minúsculas sem acentos, para comparar queries com palavras-chave"""
+        decomposed = unicodedata.normalize('NFKD', text.lower())
+        return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+    @staticmethod
+    def resolve_category(query: str, category: str = '') -> Optional[str]:
+        """
+        Categoria a usar na query Overpass: a informada ou a que tem a
+        query como nome ou palavra-chave (ex.: 'posto de gasolina')
+        """
+        if category and category.lower() in SearchConfig.CATEGORIES:
+            return category.lower()
+
+        folded = GeocodingService.normalize_text(query or '')
+        if not folded:
+            return None
+        for name, config in SearchConfig.CATEGORIES.items():
+            terms = [name] + config['keywords']
+            if any(folded == GeocodingService.normalize_text(term) for term in terms):
+                return name
+        return None
+
+    @staticmethod
+    def name_filter(query: str, category: str = '') -> str:
+        """
+        Texto para filtrar pelo nome, ou '' quando a própria query é o que
+        resolve a categoria (ex.: 'posto de gasolina'). Com categoria
+        informada à parte, a query continua filtrando o nome
+        (ex.: query='Shell', category='gasolina')
+        """
+        text = (query or '').strip()
+        if not text:
+            return ''
+        resolved = GeocodingService.resolve_category(query, category)
+        if resolved and GeocodingService.resolve_category(query) == resolved:
+            return ''
+        return text
+
+    @staticmethod
+    def _escape_regex(text: str) -> str:
+        """Escapa a query para uso em regex dentro de string Overpass QL"""
+        escaped = ''.join(f'\\{c}' if c in _REGEX_SPECIAL else c for c in text)
+        # Aspas fecham a string; a barra da regex precisa ser dobrada na QL
+        return escaped.replace('\\', '\\\\').replace('"', '\\"')
+
+    @staticmethod
+    def _osm_tags(category: Optional[str]) -> Dict[str, List[str]]:
+        """Tags OSM da categoria, ou de todas as categorias"""
+        if category:
+            return SearchConfig.CATEGORIES[category]['osm_tags']
+
+        merged: Dict[str, List[str]] = {}
+        for config in SearchConfig.CATEGORIES.values():
+            for key, values in config['osm_tags'].items():
+                merged.setdefault(key, [])
+                merged[key].extend(v for v in values if v not in merged[key])
+        return merged
+
+    @staticmethod
+    def _overpass_query(lat: float, lng: float, radius: int, query: str = '',
+                        category: str = '',
+                        limit: int = SearchConfig.OVERPASS_RESULT_LIMIT) -> str:
+        """
+        Monta a query Overpass para lugares próximos.
+
+        Só pede as tags da categoria (ou de todas, sem categoria) e filtra o
+        nome no servidor, sem diferenciar maiúsculas. O filtro de nome é
+        omitido quando a query é a própria categoria.
+        """
+        resolved = GeocodingService.resolve_category(query, category)
+
+        name_filter = ''
+        name = GeocodingService.name_filter(query, category)
+        if name:
+            name_filter = f'["name"~"{GeocodingService._escape_regex(name)}",i]'
+
+        around = f"(around:{radius*1000},{lat},{lng})"
+        selectors = '\n'.join(
+            f'          nwr["{key}"~"^({"|".join(values)})$"]{name_filter}{around};'
+            for key, values in GeocodingService._osm_tags(resolved).items()
+        )
+
+        return f"""
+        [out:json][timeout:{SearchConfig.OVERPASS_TIMEOUT}];
+        (
+{selectors}
+        );
+        out center qt {limit};
+        """
+
+    @staticmethod
+    def _place_category(tags: Dict[str, str]) -> str:
+        """Categoria de SearchConfig correspondente às tags OSM do elemento"""
+        for name, config in SearchConfig.CATEGORIES.items():
+            for key, values in config['osm_tags'].items():
+                if tags.get(key) in values:
+                    return name
+        return ''
+
+    @staticmethod
+    def _parse_element(element: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Converte um elemento OSM (formato JSON do Overpass) em lugar"""
+        if 'tags' not in element:
+            return None
+        tags = element['tags']
+
+        # Obter coordenadas
+        if element['type'] == 'node':
+            coords = {'lat': element['lat'], 'lon': element['lon']}
+        elif 'center' in element:
+            coords = {
+                'lat': element['center']['lat'], 'lon': element['center']['lon']}
+        else:
+            return None
+
+        return {
+            'id': f"osm_{element['id']}",
+            'name': tags.get('name', 'Sem nome'),
+            'amenity': tags.get('amenity', tags.get('shop', tags.get('tourism', ''))),
+            'category': GeocodingService._place_category(tags),
+            'address': tags.get('addr:full', ''),
+            'phone': tags.get('phone', ''),
+            'website': tags.get('website', ''),
+            'opening_hours': tags.get('opening_hours', ''),
+            'coordinates': coords,
+            'source': 'openstreetmap'
+        }
+
+    @staticmethod
+    def _parse_overpass(data: Dict[str, Any],
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Converte os elementos retornados pelo Overpass em lugares (o filtro
+        por nome já foi aplicado na query)
+
+        Com limit, uma resposta que o atingiu volta como TruncatedPlaces.
+        """
+        elements = data.get('elements', [])
+        truncated = limit is not None and len(elements) >= limit
+        places = TruncatedPlaces() if truncated else []
+
+        for element in elements:
+            place = GeocodingService._parse_element(element)
+            if place is not None:
+                places.append(place)
+
+        return places
+
+    @staticmethod
+    def _suggestion_params(query: str, limit: int) -> Dict[str, Any]:
+        """Parâmetros do Nominatim para sugestões"""
+        return {
+            'q': query,
+            'format': 'json',
+            'limit': limit,
+            'countrycodes': 'br',
+            'addressdetails': 1
+        }
+
+    @staticmethod
+    def _parse_suggestions(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Converte a resposta do Nominatim em sugestões"""
+        suggestions = []
+
+        for item in data:
+            suggestion = {
+                'display_name': item.get('display_name', ''),
+                'lat': float(item['lat']),
+                'lon': float(item['lon']),
+                'type': item.get('type', ''),
+                'importance': item.get('importance', 0)
+            }
+            suggestions.append(suggestion)
+
+        return suggestions
+
     @staticmethod
     def geocode_address(address: str) -> Optional[Tuple[float, float]]:
         """
         Converte endereço em coordenadas usando OpenStreetMap Nominatim
         """
         try:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                'q': address,
-                'format': 'json',
-                'limit': 1,
-                'countrycodes': 'br',  # Priorizar Brasil
-                'addressdetails': 1
-            }
+            url = f"{SearchConfig.NOMINATIM_URL}/search"
+            params = GeocodingService._geocode_params(address)
 
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-
-            if data and len(data) > 0:
-                lat = float(data[0]['lat'])
-                lon = float(data[0]['lon'])
-                return (lat, lon)
-
-            return None
+            return GeocodingService._parse_geocode(response.json())
 
         except Exception as e:
             print(f"Erro na geocodificação: {e}")
@@ -47,111 +287,44 @@ class GeocodingService:
         Converte coordenadas em endereço usando OpenStreetMap Nominatim
         """
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                'lat': lat,
-                'lon': lng,
-                'format': 'json',
-                'addressdetails': 1,
-                'accept-language': 'pt-BR'
-            }
+            url = f"{SearchConfig.NOMINATIM_URL}/reverse"
+            params = GeocodingService._reverse_params(lat, lng)
 
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-
-            if 'address' in data:
-                address = data['address']
-                return {
-                    'display_name': data.get('display_name', ''),
-                    'city': address.get('city', address.get('town', address.get('village', ''))),
-                    'state': address.get('state', ''),
-                    'country': address.get('country', ''),
-                    'postcode': address.get('postcode', ''),
-                    'road': address.get('road', ''),
-                    'house_number': address.get('house_number', '')
-                }
-
-            return None
+            return GeocodingService._parse_reverse(response.json())
 
         except Exception as e:
             print(f"Erro na geocodificação reversa: {e}")
             return None
 
     @staticmethod
-    def search_places_nearby(lat: float, lng: float, query: str, radius: int = 5) -> List[Dict[str, any]]:
+    def search_places_nearby(lat: float, lng: float, query: str, radius: int = 5,
+                             category: str = '') -> List[Dict[str, any]]:
         """
         Busca lugares próximos usando Overpass API (OpenStreetMap)
+
+        Falhas de rede ou HTTP são propagadas para que o chamador distinga
+        uma busca sem resultados de uma falha da API.
         """
-        try:
-            # Query Overpass para buscar lugares
-            overpass_query = f"""
-            [out:json][timeout:25];
-            (
-              node["amenity"~"^(restaurant|fuel|pharmacy|hospital|police|hotel)$"](around:{radius*1000},{lat},{lng});
-              way["amenity"~"^(restaurant|fuel|pharmacy|hospital|police|hotel)$"](around:{radius*1000},{lat},{lng});
-              relation["amenity"~"^(restaurant|fuel|pharmacy|hospital|police|hotel)$"](around:{radius*1000},{lat},{lng});
-            );
-            out center;
-            """
-
-            response = requests.post(
-                SearchConfig.OPENSTREETMAP_URL,
-                data=overpass_query,
-                headers={'Content-Type': 'text/plain'},
-                timeout=30
-            )
-            response.raise_for_status()
+        response = requests.post(
+            SearchConfig.OPENSTREETMAP_URL,
+            data=GeocodingService._overpass_query(lat, lng, radius, query, category),
+            headers={'Content-Type': 'text/plain'},
+            timeout=30
+        )
+        response.raise_for_status()
 
-            data = response.json()
-            places = []
-
-            for element in data.get('elements', []):
-                if 'tags' in element:
-                    tags = element['tags']
-
-                    # Obter coordenadas
-                    if element['type'] == 'node':
-                        coords = {'lat': element['lat'], 'lon': element['lon']}
-                    elif 'center' in element:
-                        coords = {
-                            'lat': element['center']['lat'], 'lon': element['center']['lon']}
-                    else:
-                        continue
-
-                    # Filtrar por query se especificada
-                    if query and query.lower() not in tags.get('name', '').lower():
-                        continue
-
-                    place = {
-                        'id': f"osm_{element['id']}",
-                        'name': tags.get('name', 'Sem nome'),
-                        'amenity': tags.get('amenity', ''),
-                        'address': tags.get('addr:full', ''),
-                        'phone': tags.get('phone', ''),
-                        'website': tags.get('website', ''),
-                        'opening_hours': tags.get('opening_hours', ''),
-                        'coordinates': coords,
-                        'source': 'openstreetmap'
-                    }
-
-                    places.append(place)
-
-            return places
-
-        except Exception as e:
-            print(f"Erro na busca Overpass: {e}")
-            return []
+        return GeocodingService._parse_overpass(
+            response.json(), SearchConfig.OVERPASS_RESULT_LIMIT)
 
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
         Calcula distância entre dois pontos usando fórmula de Haversine
         """
-        import math
-
-        R = 6371  # Raio da Terra em km
+        R = EARTH_RADIUS_KM
 
         dlat = math.radians(lat2 - lat1)
         dlon = math.radians(lon2 - lon1)
@@ -165,38 +338,136 @@ class GeocodingService:
 
         return round(distance, 2)
 
+    @staticmethod
+    def calculate_distances(lat: float, lng: float, lats: Sequence[float],
+                            lngs: Sequence[float]) -> List[float]:
+        """
+        Distâncias (Haversine, km, 2 casas) de um ponto a vários pontos.
+
+        Com NumPy, calcula tudo numa única passada vetorizada; sem ele (ou
+        com poucos pontos), recorre a calculate_distance ponto a ponto.
+        """
+        if np is None or len(lats) < _VECTORIZE_MIN_POINTS:
+            return [GeocodingService.calculate_distance(lat, lng, lat2, lng2)
+                    for lat2, lng2 in zip(lats, lngs)]
+
+        lat1 = math.radians(lat)
+        lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+        dlat = lat2 - lat1
+        dlon = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return np.round(EARTH_RADIUS_KM * c, 2).tolist()
+
+    @staticmethod
+    def calculate_place_distances(lat: float, lng: float,
+                                  places: Sequence[Dict[str, Any]]) -> List[float]:
+        """Distâncias de um ponto a cada lugar (coordenadas em 'coordinates')"""
+        lats = []
+        lngs = []
+        for place in places:
+            coords = place.get('coordinates', {})
+            lats.append(coords.get('lat', 0))
+            lngs.append(coords.get('lon', coords.get('lng', 0)))
+        return GeocodingService.calculate_distances(lat, lng, lats, lngs)
+
     @staticmethod
     def get_place_suggestions(query: str, limit: int = 5) -> List[Dict[str, str]]:
         """
         Obtém sugestões de lugares baseado na query
         """
         try:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                'q': query,
-                'format': 'json',
-                'limit': limit,
-                'countrycodes': 'br',
-                'addressdetails': 1
-            }
+            url = f"{SearchConfig.NOMINATIM_URL}/search"
+            params = GeocodingService._suggestion_params(query, limit)
 
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-            suggestions = []
+            return GeocodingService._parse_suggestions(response.json())
 
-            for item in data:
-                suggestion = {
-                    'display_name': item.get('display_name', ''),
-                    'lat': float(item['lat']),
-                    'lon': float(item['lon']),
-                    'type': item.get('type', ''),
-                    'importance': item.get('importance', 0)
-                }
-                suggestions.append(suggestion)
+        except Exception as e:
+            print(f"Erro ao obter sugestões: {e}")
+            return []
+
+
+class AsyncGeocodingService:
+    """
+    Versão assíncrona do GeocodingService.
+
+    Usa o cliente HTTP compartilhado, então várias chamadas podem ficar em
+    andamento sem bloquear o event loop. Queries e parsing são os mesmos
+    do serviço síncrono.
+    """
+
+    calculate_distance = staticmethod(GeocodingService.calculate_distance)
+    calculate_distances = staticmethod(GeocodingService.calculate_distances)
+    calculate_place_distances = staticmethod(GeocodingService.calculate_place_distances)
+
+    def __init__(self, client: Optional[HTTPClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> HTTPClient:
+        """Cliente injetado ou o compartilhado do processo"""
+        return self._client if self._client is not None else get_http_client()
+
+    async def geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
+        """Converte endereço em coordenadas usando OpenStreetMap Nominatim"""
+        try:
+            data = await self.client.get_json(
+                f"{SearchConfig.NOMINATIM_URL}/search",
+                params=GeocodingService._geocode_params(address),
+                timeout=10
+            )
+            return GeocodingService._parse_geocode(data)
+
+        except Exception as e:
+            print(f"Erro na geocodificação: {e}")
+            return None
+
+    async def reverse_geocode(self, lat: float, lng: float) -> Optional[Dict[str, str]]:
+        """Converte coordenadas em endereço usando OpenStreetMap Nominatim"""
+        try:
+            data = await self.client.get_json(
+                f"{SearchConfig.NOMINATIM_URL}/reverse",
+                params=GeocodingService._reverse_params(lat, lng),
+                timeout=10
+            )
+            return GeocodingService._parse_reverse(data)
+
+        except Exception as e:
+            print(f"Erro na geocodificação reversa: {e}")
+            return None
+
+    async def search_places_nearby(self, lat: float, lng: float, query: str,
+                                   radius: int = 5,
+                                   category: str = '',
+                                   limit: int = SearchConfig.OVERPASS_RESULT_LIMIT
+                                   ) -> List[Dict[str, Any]]:
+        """
+        Busca lugares próximos usando Overpass API (OpenStreetMap)
 
-            return suggestions
+        Assim como na versão síncrona, falhas são propagadas. Respostas que
+        atingem limit voltam como TruncatedPlaces.
+        """
+        data = await self.client.post_json(
+            SearchConfig.OPENSTREETMAP_URL,
+            data=GeocodingService._overpass_query(lat, lng, radius, query, category, limit),
+            headers={'Content-Type': 'text/plain'},
+            timeout=30
+        )
+        return GeocodingService._parse_overpass(data, limit)
+
+    async def get_place_suggestions(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Obtém sugestões de lugares baseado na query"""
+        try:
+            data = await self.client.get_json(
+                f"{SearchConfig.NOMINATIM_URL}/search",
+                params=GeocodingService._suggestion_params(query, limit),
+                timeout=10
+            )
+            return GeocodingService._parse_suggestions(data)
 
         except Exception as e:
             print(f"Erro ao obter sugestões: {e}")
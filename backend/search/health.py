@@ -0,0 +1,302 @@
+"""
+Saúde dos provedores externos e circuit breakers
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from .config import SearchConfig
+from .metrics import LatencyHistogram
+
+
+# Estados do circuit breaker
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderUnavailable(Exception):
+    """Chamada recusada porque o circuito do provedor está aberto"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Provedor '{provider}' indisponível (circuito aberto)")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com janela deslizante das últimas chamadas.
+
+    Abre quando a taxa de erro (chamadas lentas contam como erro) passa de
+    error_rate com pelo menos min_requests na janela. Depois de open_seconds
+    fica meio aberto: uma chamada de teste fecha o circuito se der certo ou
+    o reabre se falhar.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = SearchConfig.BREAKER_WINDOW,
+        min_requests: int = SearchConfig.BREAKER_MIN_REQUESTS,
+        error_rate: float = SearchConfig.BREAKER_ERROR_RATE,
+        slow_call_ms: float = SearchConfig.BREAKER_SLOW_CALL_MS,
+        open_seconds: float = SearchConfig.BREAKER_OPEN_SECONDS
+    ):
+        self.name = name
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self._window: Deque[bool] = deque(maxlen=window_size)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        self.latency = LatencyHistogram()
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    def is_available(self) -> bool:
+        """Indica se uma chamada seria aceita agora (sem consumir o teste)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.time() >= self.opened_at + self.open_seconds
+            return not self._trial_in_flight
+
+    def allow_request(self) -> bool:
+        """Reserva a chamada; no estado meio aberto só uma por vez passa"""
+        with self._lock:
+            if self.state == OPEN and time.time() >= self.opened_at + self.open_seconds:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self, elapsed_ms: float):
+        """Registra chamada concluída; lentas contam como falha"""
+        self.latency.observe(elapsed_ms)
+        if elapsed_ms > self.slow_call_ms:
+            self.record_failure(f"lenta ({elapsed_ms:.0f} ms)")
+            return
+
+        with self._lock:
+            self.successes += 1
+            self._window.append(True)
+            if self.state == HALF_OPEN:
+                self._close()
+
+    def record_failure(self, error: str = ''):
+        """Registra falha e abre o circuito se a taxa de erro passar do limite"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = error or None
+            self._window.append(False)
+
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+
+            errors = self._window.count(False)
+            if (self.state == CLOSED and len(self._window) >= self.min_requests
+                    and errors / len(self._window) >= self.error_rate):
+                self._open()
+
+    def release(self):
+        """Libera o teste do estado meio aberto sem registrar resultado"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _open(self):
+        """Abre o circuito (chamado com o lock adquirido)"""
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._trial_in_flight = False
+        self.times_opened += 1
+
+    def _close(self):
+        """Fecha o circuito e limpa a janela (chamado com o lock adquirido)"""
+        self.state = CLOSED
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._window.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estado, taxa de erro e latência"""
+        with self._lock:
+            window = list(self._window)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.opened_at + self.open_seconds - time.time()), 1)
+
+        return {
+            'state': self.state,
+            'error_rate': round(window.count(False) / len(window), 4) if window else 0.0,
+            'window': len(window),
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'times_opened': self.times_opened,
+            'retry_in': retry_in,
+            'last_error': self.last_error,
+            'latency': self.latency.get_stats()
+        }
+
+
+class HealthRegistry:
+    """Circuit breakers por provedor, identificados pelo host das chamadas"""
+
+    def __init__(self, hosts: Optional[Dict[str, str]] = None):
+        if hosts is None:
+            hosts = {
+                'overpass': urlsplit(SearchConfig.OPENSTREETMAP_URL).netloc,
+                'nominatim': urlsplit(SearchConfig.NOMINATIM_URL).netloc,
+                'serpapi': urlsplit(SearchConfig.SERPAPI_URL).netloc
+            }
+        self._providers_by_host = {host: name for name, host in hosts.items()}
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(name) for name in hosts
+        }
+
+    def provider_for(self, url: str) -> Optional[str]:
+        """Nome do provedor de uma URL, se monitorado"""
+        return self._providers_by_host.get(urlsplit(url).netloc)
+
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        """Breaker do provedor"""
+        return self.breakers.get(name)
+
+    def is_available(self, name: str) -> bool:
+        """Indica se o provedor aceitaria uma chamada agora"""
+        breaker = self.breakers.get(name)
+        return breaker is None or breaker.is_available()
+
+    def get_status(self) -> Dict[str, str]:
+        """Estado de cada circuito"""
+        return {name: breaker.state for name, breaker in self.breakers.items()}
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estatísticas de cada provedor"""
+        return {name: breaker.get_stats() for name, breaker in self.breakers.items()}
+
+
+class HealthMonitor:
+    """
+    Sonda em segundo plano os provedores com circuito aberto.
+
+    Cada provedor tem um endpoint leve (status do Overpass, account.json
+    da SerpAPI); uma resposta 200 depois do tempo de espera fecha o
+    circuito sem arriscar uma busca real.
+    """
+
+    def __init__(
+        self,
+        registry: HealthRegistry,
+        client: Any,
+        interval: float = SearchConfig.HEALTH_PROBE_INTERVAL,
+        probes: Optional[Dict[str, Callable[[], Tuple[str, Dict[str, Any]]]]] = None
+    ):
+        self.registry = registry
+        self.client = client
+        self.interval = interval
+        self.probes = probes if probes is not None else {
+            'overpass': lambda: (SearchConfig.OVERPASS_STATUS_URL, {}),
+            'nominatim': lambda: (f"{SearchConfig.NOMINATIM_URL}/status", {'format': 'json'}),
+            'serpapi': lambda: (SearchConfig.SERPAPI_ACCOUNT_URL,
+                                {'api_key': SearchConfig.SERPAPI_KEY})
+        }
+        self._task: Optional[asyncio.Task] = None
+        self.probes_sent = 0
+        self.recoveries = 0
+
+    def start(self):
+        """Inicia o laço de sondagem no event loop atual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        """Interrompe o laço de sondagem"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        """Sonda os circuitos abertos a cada intervalo"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_open_circuits()
+            except Exception as e:
+                print(f"Erro na sondagem dos provedores: {e}")
+
+    async def probe_open_circuits(self) -> Dict[str, bool]:
+        """Sonda os provedores cujo circuito pode ser testado"""
+        results = {}
+        for name, breaker in self.registry.breakers.items():
+            if breaker.state == CLOSED or name not in self.probes:
+                continue
+            if name == 'serpapi' and not SearchConfig.SERPAPI_KEY:
+                continue
+            if not breaker.allow_request():
+                continue
+            results[name] = await self._probe(name, breaker)
+        return results
+
+    async def _probe(self, name: str, breaker: CircuitBreaker) -> bool:
+        """Executa a sonda e registra o resultado no breaker"""
+        url, params = self.probes[name]()
+        started = time.perf_counter()
+        self.probes_sent += 1
+        try:
+            status = await self.client.get_status(url, params=params, timeout=10)
+        except Exception as e:
+            breaker.record_failure(f"sonda: {e}")
+            return False
+
+        if status != 200:
+            breaker.record_failure(f"sonda: HTTP {status}")
+            return False
+
+        breaker.record_success((time.perf_counter() - started) * 1000)
+        self.recoveries += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas das sondas"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'interval': self.interval,
+            'probes_sent': self.probes_sent,
+            'recoveries': self.recoveries
+        }
+
+
+# Registro compartilhado do processo
+_registry: Optional[HealthRegistry] = None
+
+
+def get_health_registry() -> HealthRegistry:
+    """Retorna o registro de saúde compartilhado do processo"""
+    global _registry
+    if _registry is None:
+        _registry = HealthRegistry()
+    return _registry
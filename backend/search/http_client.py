@@ -0,0 +1,283 @@
+"""
+Cliente HTTP assíncrono compartilhado pelas chamadas às APIs externas
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+from .config import SearchConfig
+from .health import HealthRegistry, ProviderUnavailable, get_health_registry
+from .metrics import LatencyHistogram
+
+
+class HTTPClient:
+    """
+    Pool de conexões reutilizado por todas as chamadas externas.
+
+    Usa uma única aiohttp.ClientSession com keep-alive, limite de conexões
+    por host e cache de DNS; sem aiohttp, recorre a uma requests.Session
+    executada em threads para não bloquear o event loop.
+
+    Com um HealthRegistry, cada chamada a um provedor monitorado passa pelo
+    circuit breaker dele: recusada com ProviderUnavailable se o circuito
+    estiver aberto e registrada (sucesso, falha e latência) ao terminar.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        limit: int = SearchConfig.HTTP_POOL_LIMIT,
+        limit_per_host: int = SearchConfig.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = SearchConfig.HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = SearchConfig.HTTP_DNS_CACHE_TTL,
+        connect_timeout: float = SearchConfig.HTTP_CONNECT_TIMEOUT,
+        timeout: float = SearchConfig.HTTP_TIMEOUT,
+        health: Optional[HealthRegistry] = None
+    ):
+        self.headers = {'User-Agent': SearchConfig.HTTP_USER_AGENT, **(headers or {})}
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.health = health
+        self._session: Any = None
+        self._sync_session: Optional[requests.Session] = None
+
+        # Latência por host, separando conexões reaproveitadas (quentes)
+        # das que precisaram de DNS/TCP/TLS (frias)
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
+
+    async def start(self):
+        """Cria a sessão e o pool de conexões (no startup da aplicação)"""
+        self._get_session()
+
+    def _get_session(self) -> Any:
+        """Retorna a sessão, criando-a se necessário (precisa do event loop ativo)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=self.connect_timeout),
+                trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    @staticmethod
+    def _trace_config() -> Any:
+        """Marca no contexto da requisição se a conexão foi reaproveitada"""
+        async def on_reuse(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx['reused'] = True
+
+        async def on_create(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx['reused'] = False
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        trace_config.on_connection_create_start.append(on_create)
+        return trace_config
+
+    def _get_sync_session(self) -> requests.Session:
+        """Sessão requests usada quando aiohttp não está instalado"""
+        if self._sync_session is None:
+            self._sync_session = requests.Session()
+            self._sync_session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=self.limit,
+                                  pool_maxsize=self.limit_per_host)
+            self._sync_session.mount('https://', adapter)
+            self._sync_session.mount('http://', adapter)
+        return self._sync_session
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       timeout: Optional[float] = None) -> Any:
+        """GET que retorna o corpo JSON; erros HTTP viram exceção"""
+        return await self._request('GET', url, timeout, params=params)
+
+    async def post_json(self, url: str, data: Any = None,
+                        headers: Optional[Dict[str, str]] = None,
+                        timeout: Optional[float] = None) -> Any:
+        """POST que retorna o corpo JSON; erros HTTP viram exceção"""
+        return await self._request('POST', url, timeout, data=data, headers=headers)
+
+    async def get_status(self, url: str, params: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = None) -> int:
+        """
+        GET que retorna só o código HTTP, sem passar pelo circuit breaker
+        (usado pelas sondas de saúde, cujos endpoints nem sempre são JSON)
+        """
+        return await self._request('GET', url, timeout, status_only=True, params=params)
+
+    async def _request(self, method: str, url: str, timeout: Optional[float],
+                       status_only: bool = False, **kwargs) -> Any:
+        """Executa a requisição pelo pool disponível, registrando a latência"""
+        host = urlsplit(url).netloc
+        breaker = None
+        if self.health is not None and not status_only:
+            provider = self.health.provider_for(url)
+            breaker = self.health.get(provider) if provider else None
+            if breaker is not None and not breaker.allow_request():
+                raise ProviderUnavailable(provider)
+
+        started = time.perf_counter()
+        trace = {'reused': None}
+        try:
+            if aiohttp is None:
+                result = await asyncio.to_thread(
+                    self._sync_request, method, url,
+                    timeout if timeout is not None else self.timeout,
+                    status_only, **kwargs)
+            else:
+                result = await self._aiohttp_request(
+                    method, url, timeout, trace, status_only, **kwargs)
+        except Exception as e:
+            self._record(host, None, None)
+            if breaker is not None:
+                if self._is_provider_failure(e):
+                    breaker.record_failure(f"{type(e).__name__}: {e}")
+                else:
+                    breaker.release()
+            raise
+        except BaseException:
+            # Cancelada: não diz nada sobre a saúde do provedor
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(host, trace['reused'], elapsed_ms)
+        if breaker is not None:
+            breaker.record_success(elapsed_ms)
+        return result
+
+    @staticmethod
+    def _is_provider_failure(error: Exception) -> bool:
+        """
+        Indica se o erro conta contra a saúde do provedor: falhas de rede,
+        timeouts, respostas inválidas, 5xx e 429. Outros 4xx são erro da
+        requisição, não do provedor.
+        """
+        status = None
+        if aiohttp is not None and isinstance(error, aiohttp.ClientResponseError):
+            status = error.status
+        elif isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+
+        if status is None:
+            return True
+        return status >= 500 or status == 429
+
+    async def _aiohttp_request(self, method: str, url: str, timeout: Optional[float],
+                               trace: Dict[str, Any], status_only: bool = False,
+                               **kwargs) -> Any:
+        """Requisição pela sessão aiohttp compartilhada"""
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(
+                total=timeout, connect=self.connect_timeout)
+
+        async with self._get_session().request(
+                method, url, trace_request_ctx=trace, **kwargs) as response:
+            if status_only:
+                await response.read()
+                return response.status
+            response.raise_for_status()
+            # Overpass e Nominatim nem sempre enviam application/json
+            return await response.json(content_type=None)
+
+    def _sync_request(self, method: str, url: str, timeout: float,
+                      status_only: bool = False, **kwargs) -> Any:
+        """Requisição bloqueante (executada fora do event loop)"""
+        response = self._get_sync_session().request(
+            method, url, timeout=timeout, **kwargs)
+        if status_only:
+            return response.status_code
+        response.raise_for_status()
+        return response.json()
+
+    def _record(self, host: str, reused: Optional[bool], elapsed_ms: Optional[float]):
+        """Atualiza as estatísticas do host"""
+        with self._stats_lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {
+                    'requests': 0,
+                    'errors': 0,
+                    'warm': LatencyHistogram(),
+                    'cold': LatencyHistogram()
+                }
+            stats['requests'] += 1
+            if elapsed_ms is None:
+                stats['errors'] += 1
+                return
+
+        # Sem aiohttp não há como saber se a conexão foi reaproveitada
+        if reused is not None:
+            stats['warm' if reused else 'cold'].observe(elapsed_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna latência por host em conexões quentes e frias"""
+        with self._stats_lock:
+            hosts = dict(self._hosts)
+
+        return {
+            'backend': 'aiohttp' if aiohttp else 'requests',
+            'open': self._session is not None and not self._session.closed,
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'hosts': {
+                host: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'warm_latency': stats['warm'].get_stats(),
+                    'cold_latency': stats['cold'].get_stats()
+                }
+                for host, stats in hosts.items()
+            }
+        }
+
+    async def close(self):
+        """Fecha as conexões do pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._sync_session is not None:
+            self._sync_session.close()
+            self._sync_session = None
+
+
+# Cliente compartilhado do processo (um por worker)
+_client: Optional[HTTPClient] = None
+
+
+def get_http_client() -> HTTPClient:
+    """Retorna o cliente HTTP compartilhado do processo"""
+    global _client
+    if _client is None:
+        _client = HTTPClient(health=get_health_registry())
+    return _client
+
+
+async def close_http_client():
+    """Fecha o cliente HTTP compartilhado (no encerramento da aplicação)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,155 @@
+"""
+Manutenção periódica do cache de busca em segundo plano
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from .config import SearchConfig
+from .cache import SearchCache
+
+
+class CacheJanitor:
+    """Remove entradas expiradas, aplica o orçamento de tamanho e compacta o banco"""
+
+    def __init__(
+        self,
+        cache: SearchCache,
+        interval: float = SearchConfig.JANITOR_INTERVAL,
+        batch_size: int = SearchConfig.JANITOR_BATCH_SIZE,
+        max_entries: int = SearchConfig.CACHE_MAX_ENTRIES,
+        max_bytes: int = SearchConfig.CACHE_MAX_BYTES,
+        policy: str = SearchConfig.CACHE_EVICTION_POLICY,
+        vacuum_pages: int = SearchConfig.JANITOR_VACUUM_PAGES
+    ):
+        self.cache = cache
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.vacuum_pages = vacuum_pages
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.errors = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration_ms = 0.0
+        self.last_timings_ms: Dict[str, float] = {}
+        self.totals = {
+            'expired_deleted': 0,
+            'evicted': 0,
+            'vacuumed_pages': 0,
+            'access_flushed': 0
+        }
+
+    def start(self):
+        """Inicia o laço de manutenção no event loop atual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        """Interrompe o laço de manutenção"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        """Executa a manutenção a cada intervalo"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro na manutenção do cache: {e}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """Executa uma rodada completa de manutenção"""
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        result = {}
+
+        step = time.perf_counter()
+        result['access_flushed'] = await asyncio.to_thread(
+            self.cache.flush_access_stats)
+        self.cache.memory.clear_expired()
+        timings['flush_access'] = self._elapsed_ms(step)
+
+        step = time.perf_counter()
+        result['expired_deleted'] = await self._in_batches(
+            self.cache.purge_expired)
+        timings['purge_expired'] = self._elapsed_ms(step)
+
+        step = time.perf_counter()
+        result['evicted'] = await self._enforce_budget()
+        timings['evict'] = self._elapsed_ms(step)
+
+        step = time.perf_counter()
+        result['vacuumed_pages'] = await asyncio.to_thread(
+            self.cache.incremental_vacuum, self.vacuum_pages)
+        timings['incremental_vacuum'] = self._elapsed_ms(step)
+
+        for name, value in result.items():
+            self.totals[name] += value
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_duration_ms = self._elapsed_ms(started)
+        self.last_timings_ms = timings
+        return result
+
+    async def _in_batches(self, func, *args) -> int:
+        """Repete uma operação em lotes, liberando o lock de escrita entre eles"""
+        total = 0
+        while True:
+            deleted = await asyncio.to_thread(func, *args, self.batch_size)
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(0)
+
+    async def _enforce_budget(self) -> int:
+        """Remove entradas até respeitar o limite de linhas e de bytes"""
+        evicted = 0
+
+        excess = await asyncio.to_thread(self.cache.count_entries) - self.max_entries
+        while excess > 0:
+            removed = await asyncio.to_thread(
+                self.cache.evict, min(excess, self.batch_size), self.policy)
+            if not removed:
+                break
+            evicted += removed
+            excess -= removed
+
+        while await asyncio.to_thread(self.cache.get_database_size) > self.max_bytes:
+            removed = await asyncio.to_thread(
+                self.cache.evict, self.batch_size, self.policy)
+            if not removed:
+                break
+            evicted += removed
+
+        return evicted
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        """Milissegundos desde started"""
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas e tempos da manutenção"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'interval': self.interval,
+            'policy': self.policy,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'runs': self.runs,
+            'errors': self.errors,
+            'last_run_at': self.last_run_at,
+            'last_duration_ms': self.last_duration_ms,
+            'last_timings_ms': self.last_timings_ms,
+            'totals': self.totals
+        }
@@ -0,0 +1,221 @@
+"""
+Fusão de lugares duplicados entre provedores
+"""
+import math
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .config import SearchConfig
+from .geocoding import GeocodingService
+
+METERS_PER_DEGREE = 111320.0
+
+# Provedores equivalentes: a base local é um extrato do OpenStreetMap
+_PROVIDER_FAMILY = {'local': 'openstreetmap'}
+
+# Campos que vêm da SerpAPI no registro fundido
+_SERPAPI_FIELDS = ('rating', 'reviews', 'price', 'open_state')
+
+# Campos de contato preenchidos pelo outro provedor quando vazios
+_CONTACT_FIELDS = ('address', 'phone', 'website')
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Qualificadores comuns em nomes de estabelecimentos, fora os termos das
+# categorias: não distinguem um lugar de outro
+_QUALIFIERS = {'auto', 'centro', 'de', 'da', 'do', 'das', 'dos', 'e', 'ltda', 'me'}
+
+
+def _provider(place: Dict[str, Any]) -> str:
+    """Família do provedor de origem do lugar"""
+    source = place.get('source', '')
+    return _PROVIDER_FAMILY.get(source, source)
+
+
+def _normalize_name(name: str) -> str:
+    """Nome sem acentos, pontuação e espaços repetidos"""
+    return ' '.join(_PUNCTUATION.sub(' ', GeocodingService.normalize_text(name or '')).split())
+
+
+def _generic_words() -> Set[str]:
+    """Palavras dos nomes e termos das categorias, mais os qualificadores"""
+    words = set(_QUALIFIERS)
+    for name, config in SearchConfig.CATEGORIES.items():
+        for term in [name] + config['keywords']:
+            words.update(_normalize_name(term).split())
+    return words
+
+
+_GENERIC_WORDS = _generic_words()
+
+
+def _distinctive(name: str) -> List[str]:
+    """Palavras do nome sem as genéricas (todas, se só houver genéricas)"""
+    tokens = name.split()
+    return [token for token in tokens if token not in _GENERIC_WORDS] or tokens
+
+
+def name_similarity(a: str, b: str) -> float:
+    """
+    Semelhança entre dois nomes normalizados (0 a 1).
+
+    Compara só as palavras que distinguem o lugar, sem termos de categoria
+    e qualificadores: maior valor entre a razão do SequenceMatcher e a
+    fração de palavras em comum sobre o nome mais longo. Assim
+    "Posto Shell" casa com "Auto Posto Shell Centro", mas "Hotel Ibis" não
+    casa com "Hotel Ibis Budget".
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+
+    tokens_a = _distinctive(a)
+    tokens_b = _distinctive(b)
+    shared = len(set(tokens_a) & set(tokens_b))
+    containment = shared / max(len(set(tokens_a)), len(set(tokens_b)))
+    ratio = SequenceMatcher(None, ' '.join(tokens_a), ' '.join(tokens_b)).ratio()
+    return max(containment, ratio)
+
+
+def fuse_places(primary: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Junta dois registros do mesmo lugar.
+
+    O registro do OpenStreetMap é a base (id, nome, tags de categoria,
+    horário); a SerpAPI contribui avaliação, número de avaliações, preço e
+    estado de funcionamento. Contatos vazios são completados pelo outro.
+    """
+    if _provider(other) == 'openstreetmap' and _provider(primary) != 'openstreetmap':
+        primary, other = other, primary
+
+    fused = dict(primary)
+    for field in _CONTACT_FIELDS:
+        if not fused.get(field) and other.get(field):
+            fused[field] = other[field]
+    for field in _SERPAPI_FIELDS:
+        if other.get(field) and not fused.get(field):
+            fused[field] = other[field]
+
+    fused['sources'] = sorted({*primary.get('sources', [primary.get('source', '')]),
+                               *other.get('sources', [other.get('source', '')])})
+    fused['merged_ids'] = sorted({*primary.get('merged_ids', []),
+                                  *other.get('merged_ids', []), other['id']} - {fused['id']})
+    if 'distance' in primary or 'distance' in other:
+        fused['distance'] = min(primary.get('distance', float('inf')),
+                                other.get('distance', float('inf')))
+    return fused
+
+
+class PlaceMerger:
+    """
+    Funde lugares de provedores diferentes que são o mesmo estabelecimento.
+
+    Os lugares são distribuídos numa grade com células do tamanho da
+    distância máxima de fusão; cada lugar só é comparado com os das 9
+    células vizinhas, o que mantém a fusão em O(n). Dois registros são o
+    mesmo lugar se vêm de provedores diferentes, estão a até distance_m
+    metros e os nomes normalizados têm semelhança mínima de similarity.
+
+    Incremental: add() pode ser chamado a cada lote de provedor e retorna
+    os registros novos ou alterados por fusão.
+    """
+
+    def __init__(
+        self,
+        distance_m: float = SearchConfig.MERGE_DISTANCE_M,
+        similarity: float = SearchConfig.MERGE_NAME_SIMILARITY
+    ):
+        self.distance_m = distance_m
+        self.similarity = similarity
+        self._records: List[Dict[str, Any]] = []
+        self._names: List[str] = []
+        self._providers: List[Set[str]] = []
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._lng_scale: Optional[float] = None
+        self.merged = 0
+
+    def _point(self, place: Dict[str, Any]) -> Tuple[float, float]:
+        """Coordenadas do lugar em metros (projeção equirretangular local)"""
+        coords = place.get('coordinates', {})
+        lat = coords.get('lat', 0)
+        lng = coords.get('lon', coords.get('lng', 0))
+        if self._lng_scale is None:
+            # Resultados de uma busca cabem em MAX_RADIUS: uma escala basta
+            self._lng_scale = max(math.cos(math.radians(lat)), 0.01)
+        return lat * METERS_PER_DEGREE, lng * METERS_PER_DEGREE * self._lng_scale
+
+    def _cell(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        """Célula da grade que contém o ponto"""
+        return int(point[0] // self.distance_m), int(point[1] // self.distance_m)
+
+    def _index(self, position: int):
+        """Coloca o registro na célula da sua posição atual"""
+        cell = self._cell(self._point(self._records[position]))
+        self._grid.setdefault(cell, []).append(position)
+
+    def _match(self, place: Dict[str, Any], name: str, provider: str) -> Optional[int]:
+        """Posição do registro mais parecido nas células vizinhas, se houver"""
+        point = self._point(place)
+        row, col = self._cell(point)
+        best = None
+        best_score = 0.0
+        seen = set()
+
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for position in self._grid.get((row + d_row, col + d_col), ()):
+                    if position in seen or provider in self._providers[position]:
+                        continue
+                    seen.add(position)
+
+                    other = self._point(self._records[position])
+                    if math.hypot(point[0] - other[0], point[1] - other[1]) > self.distance_m:
+                        continue
+                    score = name_similarity(name, self._names[position])
+                    if score >= self.similarity and score > best_score:
+                        best = position
+                        best_score = score
+
+        return best
+
+    def add(self, places: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Incorpora um lote e retorna os registros novos ou fundidos"""
+        changed: Dict[int, None] = {}
+
+        for place in places:
+            provider = _provider(place)
+            name = _normalize_name(place.get('name', ''))
+            position = self._match(place, name, provider) if name else None
+
+            if position is None:
+                self._records.append(place)
+                self._names.append(name)
+                self._providers.append({provider})
+                position = len(self._records) - 1
+                self._index(position)
+            else:
+                fused = fuse_places(self._records[position], place)
+                moved = fused['coordinates'] != self._records[position]['coordinates']
+                self._records[position] = fused
+                self._names[position] = _normalize_name(fused.get('name', ''))
+                self._providers[position].add(provider)
+                if moved:
+                    # A entrada antiga na grade continua, mas a distância é conferida
+                    self._index(position)
+                self.merged += 1
+
+            changed[position] = None
+
+        return [self._records[position] for position in changed]
+
+    def places(self) -> List[Dict[str, Any]]:
+        """Todos os registros já fundidos"""
+        return list(self._records)
+
+
+def merge_places(places: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Funde os duplicados entre provedores de uma lista de lugares"""
+    merger = PlaceMerger()
+    merger.add(places)
+    return merger.places()
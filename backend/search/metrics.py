@@ -0,0 +1,138 @@
+"""
+Instrumentação do cache: contadores de acerto e histogramas de latência
+"""
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+from .config import SearchConfig
+
+
+class LatencyHistogram:
+    """Histograma de latências em milissegundos com limites fixos"""
+
+    def __init__(self, bounds: Sequence[float] = SearchConfig.METRICS_LATENCY_BUCKETS_MS):
+        self.bounds = tuple(sorted(bounds))
+        # Último balde recebe tudo acima do maior limite
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms: float):
+        """Registra uma amostra"""
+        index = bisect.bisect_left(self.bounds, elapsed_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Limite superior do balde que contém o percentil pedido"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contagens por balde e percentis aproximados"""
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ['inf']
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class CacheMetrics:
+    """
+    Contadores de resultado das consultas ao cache por classe de chave.
+
+    A classe de chave é (categoria, faixa de raio). Categorias fora de
+    SearchConfig.CATEGORIES (texto livre do cliente) contam juntas em
+    'other', para que o número de classes seja limitado. Os contadores são
+    atualizados a cada operação, então a leitura não consulta o backend.
+    """
+
+    OUTCOMES = ('hit', 'stale', 'miss', 'negative')
+
+    def __init__(self, radius_buckets: Sequence[float] = SearchConfig.METRICS_RADIUS_BUCKETS):
+        self.radius_buckets = tuple(sorted(radius_buckets))
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+        self.totals = dict.fromkeys(self.OUTCOMES, 0)
+        self.writes = 0
+        self._classes: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def radius_bucket(self, radius: float) -> str:
+        """Rótulo da faixa de raio (ex.: 'le_5km')"""
+        index = bisect.bisect_left(self.radius_buckets, radius)
+        if index < len(self.radius_buckets):
+            return f"le_{self.radius_buckets[index]:g}km"
+        return f"gt_{self.radius_buckets[-1]:g}km"
+
+    @staticmethod
+    def category_class(category: str) -> str:
+        """Categoria da classe de chave: conhecida, '' (sem categoria) ou 'other'"""
+        if not category:
+            return ''
+        return category if category in SearchConfig.CATEGORIES else 'other'
+
+    def record_lookup(self, category: str, radius: float, outcome: str,
+                      elapsed_ms: Optional[float] = None):
+        """Registra o resultado de uma consulta e, se informada, sua latência"""
+        key = (self.category_class(category), self.radius_bucket(radius))
+        with self._lock:
+            counters = self._classes.get(key)
+            if counters is None:
+                counters = self._classes[key] = dict.fromkeys(self.OUTCOMES, 0)
+            counters[outcome] += 1
+            self.totals[outcome] += 1
+        if elapsed_ms is not None:
+            self.get_latency.observe(elapsed_ms)
+
+    def record_write(self, elapsed_ms: float):
+        """Registra a latência de uma gravação"""
+        with self._lock:
+            self.writes += 1
+        self.set_latency.observe(elapsed_ms)
+
+    @staticmethod
+    def _ratios(counters: Dict[str, int]) -> Dict[str, Any]:
+        """Acrescenta a taxa de acerto (frescos + velhos) aos contadores"""
+        lookups = counters['hit'] + counters['stale'] + counters['miss']
+        served = counters['hit'] + counters['stale']
+        return {
+            **counters,
+            'hit_ratio': round(served / lookups, 4) if lookups else 0.0
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores por classe de chave e histogramas"""
+        with self._lock:
+            classes = {key: dict(counters) for key, counters in self._classes.items()}
+            totals = dict(self.totals)
+
+        by_category: Dict[str, Dict[str, Any]] = {}
+        for (category, bucket), counters in sorted(classes.items()):
+            by_category.setdefault(category or '_', {})[bucket] = self._ratios(counters)
+
+        return {
+            **self._ratios(totals),
+            'writes': self.writes,
+            'by_category': by_category,
+            'get_latency': self.get_latency.get_stats(),
+            'set_latency': self.set_latency.get_stats()
+        }
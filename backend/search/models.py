@@ -2,7 +2,7 @@
 Modelos de dados para o sistema de busca
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
 
@@ -31,6 +31,12 @@ class Place(BaseModel):
         None, description="Estado de funcionamento")
     source: str = Field(..., description="Fonte dos dados")
     category: Optional[str] = Field(None, description="Categoria do lugar")
+    sources: Optional[List[str]] = Field(
+        None, description="Provedores cujos registros foram fundidos neste lugar")
+    merged_ids: Optional[List[str]] = Field(
+        None, description="IDs de registros de outros provedores absorvidos por este")
+    route_km: Optional[float] = Field(
+        None, description="Posição ao longo da rota, em km (busca por corredor)")
 
 
 class SearchRequest(BaseModel):
@@ -40,18 +46,93 @@ class SearchRequest(BaseModel):
     radius: int = Field(5, ge=1, le=50, description="Raio de busca em km")
     category: Optional[str] = Field(None, description="Categoria específica")
     use_cache: bool = Field(True, description="Usar cache")
+    budget_ms: Optional[int] = Field(
+        None, ge=0, le=60000,
+        description="Tempo máximo de espera pelos provedores (0 = esperar todos)")
 
 
 class SearchResponse(BaseModel):
     """Resposta de busca"""
     success: bool = Field(..., description="Status da operação")
     data: List[Place] = Field(..., description="Lista de lugares encontrados")
-    cached: bool = Field(False, description="Dados vieram do cache")
+    cached: Union[bool, str] = Field(
+        False,
+        description="Dados vieram do cache (\"stale\" se velhos, \"negative\" se "
+                    "busca vazia ou falha recente das APIs)")
     source: str = Field(..., description="Fonte dos dados")
     total_results: int = Field(..., description="Total de resultados")
     query: str = Field(..., description="Query original")
     coordinates: Coordinates = Field(..., description="Coordenadas da busca")
     radius: int = Field(..., description="Raio usado na busca")
+    partial: bool = Field(
+        False, description="Algum provedor não respondeu dentro do orçamento")
+    sources: Optional[Dict[str, List[str]]] = Field(
+        None, description="Provedores incluídos, pendentes e com falha")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor da próxima página (GET /search?cursor=)")
+    offset: Optional[int] = Field(
+        None, description="Posição da página no conjunto de resultados")
+
+
+class SearchStreamFrame(BaseModel):
+    """Quadro da busca em streaming (uma linha NDJSON)"""
+    type: str = Field(..., description="cache, results, error ou done")
+    provider: Optional[str] = Field(None, description="Provedor do quadro results/error")
+    data: Optional[List[Place]] = Field(
+        None, description="Lugares ainda não enviados, ordenados por distância")
+    cached: Optional[Union[bool, str]] = Field(None, description="Origem no cache (cache/done)")
+    skipped: Optional[bool] = Field(None, description="Provedor pulado por circuito aberto")
+    message: Optional[str] = Field(None, description="Mensagem de erro")
+    total_results: Optional[int] = Field(None, description="Total de lugares enviados (done)")
+    partial: Optional[bool] = Field(None, description="Algum provedor ficou de fora (done)")
+    sources: Optional[Dict[str, List[str]]] = Field(None, description="Fontes por situação (done)")
+    elapsed_ms: Optional[float] = Field(None, description="Tempo até o quadro final (done)")
+
+
+class BatchSearchItem(BaseModel):
+    """Item de uma busca em lote"""
+    query: str = Field(..., min_length=1, description="Termo de busca")
+    lat: float = Field(..., ge=-90, le=90, description="Latitude")
+    lng: float = Field(..., ge=-180, le=180, description="Longitude")
+    radius: int = Field(5, ge=1, le=50, description="Raio de busca em km")
+    category: Optional[str] = Field(None, description="Categoria específica")
+
+
+class BatchSearchRequest(BaseModel):
+    """Requisição de busca em lote (ex.: paradas de uma rota)"""
+    items: List[BatchSearchItem] = Field(
+        ..., min_length=1, max_length=100, description="Buscas do lote")
+    use_cache: bool = Field(True, description="Usar cache")
+
+
+class CorridorSearchRequest(BaseModel):
+    """Requisição de busca ao longo de uma rota"""
+    query: str = Field(..., min_length=1, description="Termo de busca")
+    polyline: str = Field(..., min_length=1, description="Rota como polilinha codificada (Google)")
+    precision: int = Field(5, ge=5, le=6, description="Casas decimais da polilinha (6 no OSRM)")
+    buffer_km: float = Field(
+        2, gt=0, le=10, description="Distância máxima até a rota, em km, de cada lado")
+    category: Optional[str] = Field(None, description="Categoria específica")
+    use_cache: bool = Field(True, description="Usar cache")
+
+
+class BatchSearchResponse(BaseModel):
+    """Resposta da busca em lote"""
+    success: bool = Field(..., description="Status da operação")
+    results: List[Dict[str, Any]] = Field(
+        ..., description="Resultado de cada item, na ordem da requisição")
+    stats: Dict[str, int] = Field(
+        ..., description="Itens, acertos de cache e áreas buscadas nas APIs")
+
+
+class NearestResponse(BaseModel):
+    """Resposta da consulta de vizinhos mais próximos"""
+    success: bool = Field(..., description="Status da operação")
+    category: str = Field(..., description="Categoria consultada")
+    data: List[Place] = Field(..., description="Lugares do mais próximo ao mais distante")
+    total_results: int = Field(..., description="Número de lugares retornados")
+    indexed: int = Field(..., description="Lugares da categoria no índice")
+    query_ms: float = Field(..., description="Tempo da consulta ao índice em ms")
 
 
 class AutocompleteRequest(BaseModel):
@@ -80,6 +161,8 @@ class AutocompleteResponse(BaseModel):
 class CategoryInfo(BaseModel):
     """Informações de uma categoria"""
     keywords: List[str] = Field(..., description="Palavras-chave da categoria")
+    osm_tags: Dict[str, List[str]] = Field(
+        default_factory=dict, description="Tags OSM usadas na busca Overpass")
     radius: int = Field(..., description="Raio padrão em km")
     priority: int = Field(..., description="Prioridade da categoria")
 
@@ -109,11 +192,21 @@ class ErrorResponse(BaseModel):
 
 class CacheStats(BaseModel):
     """Estatísticas do cache"""
-    total_entries: int = Field(..., description="Total de entradas")
-    active_entries: int = Field(..., description="Entradas ativas")
-    expired_entries: int = Field(..., description="Entradas expiradas")
-    category_stats: Dict[str,
-                         int] = Field(..., description="Estatísticas por categoria")
+    backend: str = Field(..., description="Backend de armazenamento")
+    total_entries: Optional[int] = Field(
+        None, description="Total de entradas (só com detailed)")
+    active_entries: Optional[int] = Field(
+        None, description="Entradas ativas (só com detailed)")
+    expired_entries: Optional[int] = Field(
+        None, description="Entradas expiradas (só com detailed)")
+    category_stats: Optional[Dict[str, int]] = Field(
+        None, description="Entradas por categoria (só com detailed)")
+    metrics: Optional[Dict[str, Any]] = Field(
+        None, description="Acertos por categoria/faixa de raio e latências")
+    memory: Optional[Dict[str, Any]] = Field(
+        None, description="Estatísticas do cache em memória (LRU)")
+    negative: Optional[Dict[str, Dict[str, int]]] = Field(
+        None, description="Acertos e gravações do cache negativo por motivo")
 
 
 class ClientStats(BaseModel):
@@ -135,10 +228,23 @@ class StatsResponse(BaseModel):
     success: bool = Field(..., description="Status da operação")
     cache: CacheStats = Field(..., description="Estatísticas do cache")
     client: ClientStats = Field(..., description="Estatísticas do cliente")
+    janitor: Optional[Dict[str, Any]] = Field(
+        None, description="Estatísticas da manutenção do cache")
+    http: Optional[Dict[str, Any]] = Field(
+        None, description="Latência das APIs externas por host (conexões quentes/frias)")
+    poi_store: Optional[Dict[str, Any]] = Field(
+        None, description="Regiões e POIs da base local")
+    poi_updater: Optional[Dict[str, Any]] = Field(
+        None, description="Atualizações incrementais da base local")
 
 
 class HealthCheck(BaseModel):
     """Verificação de saúde"""
     status: str = Field(..., description="Status do serviço")
     timestamp: float = Field(..., description="Timestamp da verificação")
-    services: Dict[str, str] = Field(..., description="Status dos serviços")
+    services: Dict[str, str] = Field(
+        ..., description="Status dos serviços; provedores externos com o estado do circuit breaker")
+    providers: Optional[Dict[str, Dict[str, Any]]] = Field(
+        None, description="Taxa de erro, latência e estado do circuito por provedor")
+    probes: Optional[Dict[str, Any]] = Field(
+        None, description="Sondas de recuperação dos circuitos abertos")
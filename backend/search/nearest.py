@@ -0,0 +1,476 @@
+"""
+Vizinhos mais próximos por categoria (índice espacial em memória)
+"""
+import asyncio
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from .config import SearchConfig
+from .geocoding import EARTH_RADIUS_KM
+from .poi_store import POIStore
+
+# Pontos por folha da árvore: folhas maiores reduzem os nós na construção
+_LEAF_SIZE = 16
+
+# Vetor unitário (x, y, z) de um ponto da esfera
+Vector = Tuple[float, float, float]
+
+
+def unit_vector(lat: float, lng: float) -> Vector:
+    """Coordenadas 3D do ponto na esfera de raio 1"""
+    phi = math.radians(lat)
+    theta = math.radians(lng)
+    return (math.cos(phi) * math.cos(theta), math.cos(phi) * math.sin(theta), math.sin(phi))
+
+
+def chord_to_km(chord_sq: float) -> float:
+    """Distância sobre a superfície a partir do quadrado da corda"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+class KDTree:
+    """
+    KD-tree estática sobre vetores unitários da esfera.
+
+    A distância euclidiana entre os vetores (corda) cresce com a distância
+    sobre a superfície, então os k mais próximos pela corda são os k mais
+    próximos de fato, sem raio e sem casos especiais no antimeridiano ou
+    nos polos. Cada nó divide pela mediana do eixo de maior amplitude;
+    as folhas guardam até _LEAF_SIZE pontos.
+    """
+
+    def __init__(self, vectors: List[Vector], items: List[Any]):
+        self.vectors = vectors
+        self.items = items
+        # Nós em listas paralelas: eixo (-1 nas folhas), corte, filhos e pontos
+        self._axis: List[int] = []
+        self._split: List[float] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._members: List[Optional[List[int]]] = []
+
+        if vectors:
+            coords = np.asarray(vectors, dtype=np.float64) if np is not None else None
+            self._build(list(range(len(vectors))), coords)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _node(self, axis: int, split: float, members: Optional[List[int]]) -> int:
+        """Cria um nó e retorna sua posição"""
+        self._axis.append(axis)
+        self._split.append(split)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._members.append(members)
+        return len(self._axis) - 1
+
+    def _build(self, indices: List[int], coords: Any) -> int:
+        """Monta a subárvore dos índices e retorna a raiz"""
+        if len(indices) <= _LEAF_SIZE:
+            return self._node(-1, 0.0, indices)
+
+        if coords is not None:
+            points = coords[indices]
+            axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+            middle = len(indices) // 2
+            order = np.argpartition(points[:, axis], middle)
+            ordered = [indices[position] for position in order.tolist()]
+        else:
+            axis = max(range(3), key=lambda a: (
+                max(self.vectors[i][a] for i in indices) -
+                min(self.vectors[i][a] for i in indices)))
+            middle = len(indices) // 2
+            ordered = sorted(indices, key=lambda i: self.vectors[i][axis])
+
+        node = self._node(axis, self.vectors[ordered[middle]][axis], None)
+        left = self._build(ordered[:middle], coords)
+        right = self._build(ordered[middle:], coords)
+        self._left[node] = left
+        self._right[node] = right
+        return node
+
+    def query(self, vector: Vector, k: int,
+              accept: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, Any]]:
+        """
+        Os k itens mais próximos como (corda ao quadrado, item), do mais
+        próximo ao mais distante. accept descarta itens (ex.: obsoletos)
+        durante a busca, sem pedir mais que k.
+        """
+        if not self.vectors or k <= 0:
+            return []
+
+        # Heap de máximo pelo negativo da distância; o índice desempata
+        heap: List[Tuple[float, int]] = []
+        qx, qy, qz = vector
+        # Pilha de (nó, distância ao quadrado até o plano de corte que o separa)
+        stack: List[Tuple[int, float]] = [(0, 0.0)]
+
+        while stack:
+            node, bound = stack.pop()
+            if len(heap) == k and bound >= -heap[0][0]:
+                continue
+
+            axis = self._axis[node]
+            if axis < 0:
+                for index in self._members[node]:
+                    x, y, z = self.vectors[index]
+                    distance = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if len(heap) < k:
+                        if accept is None or accept(self.items[index]):
+                            heapq.heappush(heap, (-distance, index))
+                    elif distance < -heap[0][0]:
+                        if accept is None or accept(self.items[index]):
+                            heapq.heapreplace(heap, (-distance, index))
+                continue
+
+            diff = vector[axis] - self._split[node]
+            if diff < 0:
+                near, far = self._left[node], self._right[node]
+            else:
+                near, far = self._right[node], self._left[node]
+            # O lado próximo sai primeiro da pilha; o distante é podado se o
+            # plano já estiver mais longe que o k-ésimo vizinho
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        return [(-distance, self.items[index]) for distance, index in sorted(heap, reverse=True)]
+
+
+class NearestIndex:
+    """
+    Índice de vizinhos mais próximos de uma categoria.
+
+    Os lugares ficam numa KD-tree estática mais um buffer de inserções
+    recentes percorrido linearmente. Um lugar alterado ou removido deixa a
+    entrada antiga da árvore obsoleta (a consulta a ignora pela versão);
+    quando o buffer passa de buffer_size ou as obsoletas passam de
+    stale_ratio da árvore, needs_rebuild indica que a árvore deve ser
+    reconstruída com rebuild().
+
+    Lugares incluídos com ttl (vindos de buscas) expiram como as entradas
+    do cache e são no máximo max_transient, saindo primeiro os vistos há
+    mais tempo; os da base local (sem ttl) ficam até serem removidos.
+    """
+
+    def __init__(
+        self,
+        category: str,
+        buffer_size: int = SearchConfig.NEAREST_BUFFER_SIZE,
+        stale_ratio: float = SearchConfig.NEAREST_STALE_RATIO,
+        max_transient: int = SearchConfig.NEAREST_SEARCH_MAX_PLACES
+    ):
+        self.category = category
+        self.buffer_size = buffer_size
+        self.stale_ratio = stale_ratio
+        self.max_transient = max_transient
+
+        self._places: Dict[str, Dict[str, Any]] = {}
+        self._vectors: Dict[str, Vector] = {}
+        self._versions: Dict[str, int] = {}
+        # Itens da árvore: (id, versão); o buffer guarda só ids
+        self._tree = KDTree([], [])
+        self._tree_versions: Dict[str, int] = {}
+        self._buffer: Set[str] = set()
+        self._stale = 0
+        # Lugares com prazo: id -> expiração, do visto há mais tempo ao mais recente
+        self._expiry: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+        self.rebuilding = False
+        self.rebuilds = 0
+        self.last_rebuild_ms = 0.0
+        self.queries = 0
+        self.total_query_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """Buffer cheio ou árvore com obsoletas demais"""
+        return (len(self._buffer) > self.buffer_size or
+                self._stale > self.stale_ratio * max(len(self._tree), 1))
+
+    def _mark_stale(self, place_id: str):
+        """Conta a entrada da árvore do lugar como obsoleta (com o lock adquirido)"""
+        if (place_id in self._tree_versions and
+                self._tree_versions[place_id] == self._versions.get(place_id)):
+            self._stale += 1
+
+    def add(self, places: Iterable[Dict[str, Any]], ttl: Optional[float] = None) -> int:
+        """
+        Inclui ou atualiza lugares; retorna quantos mudaram de posição.
+
+        Com ttl o lugar expira depois de ttl segundos sem ser visto de novo,
+        a menos que já esteja no índice sem prazo (base local); sem ttl ele
+        passa a não expirar.
+        """
+        moved = 0
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            for place in places:
+                place_id = place.get('id')
+                coords = place.get('coordinates') or {}
+                lat = coords.get('lat')
+                lng = coords.get('lon', coords.get('lng'))
+                if not place_id or lat is None or lng is None:
+                    continue
+
+                # A distância de uma busca anterior não vale para o índice
+                stored = {key: value for key, value in place.items()
+                          if key not in ('distance', 'route_km')}
+                if ttl is None:
+                    self._expiry.pop(place_id, None)
+                elif place_id in self._expiry or place_id not in self._places:
+                    self._expiry[place_id] = now + ttl
+                    self._expiry.move_to_end(place_id)
+
+                vector = unit_vector(lat, lng)
+                if self._vectors.get(place_id) == vector:
+                    self._places[place_id] = stored
+                    continue
+
+                self._mark_stale(place_id)
+                self._places[place_id] = stored
+                self._vectors[place_id] = vector
+                self._versions[place_id] = self._versions.get(place_id, 0) + 1
+                self._buffer.add(place_id)
+                moved += 1
+
+            while len(self._expiry) > self.max_transient:
+                place_id, _ = self._expiry.popitem(last=False)
+                self._remove(place_id)
+                self.evicted += 1
+        return moved
+
+    def remove(self, place_ids: Iterable[str]) -> int:
+        """Remove lugares; retorna quantos estavam no índice"""
+        removed = 0
+        with self._lock:
+            for place_id in place_ids:
+                if place_id not in self._places:
+                    continue
+                self._expiry.pop(place_id, None)
+                self._remove(place_id)
+                removed += 1
+        return removed
+
+    def _remove(self, place_id: str):
+        """Tira um lugar do índice (com o lock adquirido)"""
+        self._mark_stale(place_id)
+        del self._places[place_id]
+        del self._vectors[place_id]
+        self._versions[place_id] += 1
+        self._buffer.discard(place_id)
+
+    def _expire(self, now: float):
+        """
+        Remove os lugares com prazo vencido (com o lock adquirido); o prazo
+        é o mesmo para todos, então os vencidos estão no início da fila
+        """
+        while self._expiry:
+            place_id, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            del self._expiry[place_id]
+            self._remove(place_id)
+            self.expired += 1
+
+    def rebuild(self):
+        """
+        Reconstrói a árvore com todos os lugares atuais.
+
+        A construção acontece fora do lock; o que chegar durante ela fica
+        no buffer da nova árvore.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            snapshot = [(place_id, self._versions[place_id], vector)
+                        for place_id, vector in self._vectors.items()]
+
+        tree = KDTree([vector for _, _, vector in snapshot],
+                      [(place_id, version) for place_id, version, _ in snapshot])
+        tree_versions = {place_id: version for place_id, version, _ in snapshot}
+
+        with self._lock:
+            self._tree = tree
+            self._tree_versions = tree_versions
+            self._buffer = {place_id for place_id in self._places
+                            if tree_versions.get(place_id) != self._versions[place_id]}
+            self._stale = sum(1 for place_id, version in tree_versions.items()
+                              if self._versions.get(place_id) != version)
+            # Versões de lugares removidos só servem para descartar entradas
+            # da árvore; fora dela podem ser esquecidas
+            self._versions = {place_id: version for place_id, version in self._versions.items()
+                              if place_id in self._places or place_id in tree_versions}
+            self.rebuilds += 1
+            self.last_rebuild_ms = (time.perf_counter() - started) * 1000
+
+    def query(self, lat: float, lng: float, k: int) -> List[Dict[str, Any]]:
+        """Os k lugares mais próximos do ponto, com 'distance' em km"""
+        started = time.perf_counter()
+        vector = unit_vector(lat, lng)
+        with self._lock:
+            self._expire(time.time())
+            versions = self._versions
+            found = self._tree.query(
+                vector, k, accept=lambda item: versions.get(item[0]) == item[1])
+            candidates = [(distance, place_id) for distance, (place_id, _) in found]
+
+            qx, qy, qz = vector
+            for place_id in self._buffer:
+                x, y, z = self._vectors[place_id]
+                candidates.append(((x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2, place_id))
+
+            nearest = heapq.nsmallest(k, candidates)
+            places = [{**self._places[place_id], 'distance': round(chord_to_km(distance), 2)}
+                      for distance, place_id in nearest]
+
+        self.queries += 1
+        self.total_query_ms += (time.perf_counter() - started) * 1000
+        return places
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamanho, buffer, obsoletas e tempos do índice"""
+        return {
+            'places': len(self._places),
+            'tree': len(self._tree),
+            'buffer': len(self._buffer),
+            'stale': self._stale,
+            'transient': len(self._expiry),
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'rebuilds': self.rebuilds,
+            'last_rebuild_ms': round(self.last_rebuild_ms, 3),
+            'queries': self.queries,
+            'avg_query_ms': round(self.total_query_ms / self.queries, 4) if self.queries else 0.0
+        }
+
+
+class NearestService:
+    """
+    Índices de vizinhos mais próximos por categoria.
+
+    Cada índice é carregado da base local de POIs na primeira consulta da
+    categoria e recebe depois os lugares das buscas concluídas (com o prazo
+    do cache) e as alterações do atualizador da base. Reconstruções rodam
+    numa thread quando há event loop, sem bloquear as consultas.
+    """
+
+    def __init__(self, poi_store: Optional[POIStore] = None):
+        self.poi_store = poi_store
+        self.indexes: Dict[str, NearestIndex] = {}
+        self._loaded: Set[str] = set()
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    def _index(self, category: str) -> NearestIndex:
+        """Índice da categoria, criado vazio se preciso"""
+        index = self.indexes.get(category)
+        if index is None:
+            index = self.indexes[category] = NearestIndex(category)
+        return index
+
+    async def _ensure_loaded(self, category: str) -> NearestIndex:
+        """Carrega a categoria da base local uma única vez"""
+        index = self._index(category)
+        if category in self._loaded:
+            return index
+
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if category not in self._loaded:
+                if self.poi_store is not None:
+                    places = await asyncio.to_thread(self.poi_store.get_category, category)
+                    index.add(places)
+                await asyncio.to_thread(index.rebuild)
+                self._loaded.add(category)
+        return index
+
+    async def nearest(self, category: str, lat: float, lng: float,
+                      k: int = SearchConfig.NEAREST_DEFAULT_K) -> Dict[str, Any]:
+        """Os k lugares da categoria mais próximos do ponto, sem limite de raio"""
+        if category not in SearchConfig.CATEGORIES:
+            return {
+                'success': False,
+                'error': f'Categoria "{category}" não encontrada'
+            }
+
+        index = await self._ensure_loaded(category)
+        started = time.perf_counter()
+        places = index.query(lat, lng, k)
+        # Lugares expirados na consulta deixam entradas obsoletas na árvore
+        self._maybe_rebuild(index)
+        return {
+            'success': True,
+            'category': category,
+            'data': places,
+            'total_results': len(places),
+            'indexed': len(index),
+            'query_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def add_places(self, places: Iterable[Dict[str, Any]], category: str = '',
+                   ttl: Optional[float] = None):
+        """
+        Inclui lugares nos índices das suas categorias.
+
+        Lugares sem categoria própria ficam na categoria da busca; os que
+        não pertencem a nenhuma categoria conhecida são ignorados. ttl é o
+        prazo de lugares vindos de buscas; sem ele (base local) não expiram.
+        """
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for place in places:
+            place_category = place.get('category') or category
+            if place_category in SearchConfig.CATEGORIES:
+                by_category.setdefault(place_category, []).append(place)
+
+        for place_category, category_places in by_category.items():
+            index = self._index(place_category)
+            index.add(category_places, ttl)
+            self._maybe_rebuild(index)
+
+    def remove_places(self, place_ids: Iterable[str]):
+        """Remove lugares de todos os índices"""
+        place_ids = list(place_ids)
+        for index in list(self.indexes.values()):
+            if index.remove(place_ids):
+                self._maybe_rebuild(index)
+
+    def _maybe_rebuild(self, index: NearestIndex):
+        """Reconstrói o índice se necessário, numa thread quando há event loop"""
+        if not index.needs_rebuild or index.rebuilding:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Chamado de uma thread de trabalho: reconstrói ali mesmo
+            index.rebuild()
+            return
+
+        index.rebuilding = True
+
+        def finished(_):
+            index.rebuilding = False
+            self._background_tasks.discard(task)
+
+        task = loop.create_task(asyncio.to_thread(index.rebuild))
+        self._background_tasks.add(task)
+        task.add_done_callback(finished)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de cada índice"""
+        return {category: index.get_stats() for category, index in self.indexes.items()}
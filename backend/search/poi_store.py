@@ -0,0 +1,619 @@
+"""
+Base local de pontos de interesse (POIs) com índice espacial R*Tree
+
+Uso da linha de comando (a partir de backend/):
+    python -m search.poi_store import data/sp.json --region SP
+    python -m search.poi_store import data/df.osm --region DF --bbox -16.05,-48.29,-15.50,-47.31
+    python -m search.poi_store update --region SP
+    python -m search.poi_store apply-changes data/minutely.osc
+    python -m search.poi_store stats
+"""
+import argparse
+import asyncio
+import json
+import math
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .config import SearchConfig
+from .database import get_connection_manager
+from .geocoding import GeocodingService
+
+
+# Quilômetros por grau de latitude
+KM_PER_DEGREE = 111.32
+
+# (sul, oeste, norte, leste)
+BBox = Tuple[float, float, float, float]
+
+
+class POIStore:
+    """
+    POIs do OpenStreetMap importados por região.
+
+    Cada POI é uma linha de 'poi' (colunas de tags usadas nos filtros e as
+    tags completas em JSON) com uma entrada no R*Tree 'poi_rtree'. A tabela
+    'poi_regions' guarda o retângulo de cada região importada e a data da
+    última sincronização; buscas fora dessas regiões vão para o Overpass.
+    """
+
+    def __init__(self, db_path: str = SearchConfig.POI_STORE_PATH):
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+        self.has_rtree = True
+        self.queries = 0
+        self.total_query_ms = 0.0
+        self.init_tables()
+
+    def init_tables(self):
+        """Cria as tabelas e o índice espacial se não existirem"""
+        conn = self.db.get_connection()
+
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS poi (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    osm_type TEXT NOT NULL,
+                    osm_id INTEGER NOT NULL,
+                    name TEXT,
+                    name_normalized TEXT,
+                    category TEXT,
+                    amenity TEXT,
+                    lat REAL NOT NULL,
+                    lng REAL NOT NULL,
+                    address TEXT,
+                    phone TEXT,
+                    website TEXT,
+                    opening_hours TEXT,
+                    tags TEXT,
+                    region TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (osm_type, osm_id)
+                )
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_poi_category ON poi (category)
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_poi_region ON poi (region)
+            ''')
+
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS poi_regions (
+                    name TEXT PRIMARY KEY,
+                    min_lat REAL NOT NULL,
+                    min_lng REAL NOT NULL,
+                    max_lat REAL NOT NULL,
+                    max_lng REAL NOT NULL,
+                    poi_count INTEGER DEFAULT 0,
+                    osm_base TEXT,
+                    last_sync TIMESTAMP
+                )
+            ''')
+
+            try:
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS poi_rtree USING rtree (
+                        id, min_lat, max_lat, min_lng, max_lng
+                    )
+                ''')
+            except sqlite3.OperationalError:
+                # SQLite compilado sem R*Tree: índice B-tree nas coordenadas
+                self.has_rtree = False
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_poi_location ON poi (lat, lng)
+                ''')
+
+    @staticmethod
+    def bounding_box(lat: float, lng: float, radius: float) -> BBox:
+        """Retângulo que contém o círculo de raio radius km"""
+        dlat = radius / KM_PER_DEGREE
+        dlng = radius / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        return (lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+
+    def upsert_elements(self, elements: Iterable[Dict[str, Any]],
+                        region: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Insere ou atualiza elementos no formato JSON do Overpass.
+
+        Só elementos com tags de alguma categoria de SearchConfig são
+        guardados. Retorna (gravados, ignorados).
+        """
+        stored = 0
+        skipped = 0
+        conn = self.db.get_connection()
+
+        with conn:
+            for element in elements:
+                place = GeocodingService._parse_element(element)
+                if place is None or not place['category']:
+                    skipped += 1
+                    continue
+                self._upsert(conn, element, place, region)
+                stored += 1
+
+        return stored, skipped
+
+    def _upsert(self, conn: sqlite3.Connection, element: Dict[str, Any],
+                place: Dict[str, Any], region: Optional[str]):
+        """Grava um POI e sua entrada no índice espacial"""
+        lat = place['coordinates']['lat']
+        lng = place['coordinates']['lon']
+        conn.execute('''
+            INSERT INTO poi
+            (osm_type, osm_id, name, name_normalized, category, amenity, lat, lng,
+             address, phone, website, opening_hours, tags, region, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT (osm_type, osm_id) DO UPDATE SET
+                name = excluded.name,
+                name_normalized = excluded.name_normalized,
+                category = excluded.category,
+                amenity = excluded.amenity,
+                lat = excluded.lat,
+                lng = excluded.lng,
+                address = excluded.address,
+                phone = excluded.phone,
+                website = excluded.website,
+                opening_hours = excluded.opening_hours,
+                tags = excluded.tags,
+                region = COALESCE(excluded.region, poi.region),
+                updated_at = excluded.updated_at
+        ''', (
+            element['type'], element['id'], place['name'],
+            GeocodingService.normalize_text(element['tags'].get('name', '')),
+            place['category'], place['amenity'], lat, lng,
+            place['address'], place['phone'], place['website'],
+            place['opening_hours'], json.dumps(element['tags'], ensure_ascii=False),
+            region
+        ))
+
+        if self.has_rtree:
+            poi_id = conn.execute(
+                'SELECT id FROM poi WHERE osm_type = ? AND osm_id = ?',
+                (element['type'], element['id'])).fetchone()[0]
+            conn.execute(
+                'INSERT OR REPLACE INTO poi_rtree VALUES (?, ?, ?, ?, ?)',
+                (poi_id, lat, lat, lng, lng))
+
+    def delete_elements(self, keys: Iterable[Tuple[str, int]]) -> int:
+        """Remove POIs por (osm_type, osm_id)"""
+        deleted = 0
+        conn = self.db.get_connection()
+
+        with conn:
+            for osm_type, osm_id in keys:
+                row = conn.execute(
+                    'SELECT id FROM poi WHERE osm_type = ? AND osm_id = ?',
+                    (osm_type, osm_id)).fetchone()
+                if row is None:
+                    continue
+                conn.execute('DELETE FROM poi WHERE id = ?', (row[0],))
+                if self.has_rtree:
+                    conn.execute('DELETE FROM poi_rtree WHERE id = ?', (row[0],))
+                deleted += 1
+
+        return deleted
+
+    def set_region(self, name: str, bbox: BBox, osm_base: Optional[str] = None):
+        """Registra (ou atualiza) uma região importada e sua sincronização"""
+        conn = self.db.get_connection()
+        with conn:
+            poi_count = conn.execute(
+                'SELECT COUNT(*) FROM poi WHERE region = ?', (name,)).fetchone()[0]
+            conn.execute('''
+                INSERT OR REPLACE INTO poi_regions
+                (name, min_lat, min_lng, max_lat, max_lng, poi_count, osm_base, last_sync)
+                VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ''', (name, *bbox, poi_count, osm_base))
+
+    def set_watermark(self, name: str, osm_base: Optional[str]):
+        """
+        Avança a marca de sincronização (osm_base) e atualiza a contagem da
+        região; uma marca mais antiga que a atual é ignorada
+        """
+        conn = self.db.get_connection()
+        with conn:
+            conn.execute('''
+                UPDATE poi_regions
+                SET osm_base = CASE
+                        WHEN osm_base IS NULL OR ? > osm_base THEN ? ELSE osm_base
+                    END,
+                    poi_count = (SELECT COUNT(*) FROM poi WHERE region = ?),
+                    last_sync = datetime('now')
+                WHERE name = ?
+            ''', (osm_base, osm_base, name, name))
+
+    def get_region(self, name: str) -> Optional[Dict[str, Any]]:
+        """Região importada pelo nome"""
+        for region in self.get_regions():
+            if region['name'] == name:
+                return region
+        return None
+
+    def region_for_point(self, lat: float, lng: float) -> Optional[str]:
+        """Primeira região importada que contém o ponto"""
+        conn = self.db.get_connection()
+        row = conn.execute('''
+            SELECT name FROM poi_regions
+            WHERE min_lat <= ? AND max_lat >= ? AND min_lng <= ? AND max_lng >= ?
+            ORDER BY name
+            LIMIT 1
+        ''', (lat, lat, lng, lng)).fetchone()
+        return row[0] if row else None
+
+    def get_location(self, osm_type: str, osm_id: int) -> Optional[Tuple[float, float]]:
+        """Coordenadas guardadas de um POI"""
+        conn = self.db.get_connection()
+        row = conn.execute(
+            'SELECT lat, lng FROM poi WHERE osm_type = ? AND osm_id = ?',
+            (osm_type, osm_id)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_locations(self, keys: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Tuple[float, float]]:
+        """
+        Coordenadas guardadas dos POIs existentes entre as chaves
+        (osm_type, osm_id)
+        """
+        return {(osm_type, osm_id): (lat, lng)
+                for osm_type, osm_id, lat, lng in self._select_keys('lat, lng', keys)}
+
+    def get_poi_regions(self, keys: Iterable[Tuple[str, int]]) -> Set[str]:
+        """Regiões dos POIs existentes entre as chaves (osm_type, osm_id)"""
+        return {region for _, _, region in self._select_keys('region', keys) if region}
+
+    def _select_keys(self, columns: str, keys: Iterable[Tuple[str, int]]) -> Iterator[Tuple]:
+        """Linhas (osm_type, osm_id, colunas...) das chaves, em consultas de até 500 ids"""
+        by_type: Dict[str, List[int]] = {}
+        for osm_type, osm_id in keys:
+            by_type.setdefault(osm_type, []).append(osm_id)
+
+        conn = self.db.get_connection()
+        for osm_type, ids in by_type.items():
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(f'''
+                    SELECT osm_type, osm_id, {columns} FROM poi
+                    WHERE osm_type = ? AND osm_id IN ({placeholders})
+                ''', (osm_type, *chunk)).fetchall()
+                yield from rows
+
+    def get_regions(self) -> List[Dict[str, Any]]:
+        """Regiões importadas"""
+        conn = self.db.get_connection()
+        rows = conn.execute('''
+            SELECT name, min_lat, min_lng, max_lat, max_lng, poi_count, osm_base, last_sync
+            FROM poi_regions
+            ORDER BY name
+        ''').fetchall()
+
+        return [
+            {
+                'name': name,
+                'bbox': [min_lat, min_lng, max_lat, max_lng],
+                'poi_count': poi_count,
+                'osm_base': osm_base,
+                'last_sync': last_sync
+            }
+            for name, min_lat, min_lng, max_lat, max_lng, poi_count, osm_base, last_sync
+            in rows
+        ]
+
+    def covers(self, lat: float, lng: float, radius: float) -> bool:
+        """Indica se alguma região importada contém o círculo inteiro"""
+        south, west, north, east = self.bounding_box(lat, lng, radius)
+        conn = self.db.get_connection()
+        row = conn.execute('''
+            SELECT 1 FROM poi_regions
+            WHERE min_lat <= ? AND max_lat >= ? AND min_lng <= ? AND max_lng >= ?
+            LIMIT 1
+        ''', (south, north, west, east)).fetchone()
+        return row is not None
+
+    def search(self, lat: float, lng: float, radius: float, query: str = '',
+               category: str = '',
+               limit: int = SearchConfig.MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Busca POIs no raio, do mais próximo ao mais distante.
+
+        Segue as regras da query Overpass: a categoria (informada ou
+        deduzida da query) filtra pelas tags; a query filtra o nome, sem
+        diferenciar maiúsculas e acentos, a menos que ela seja a própria
+        categoria.
+        """
+        started = time.perf_counter()
+        south, west, north, east = self.bounding_box(lat, lng, radius)
+
+        if self.has_rtree:
+            sql = '''
+                SELECT p.osm_id, p.name, p.category, p.amenity, p.lat, p.lng,
+                       p.address, p.phone, p.website, p.opening_hours
+                FROM poi_rtree r JOIN poi p ON p.id = r.id
+                WHERE r.min_lat >= ? AND r.max_lat <= ? AND r.min_lng >= ? AND r.max_lng <= ?
+            '''
+        else:
+            sql = '''
+                SELECT p.osm_id, p.name, p.category, p.amenity, p.lat, p.lng,
+                       p.address, p.phone, p.website, p.opening_hours
+                FROM poi p
+                WHERE p.lat >= ? AND p.lat <= ? AND p.lng >= ? AND p.lng <= ?
+            '''
+        params: List[Any] = [south, north, west, east]
+
+        resolved = GeocodingService.resolve_category(query, category)
+        if resolved:
+            sql += ' AND p.category = ?'
+            params.append(resolved)
+        name = GeocodingService.name_filter(query, category)
+        if name:
+            pattern = GeocodingService.normalize_text(name)
+            pattern = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            sql += " AND p.name_normalized LIKE ? ESCAPE '\\'"
+            params.append(f'%{pattern}%')
+
+        conn = self.db.get_connection()
+        rows = conn.execute(sql, params).fetchall()
+        # Distâncias de todos os candidatos da caixa numa única passada
+        distances = GeocodingService.calculate_distances(
+            lat, lng, [row[4] for row in rows], [row[5] for row in rows])
+
+        places = [{**self._row_to_place(row), 'distance': distance}
+                  for row, distance in zip(rows, distances) if distance <= radius]
+
+        places.sort(key=lambda x: x['distance'])
+        self.queries += 1
+        self.total_query_ms += (time.perf_counter() - started) * 1000
+        return places[:limit]
+
+    def get_category(self, category: str) -> List[Dict[str, Any]]:
+        """Todos os POIs de uma categoria (carga dos índices de vizinhos)"""
+        conn = self.db.get_connection()
+        rows = conn.execute('''
+            SELECT osm_id, name, category, amenity, lat, lng,
+                   address, phone, website, opening_hours
+            FROM poi
+            WHERE category = ?
+        ''', (category,)).fetchall()
+        return [self._row_to_place(row) for row in rows]
+
+    @staticmethod
+    def _row_to_place(row: Tuple) -> Dict[str, Any]:
+        """Converte uma linha de POI em lugar"""
+        (osm_id, name, poi_category, amenity, poi_lat, poi_lng,
+         address, phone, website, opening_hours) = row
+        return {
+            'id': f"osm_{osm_id}",
+            'name': name,
+            'amenity': amenity,
+            'category': poi_category,
+            'address': address,
+            'phone': phone,
+            'website': website,
+            'opening_hours': opening_hours,
+            'coordinates': {'lat': poi_lat, 'lon': poi_lng},
+            'source': 'local'
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Regiões, total de POIs e tempo médio das consultas"""
+        regions = self.get_regions()
+        return {
+            'rtree': self.has_rtree,
+            'regions': regions,
+            'total_pois': sum(region['poi_count'] for region in regions),
+            'queries': self.queries,
+            'avg_query_ms': round(self.total_query_ms / self.queries, 3) if self.queries else 0.0
+        }
+
+
+def load_overpass_json(path: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Lê uma resposta do Overpass em JSON; retorna (elementos, osm_base)"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('elements', []), data.get('osm3s', {}).get('timestamp_osm_base')
+
+
+def _osm_tags(element: ET.Element) -> Dict[str, str]:
+    """Tags <tag k= v=> de um elemento OSM XML"""
+    return {tag.get('k'): tag.get('v') for tag in element.findall('tag')}
+
+
+def iter_osm_xml(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê um extrato OSM XML em duas passadas, sem carregar o arquivo inteiro.
+
+    Nós com tags viram elementos 'node'; vias com tags recebem como
+    'center' o centro do retângulo dos seus nós, como no 'out center' do
+    Overpass. Relações são ignoradas (use um extrato JSON do Overpass com
+    'out center' para incluí-las).
+    """
+    # 1ª passada: nós referenciados por vias com tags
+    needed = set()
+    for element in _iter_osm_elements(path):
+        if element.tag == 'way' and element.find('tag') is not None:
+            needed.update(int(nd.get('ref')) for nd in element.findall('nd'))
+
+    # 2ª passada: emitir nós com tags e vias com centro calculado
+    coords: Dict[int, Tuple[float, float]] = {}
+    for element in _iter_osm_elements(path):
+        if element.tag == 'node':
+            node_id = int(element.get('id'))
+            lat, lon = float(element.get('lat')), float(element.get('lon'))
+            if node_id in needed:
+                coords[node_id] = (lat, lon)
+            tags = _osm_tags(element)
+            if tags:
+                yield {'type': 'node', 'id': node_id, 'lat': lat, 'lon': lon, 'tags': tags}
+        elif element.tag == 'way':
+            tags = _osm_tags(element)
+            points = [coords[int(nd.get('ref'))] for nd in element.findall('nd')
+                      if int(nd.get('ref')) in coords]
+            if tags and points:
+                lats = [p[0] for p in points]
+                lons = [p[1] for p in points]
+                yield {
+                    'type': 'way',
+                    'id': int(element.get('id')),
+                    'center': {
+                        'lat': (min(lats) + max(lats)) / 2,
+                        'lon': (min(lons) + max(lons)) / 2
+                    },
+                    'tags': tags
+                }
+
+
+def _iter_osm_elements(path: str) -> Iterator[ET.Element]:
+    """
+    Nós, vias e relações de primeiro nível do OSM XML, um por vez.
+
+    Depois de cada elemento a raiz é limpa: limpar só o elemento deixaria
+    os filhos vazios pendurados na raiz, e a memória cresceria com o
+    tamanho do extrato.
+    """
+    root = None
+    depth = 0
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            if element.tag in ('node', 'way', 'relation'):
+                yield element
+            root.clear()
+
+
+def read_osm_xml_header(path: str) -> Tuple[Optional[BBox], Optional[str]]:
+    """Lê <bounds> e o osm_base de <meta> no início do extrato, se houver"""
+    bbox = None
+    osm_base = None
+    for _, element in ET.iterparse(path, events=('start',)):
+        if element.tag == 'bounds':
+            bbox = tuple(float(element.get(attr))
+                         for attr in ('minlat', 'minlon', 'maxlat', 'maxlon'))
+        elif element.tag == 'meta':
+            osm_base = element.get('osm_base')
+        elif element.tag in ('node', 'way', 'relation'):
+            break
+    return bbox, osm_base
+
+
+def _batches(elements: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa elementos em listas de até size itens"""
+    batch = []
+    for element in elements:
+        batch.append(element)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_file(store: POIStore, path: str, region: str,
+                bbox: Optional[BBox] = None) -> Dict[str, Any]:
+    """
+    Importa um extrato (Overpass JSON ou OSM XML) para a região.
+
+    Sem bbox explícito usa o <bounds> do XML ou, em último caso, o retângulo
+    dos POIs importados. A região passa a ser atendida pela base local.
+    """
+    started = time.perf_counter()
+    if path.endswith('.json'):
+        elements, osm_base = load_overpass_json(path)
+        header_bbox = None
+    else:
+        header_bbox, osm_base = read_osm_xml_header(path)
+        elements = iter_osm_xml(path)
+
+    stored = 0
+    skipped = 0
+    extent = [90.0, 180.0, -90.0, -180.0]
+    for batch in _batches(elements, SearchConfig.POI_IMPORT_BATCH_SIZE):
+        batch_stored, batch_skipped = store.upsert_elements(batch, region)
+        stored += batch_stored
+        skipped += batch_skipped
+        for element in batch:
+            point = element.get('center', element)
+            if 'lat' in point:
+                extent = [min(extent[0], point['lat']), min(extent[1], point['lon']),
+                          max(extent[2], point['lat']), max(extent[3], point['lon'])]
+
+    bbox = bbox or header_bbox or (tuple(extent) if stored else None)
+    if bbox:
+        store.set_region(region, bbox, osm_base)
+
+    return {
+        'region': region,
+        'stored': stored,
+        'skipped': skipped,
+        'bbox': list(bbox) if bbox else None,
+        'osm_base': osm_base,
+        'duration_s': round(time.perf_counter() - started, 2)
+    }
+
+
+async def _run_update(updater: Any, region: Optional[str]) -> Dict[str, Any]:
+    """Executa uma atualização e fecha o cliente HTTP"""
+    from .http_client import close_http_client
+    try:
+        if region:
+            return await updater.refresh_region(region)
+        return await updater.refresh_all()
+    finally:
+        await close_http_client()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Linha de comando do importador"""
+    parser = argparse.ArgumentParser(description="Base local de POIs do RotaLivre")
+    parser.add_argument('--db', default=SearchConfig.POI_STORE_PATH,
+                        help="Arquivo SQLite da base de POIs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser(
+        'import', help="Importa um extrato Overpass JSON ou OSM XML")
+    import_parser.add_argument('path', help="Arquivo .json (Overpass) ou .osm (XML)")
+    import_parser.add_argument('--region', required=True, help="Nome da região (ex.: SP)")
+    import_parser.add_argument('--bbox', help="sul,oeste,norte,leste da região")
+
+    update_parser = subparsers.add_parser(
+        'update', help="Aplica alterações do Overpass desde a última sincronização")
+    update_parser.add_argument('--region', help="Só esta região (padrão: todas)")
+
+    changes_parser = subparsers.add_parser(
+        'apply-changes', help="Aplica um arquivo osmChange (.osc)")
+    changes_parser.add_argument('path', help="Arquivo .osc")
+    changes_parser.add_argument(
+        '--timestamp', help="osm_base do arquivo (ISO 8601; padrão: state.txt da réplica)")
+
+    subparsers.add_parser('stats', help="Mostra regiões e total de POIs")
+
+    args = parser.parse_args(argv)
+    store = POIStore(args.db)
+
+    if args.command == 'import':
+        bbox = tuple(float(v) for v in args.bbox.split(',')) if args.bbox else None
+        result = import_file(store, args.path, args.region, bbox)
+        print(f"✅ {result['stored']} POIs importados para {result['region']} "
+              f"({result['skipped']} elementos ignorados, {result['duration_s']}s)")
+    elif args.command in ('update', 'apply-changes'):
+        # Importado aqui: o atualizador depende deste módulo
+        from .poi_updater import POIUpdater
+        updater = POIUpdater(store)
+        if args.command == 'apply-changes':
+            result = updater.apply_change_file(args.path, args.timestamp)
+        else:
+            result = asyncio.run(_run_update(updater, args.region))
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(store.get_stats(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
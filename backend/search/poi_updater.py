@@ -0,0 +1,319 @@
+"""
+Atualização incremental da base local de POIs
+"""
+import asyncio
+import os
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from .cache import SearchCache
+from .config import SearchConfig
+from .geocoding import GeocodingService
+from .http_client import HTTPClient, get_http_client
+from .nearest import NearestService
+from .poi_store import POIStore, _osm_tags
+
+
+def _watermark(region: Dict[str, Any]) -> str:
+    """
+    Data a partir da qual buscar alterações: o osm_base do extrato ou,
+    sem ele, a última sincronização local (UTC, formato do Overpass)
+    """
+    if region['osm_base']:
+        return region['osm_base']
+    last_sync = datetime.strptime(region['last_sync'], '%Y-%m-%d %H:%M:%S')
+    return last_sync.replace(tzinfo=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def read_replication_state(path: str) -> Optional[str]:
+    """
+    Timestamp do state.txt da réplica ao lado do arquivo osmChange
+    (000/123/456.osc[.gz] -> 000/123/456.state.txt), se existir
+    """
+    base = path
+    for suffix in ('.gz', '.osc'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    state_path = base + '.state.txt'
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('timestamp='):
+                # Formato de properties do Java: ':' vem escapado
+                return line.split('=', 1)[1].strip().replace('\\:', ':')
+    return None
+
+
+def _element_point(element: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Posição de um elemento no formato JSON do Overpass (nó ou centro)"""
+    if element.get('lat') is not None:
+        return element['lat'], element['lon']
+    center = element.get('center')
+    return (center['lat'], center['lon']) if center else None
+
+
+class POIUpdater:
+    """
+    Mantém a base local atualizada sem reimportar regiões inteiras.
+
+    Duas fontes de alterações:
+    - Overpass: elementos com tags de categoria alterados desde a marca
+      da região (filtro changed). Elementos excluídos do OSM não aparecem
+      nessa consulta; só deixam de ser POI os que perderam a tag.
+    - Arquivos osmChange (.osc, como as réplicas minutely/hourly do
+      planet), que trazem criações, alterações e exclusões.
+
+    Com um cache, as entradas cujo círculo contém a posição antiga ou nova
+    de um POI alterado são invalidadas; com um serviço de vizinhos, os
+    índices recebem as alterações.
+    """
+
+    def __init__(
+        self,
+        store: POIStore,
+        client: Optional[HTTPClient] = None,
+        interval: float = SearchConfig.POI_UPDATE_INTERVAL,
+        cache: Optional[SearchCache] = None,
+        nearest: Optional[NearestService] = None
+    ):
+        self.store = store
+        self._client = client
+        self.interval = interval
+        self.cache = cache
+        self.nearest = nearest
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.errors = 0
+        self.invalidated = 0
+        self.last_run_at: Optional[float] = None
+        self.last_result: Dict[str, Any] = {}
+
+    @property
+    def client(self) -> HTTPClient:
+        """Cliente injetado ou o compartilhado do processo"""
+        return self._client if self._client is not None else get_http_client()
+
+    def start(self):
+        """Inicia o laço de atualização no event loop atual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        """Interrompe o laço de atualização"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        """Atualiza todas as regiões a cada intervalo"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro na atualização da base de POIs: {e}")
+
+    async def refresh_all(self) -> Dict[str, Dict[str, Any]]:
+        """Atualiza cada região importada pelo Overpass"""
+        results = {}
+        regions = await asyncio.to_thread(self.store.get_regions)
+        for region in regions:
+            try:
+                results[region['name']] = await self.refresh_region(region['name'])
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro ao atualizar a região {region['name']}: {e}")
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_result = results
+        return results
+
+    @staticmethod
+    def _changed_query(region: Dict[str, Any], since: str) -> str:
+        """Query Overpass dos elementos de categoria alterados desde since"""
+        south, west, north, east = region['bbox']
+        keys = sorted({key for config in SearchConfig.CATEGORIES.values()
+                       for key in config['osm_tags']})
+        selectors = '\n'.join(
+            f'          nwr["{key}"](changed:"{since}");' for key in keys)
+
+        return f"""
+        [out:json][timeout:{SearchConfig.OVERPASS_TIMEOUT}][bbox:{south},{west},{north},{east}];
+        (
+{selectors}
+        );
+        out center;
+        """
+
+    async def refresh_region(self, name: str) -> Dict[str, Any]:
+        """Aplica as alterações do Overpass desde a marca da região"""
+        region = await asyncio.to_thread(self.store.get_region, name)
+        if region is None:
+            raise ValueError(f"Região '{name}' não importada")
+
+        since = _watermark(region)
+        data = await self.client.post_json(
+            SearchConfig.OPENSTREETMAP_URL,
+            data=self._changed_query(region, since),
+            headers={'Content-Type': 'text/plain'}
+        )
+
+        upserted, deleted = await asyncio.to_thread(
+            self._apply, data.get('elements', []), name)
+        osm_base = data.get('osm3s', {}).get('timestamp_osm_base')
+        await asyncio.to_thread(self.store.set_watermark, name, osm_base)
+
+        return {'since': since, 'osm_base': osm_base,
+                'upserted': upserted, 'deleted': deleted}
+
+    def _apply(self, elements: Iterable[Dict[str, Any]],
+               region: Optional[str]) -> Tuple[int, int]:
+        """
+        Grava elementos que são POI e remove os guardados que deixaram de
+        ser; só posições de POIs (novas ou guardadas) invalidam o cache
+        """
+        elements = list(elements)
+        stored = self.store.get_locations(
+            (element['type'], element['id']) for element in elements)
+
+        keep = []
+        kept_places = []
+        drop = []
+        points: Set[Tuple[float, float]] = set()
+        for element in elements:
+            key = (element['type'], element['id'])
+            place = GeocodingService._parse_element(element)
+            if place is not None and place['category']:
+                keep.append(element)
+                kept_places.append(place)
+                point = _element_point(element)
+                if point is not None:
+                    points.add(point)
+            elif key in stored:
+                drop.append(key)
+
+            if key in stored:
+                points.add(stored[key])
+
+        upserted, _ = self.store.upsert_elements(keep, region) if keep else (0, 0)
+        deleted = self.store.delete_elements(drop) if drop else 0
+        self._invalidate(points)
+        if self.nearest is not None:
+            self.nearest.remove_places(f"osm_{osm_id}" for _, osm_id in drop)
+            self.nearest.add_places(kept_places)
+        return upserted, deleted
+
+    def _invalidate(self, points: Iterable[Tuple[float, float]]) -> int:
+        """Invalida as entradas do cache que contêm os pontos alterados"""
+        if self.cache is None:
+            return 0
+        removed = self.cache.invalidate_points(points)
+        self.invalidated += removed
+        return removed
+
+    def apply_change_file(self, path: str, osm_base: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aplica um arquivo osmChange às regiões importadas.
+
+        Vias usam o centro dos nós presentes no arquivo; se nenhum estiver
+        presente, mantêm a posição já guardada. Elementos fora das regiões
+        são ignorados. Só são excluídos (e invalidam o cache) os elementos
+        que existem na base.
+
+        Só a marca das regiões tocadas pelo arquivo avança, até osm_base ou,
+        sem ele, o timestamp do state.txt da réplica. Os timestamps dos
+        elementos não servem: um arquivo não traz as alterações anteriores
+        a ele, e avançar a marca faria a próxima atualização pelo Overpass
+        pular o intervalo. Sem nenhum dos dois, as marcas ficam como estão.
+        """
+        root = ET.parse(path).getroot()
+        coords: Dict[int, Tuple[float, float]] = {}
+        for node in root.iter('node'):
+            if node.get('lat') is not None:
+                coords[int(node.get('id'))] = (float(node.get('lat')), float(node.get('lon')))
+
+        by_region: Dict[str, List[Dict[str, Any]]] = {}
+        candidates: List[Tuple[str, int]] = []
+        skipped = 0
+
+        for action in root:
+            for element in action:
+                if element.tag not in ('node', 'way'):
+                    continue
+                osm_id = int(element.get('id'))
+
+                if action.tag == 'delete':
+                    candidates.append((element.tag, osm_id))
+                    continue
+
+                point = self._change_point(element, osm_id, coords)
+                region = self.store.region_for_point(*point) if point else None
+                if region is None:
+                    # Fora das regiões, mas pode ter saído de uma delas
+                    candidates.append((element.tag, osm_id))
+                    skipped += 1
+                    continue
+
+                converted = {'type': element.tag, 'id': osm_id, 'tags': _osm_tags(element)}
+                if element.tag == 'node':
+                    converted.update(lat=point[0], lon=point[1])
+                else:
+                    converted['center'] = {'lat': point[0], 'lon': point[1]}
+                by_region.setdefault(region, []).append(converted)
+
+        upserted = 0
+        # Uma consulta por lote de ids, não uma por elemento alterado
+        stored = self.store.get_locations(candidates)
+        deletions = [key for key in dict.fromkeys(candidates) if key in stored]
+        touched = set(by_region) | self.store.get_poi_regions(deletions)
+        deleted = self.store.delete_elements(deletions) if deletions else 0
+        self._invalidate(stored[key] for key in deletions)
+        if self.nearest is not None:
+            self.nearest.remove_places(f"osm_{osm_id}" for _, osm_id in deletions)
+        for region, elements in by_region.items():
+            region_upserted, region_deleted = self._apply(elements, region)
+            upserted += region_upserted
+            deleted += region_deleted
+
+        watermark = osm_base or read_replication_state(path)
+        if watermark:
+            for region in sorted(touched):
+                self.store.set_watermark(region, watermark)
+
+        return {'upserted': upserted, 'deleted': deleted, 'skipped': skipped,
+                'osm_base': watermark, 'regions': sorted(touched)}
+
+    def _change_point(self, element: ET.Element, osm_id: int,
+                      coords: Dict[int, Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+        """Posição de um elemento do osmChange"""
+        if element.tag == 'node':
+            return coords.get(osm_id)
+
+        points = [coords[int(nd.get('ref'))] for nd in element.findall('nd')
+                  if int(nd.get('ref')) in coords]
+        if points:
+            lats = [p[0] for p in points]
+            lons = [p[1] for p in points]
+            return ((min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2)
+        return self.store.get_location('way', osm_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas das atualizações"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'interval': self.interval,
+            'runs': self.runs,
+            'errors': self.errors,
+            'invalidated': self.invalidated,
+            'last_run_at': self.last_run_at,
+            'last_result': self.last_result
+        }
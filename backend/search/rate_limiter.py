@@ -2,10 +2,10 @@
 Sistema de rate limiting para controlar uso das APIs
 """
 import time
-import sqlite3
 from typing import Dict, Any
 from collections import defaultdict, deque
 from .config import SearchConfig
+from .database import get_connection_manager
 
 
 class RateLimiter:
@@ -13,26 +13,28 @@ class RateLimiter:
 
     def __init__(self, db_path: str = 'data/moto_weather.db'):
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self.memory_cache = defaultdict(lambda: deque())
         self.init_rate_limit_table()
 
     def init_rate_limit_table(self):
         """Inicializa tabela de rate limiting"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rate_limits (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_id TEXT NOT NULL,
-                endpoint TEXT NOT NULL,
-                request_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX(client_id, endpoint, request_time)
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        conn = self.db.get_connection()
+
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    client_id TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    request_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_rate_client
+                ON rate_limits (client_id, endpoint, request_time)
+            ''')
 
     def is_allowed(
         self,
@@ -62,20 +64,16 @@ class RateLimiter:
                 }
 
         # Verificar banco de dados para janela maior
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = self.db.get_connection()
 
         # Contar requisições na última hora
-        cursor.execute('''
+        hourly_count = conn.execute('''
             SELECT COUNT(*) FROM rate_limits 
             WHERE client_id = ? AND endpoint = ? 
             AND request_time > datetime(?, 'unixepoch')
-        ''', (client_id, endpoint, current_time - 3600))
-
-        hourly_count = cursor.fetchone()[0]
+        ''', (client_id, endpoint, current_time - 3600)).fetchone()[0]
 
         if hourly_count >= SearchConfig.RATE_LIMIT_PER_HOUR:
-            conn.close()
             return {
                 'allowed': False,
                 'retry_after': 3600,  # 1 hora
@@ -84,13 +82,11 @@ class RateLimiter:
             }
 
         # Registrar requisição
-        cursor.execute('''
-            INSERT INTO rate_limits (client_id, endpoint, request_time)
-            VALUES (?, ?, datetime(?, 'unixepoch'))
-        ''', (client_id, endpoint, current_time))
-
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('''
+                INSERT INTO rate_limits (client_id, endpoint, request_time)
+                VALUES (?, ?, datetime(?, 'unixepoch'))
+            ''', (client_id, endpoint, current_time))
 
         # Atualizar cache de memória
         self.memory_cache[cache_key].append(current_time)
@@ -118,35 +114,29 @@ class RateLimiter:
 
     def get_client_stats(self, client_id: str) -> Dict[str, Any]:
         """Retorna estatísticas de um cliente específico"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = self.db.get_connection()
 
         current_time = time.time()
 
         # Requisições na última hora
-        cursor.execute('''
+        hourly_requests = conn.execute('''
             SELECT COUNT(*) FROM rate_limits 
             WHERE client_id = ? AND request_time > datetime(?, 'unixepoch')
-        ''', (client_id, current_time - 3600))
-        hourly_requests = cursor.fetchone()[0]
+        ''', (client_id, current_time - 3600)).fetchone()[0]
 
         # Requisições no último minuto
-        cursor.execute('''
+        minute_requests = conn.execute('''
             SELECT COUNT(*) FROM rate_limits 
             WHERE client_id = ? AND request_time > datetime(?, 'unixepoch')
-        ''', (client_id, current_time - 60))
-        minute_requests = cursor.fetchone()[0]
+        ''', (client_id, current_time - 60)).fetchone()[0]
 
         # Requisições por endpoint
-        cursor.execute('''
+        endpoint_stats = dict(conn.execute('''
             SELECT endpoint, COUNT(*) as count 
             FROM rate_limits 
             WHERE client_id = ? AND request_time > datetime(?, 'unixepoch')
             GROUP BY endpoint
-        ''', (client_id, current_time - 3600))
-        endpoint_stats = dict(cursor.fetchall())
-
-        conn.close()
+        ''', (client_id, current_time - 3600)).fetchall())
 
         return {
             'client_id': client_id,
@@ -161,17 +151,13 @@ class RateLimiter:
 
     def cleanup_old_records(self, hours: int = 24) -> int:
         """Remove registros antigos do banco de dados"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = self.db.get_connection()
 
         cutoff_time = time.time() - (hours * 3600)
-        cursor.execute('''
-            DELETE FROM rate_limits 
-            WHERE request_time < datetime(?, 'unixepoch')
-        ''', (cutoff_time,))
-
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM rate_limits 
+                WHERE request_time < datetime(?, 'unixepoch')
+            ''', (cutoff_time,))
 
-        return deleted_count
+        return cursor.rowcount
@@ -2,15 +2,41 @@
 Motor de busca principal que integra todas as APIs
 """
 import asyncio
+import base64
+import binascii
+import heapq
 import json
-from typing import Dict, List, Optional, Any
-try:
-    import aiohttp
-except ImportError:
-    aiohttp = None
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Any
 from .config import SearchConfig
-from .cache import SearchCache
-from .geocoding import GeocodingService
+from .cache import SearchCache, NEGATIVE_EMPTY, NEGATIVE_ERROR, rank_key
+from .geocoding import AsyncGeocodingService, GeocodingService, TruncatedPlaces
+from .health import ProviderUnavailable, get_health_registry
+from .http_client import get_http_client
+from .merge import PlaceMerger, merge_places
+from .nearest import NearestService
+from .batch import cluster_circles
+from .corridor import RouteCorridor, decode_polyline
+from .poi_store import POIStore
+from .singleflight import SingleFlight
+
+
+def encode_cursor(rs_id: str, offset: int, lat: float, lng: float, radius: float) -> str:
+    """Cursor opaco de paginação: conjunto de resultados, posição e ponto da busca"""
+    payload = json.dumps([rs_id, offset, lat, lng, radius], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decodifica um cursor; ValueError se ele for inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rs_id, offset, lat, lng, radius = json.loads(base64.urlsafe_b64decode(padded))
+        return {'rs_id': str(rs_id), 'offset': int(offset), 'lat': float(lat),
+                'lng': float(lng), 'radius': float(radius)}
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError('Cursor inválido') from e
 
 
 class SearchEngine:
@@ -18,7 +44,18 @@ class SearchEngine:
 
     def __init__(self):
         self.cache = SearchCache()
-        self.geocoding = GeocodingService()
+        self.geocoding = AsyncGeocodingService()
+        self.poi_store = POIStore() if SearchConfig.POI_STORE_ENABLED else None
+        self.nearest = NearestService(self.poi_store)
+        self.health = get_health_registry()
+        self.inflight = SingleFlight()
+        self._background_tasks = set()
+        # Tarefas por provedor das buscas em andamento, por chave de cache
+        self._fanouts: Dict[str, Dict[str, asyncio.Task]] = {}
+        # Id do conjunto de resultados que cada busca em andamento vai gravar
+        self._result_set_ids: Dict[str, str] = {}
+        # Tarefa do single-flight de cada busca em andamento
+        self._fetch_tasks: Dict[str, asyncio.Task] = {}
 
     async def search_places(
         self,
@@ -27,78 +64,717 @@ class SearchEngine:
         lng: float,
         radius: int = 5,
         category: str = '',
-        use_cache: bool = True
+        use_cache: bool = True,
+        budget_ms: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Busca lugares usando múltiplas APIs
+
+        budget_ms limita a espera pelos provedores (padrão
+        SEARCH_LATENCY_BUDGET_MS; 0 espera todos). A resposta indica em
+        'sources' quais provedores entraram, ainda estão pendentes,
+        falharam ou foram pulados por circuito aberto, e 'partial' se algum
+        ficou de fora por atraso. Se houver mais lugares que MAX_RESULTS,
+        'next_cursor' pagina o restante com get_page, sem nova ida às APIs.
         """
+        cache_key = self.cache.get_key(query, lat, lng, radius, category)
+
         # Verificar cache primeiro
         if use_cache:
-            cached_result = self.cache.get(query, lat, lng, radius, category)
-            if cached_result:
-                return {
+            cached = self._cached_response(
+                cache_key, query, lat, lng, radius, category)
+            if cached:
+                return cached
+
+        # Buscas idênticas concorrentes compartilham uma única ida às APIs
+        providers = self._start_fetch(
+            cache_key, query, lat, lng, radius, category)
+        # Lidos já: a busca sai dos registros assim que termina
+        fetch = self._fetch_tasks[cache_key]
+        rs_id = self._result_set_ids.get(cache_key)
+
+        # Esperar só até o fim do orçamento de latência; provedores
+        # atrasados continuam rodando e atualizam o cache ao terminar
+        if budget_ms is None:
+            budget_ms = SearchConfig.SEARCH_LATENCY_BUDGET_MS
+        timeout = budget_ms / 1000 if budget_ms > 0 else None
+        await asyncio.wait(providers.values(), timeout=timeout)
+
+        sources = {'included': [], 'pending': [], 'failed': [], 'skipped': []}
+        results = []
+        for name, task in providers.items():
+            if not task.done():
+                sources['pending'].append(name)
+            elif not task.cancelled() and isinstance(task.exception(), ProviderUnavailable):
+                sources['skipped'].append(name)
+            elif task.cancelled() or task.exception() is not None:
+                sources['failed'].append(name)
+            else:
+                sources['included'].append(name)
+                results.append(task.result())
+
+        all_places = self._merge_results(results)
+        # Primeira página: os k mais próximos por heap, sem ordenar todos
+        combined_results = heapq.nsmallest(
+            SearchConfig.MAX_RESULTS, all_places, key=rank_key)
+        partial = bool(sources['pending'])
+        next_cursor = None
+        if partial and combined_results:
+            # Resposta parcial: TTL curto, substituída quando os atrasados chegarem
+            self.cache.set(query, lat, lng, radius, combined_results, category,
+                           ttl=SearchConfig.PARTIAL_CACHE_TTL, stale_ttl=0,
+                           complete=self._complete(results))
+        elif len(all_places) > SearchConfig.MAX_RESULTS and rs_id:
+            # Todos responderam: a tarefa da busca grava o conjunto completo
+            # com os mesmos resultados; o cursor só sai depois de gravado
+            try:
+                await asyncio.shield(fetch)
+            except Exception:
+                # A falha já é registrada por _on_background_done
+                pass
+            if self.cache.get_result_set_id(query, lat, lng, radius, category) == rs_id:
+                next_cursor = encode_cursor(
+                    rs_id, SearchConfig.MAX_RESULTS, lat, lng, radius)
+
+        # O resultado compartilhado pode ter sido buscado a partir de outro
+        # ponto da mesma célula
+        combined_results = self.cache.localize(
+            combined_results, lat, lng, radius)
+
+        return {
+            'success': True,
+            'data': combined_results,
+            'cached': False,
+            'source': 'api',
+            'partial': partial,
+            'sources': sources,
+            'next_cursor': next_cursor
+        }
+
+    def get_page(self, cursor: str) -> Dict[str, Any]:
+        """
+        Página seguinte de uma busca a partir do conjunto de resultados
+        guardado no cache (sem chamadas externas). ValueError se o cursor
+        for inválido ou o conjunto já tiver expirado.
+        """
+        position = decode_cursor(cursor)
+        record = self.cache.get_result_set(position['rs_id'])
+        if record is None:
+            raise ValueError('Cursor expirado; refaça a busca')
+
+        ranked = self.cache.rank(record['data']['places'], position['lat'],
+                                 position['lng'], position['radius'])
+        offset = max(position['offset'], 0)
+        end = offset + SearchConfig.MAX_RESULTS
+        next_cursor = None
+        if end < len(ranked):
+            next_cursor = encode_cursor(position['rs_id'], end, position['lat'],
+                                        position['lng'], position['radius'])
+
+        return {
+            'success': True,
+            'data': ranked[offset:end],
+            'cached': True,
+            'source': 'result_set',
+            'offset': offset,
+            'total_results': len(ranked),
+            'next_cursor': next_cursor
+        }
+
+    async def search_batch(
+        self,
+        items: List[Dict[str, Any]],
+        use_cache: bool = True,
+        full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Busca lugares para vários pontos de uma vez (ex.: paradas de uma rota)
+
+        Cada item tem query, lat, lng, radius e category. Os acertos de cache
+        saem de uma única leitura do backend; os demais são agrupados por
+        query e categoria, e círculos sobrepostos viram um círculo envolvente
+        (até MAX_RADIUS) buscado uma só vez. O resultado de cada área é
+        filtrado e gravado no cache por item, com o conjunto completo para
+        paginação quando passa de uma página. Retorna um resultado por item,
+        na ordem recebida, no mesmo formato de search_places.
+
+        full=True acrescenta 'places' a cada resultado: todos os lugares no
+        raio, não só a primeira página. Acertos de cache com uma página
+        cheia e sem conjunto completo guardado são buscados de novo.
+        """
+        searches = [
+            (item['query'], item['lat'], item['lng'],
+             item.get('radius') or SearchConfig.DEFAULT_RADIUS, item.get('category') or '')
+            for item in items
+        ]
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(searches)
+        cached = self.cache.lookup_many(searches) if use_cache else [None] * len(searches)
+
+        # Itens sem cache agrupados por query normalizada e categoria
+        groups: Dict[tuple, List[int]] = {}
+        for index, (search, hit) in enumerate(zip(searches, cached)):
+            query, lat, lng, radius, category = search
+            if hit and hit.get('negative'):
+                responses[index] = {
+                    'success': True, 'data': [], 'cached': 'negative',
+                    'negative': hit['negative'], 'source': 'cache'
+                }
+                continue
+
+            complete = None
+            if full and hit and hit['data']:
+                complete = self._cached_places(search, hit['data'])
+            if hit and hit['data'] and (not full or complete is not None):
+                if hit['stale']:
+                    self._schedule_refresh(
+                        self.cache.get_key(*search), query, lat, lng, radius, category)
+                responses[index] = {
+                    'success': True, 'data': hit['data'],
+                    'cached': 'stale' if hit['stale'] else True, 'source': 'cache'
+                }
+                if full:
+                    responses[index]['places'] = complete
+            else:
+                group = (self.cache._normalize_query(query), category)
+                groups.setdefault(group, []).append(index)
+
+        areas = []
+        for indexes in groups.values():
+            circles = [(searches[index][1], searches[index][2], searches[index][3])
+                       for index in indexes]
+            for cluster in cluster_circles(circles):
+                members = [indexes[member] for member in cluster['members']]
+                areas.append((members, cluster))
+
+        fetched = await asyncio.gather(*[
+            self._fetch_area(searches[members[0]][0], cluster['lat'], cluster['lng'],
+                             cluster['radius'], searches[members[0]][4])
+            for members, cluster in areas
+        ], return_exceptions=True)
+
+        for area_index, ((members, cluster), outcome) in enumerate(zip(areas, fetched)):
+            if isinstance(outcome, Exception):
+                places, errors, complete = [], [outcome], True
+            else:
+                places, errors, complete = outcome
+            for index in members:
+                query, lat, lng, radius, category = searches[index]
+                ranked = self.cache.rank(places, lat, lng, radius)
+                data = ranked[:SearchConfig.MAX_RESULTS]
+                next_cursor = None
+                if len(ranked) > SearchConfig.MAX_RESULTS:
+                    rs_id = uuid.uuid4().hex
+                    if self.cache.set_result_set(
+                            rs_id, query, lat, lng, radius,
+                            ranked[:SearchConfig.RESULT_SET_MAX], category):
+                        next_cursor = encode_cursor(
+                            rs_id, SearchConfig.MAX_RESULTS, lat, lng, radius)
+                self._cache_outcome(query, lat, lng, radius, category, data, errors,
+                                    complete)
+                responses[index] = {
+                    'success': True, 'data': data, 'cached': False,
+                    'source': 'api', 'area': area_index, 'next_cursor': next_cursor
+                }
+                if full:
+                    responses[index]['places'] = ranked
+
+        return {
+            'success': True,
+            'results': responses,
+            'stats': {
+                'items': len(searches),
+                'cache_hits': sum(1 for response in responses if response['source'] == 'cache'),
+                'upstream_areas': len(areas)
+            }
+        }
+
+    def _cached_places(self, search: tuple,
+                       data: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Todos os lugares no raio de um acerto de cache: a própria entrada se
+        ela não encheu uma página, senão o conjunto completo guardado (None
+        se já expirou)
+        """
+        if len(data) < SearchConfig.MAX_RESULTS:
+            return data
+        rs_id = self.cache.get_result_set_id(*search)
+        record = self.cache.get_result_set(rs_id) if rs_id else None
+        if record is None:
+            return None
+        _, lat, lng, radius, _ = search
+        return self.cache.rank(record['data']['places'], lat, lng, radius)
+
+    async def search_corridor(
+        self,
+        query: str,
+        polyline: str,
+        buffer_km: float,
+        category: str = '',
+        use_cache: bool = True,
+        precision: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Busca lugares a até buffer_km de uma rota (polilinha codificada)
+
+        O corredor é coberto por círculos ao longo da rota, resolvidos como
+        uma busca em lote (cache numa leitura, áreas sobrepostas juntas, em
+        paralelo). Os candidatos são filtrados pela distância exata até os
+        segmentos e ordenados pela posição ao longo da rota ('route_km');
+        'distance' é a distância até a rota. ValueError se a polilinha for
+        inválida ou a rota longa demais para a largura pedida.
+        """
+        corridor = RouteCorridor(decode_polyline(polyline, precision), buffer_km)
+        tiles = corridor.tiles()
+        if len(tiles) > SearchConfig.CORRIDOR_MAX_TILES:
+            raise ValueError(
+                f'Rota longa demais para um corredor de {buffer_km} km '
+                f'({len(tiles)} áreas, máximo {SearchConfig.CORRIDOR_MAX_TILES})')
+
+        batch = await self.search_batch([
+            {'query': query, 'lat': lat, 'lng': lng, 'radius': radius, 'category': category}
+            for lat, lng, radius in tiles
+        ], use_cache=use_cache, full=True)
+
+        # Todos os lugares de cada círculo, não só a primeira página; círculos
+        # vizinhos se sobrepõem e o mesmo lugar vem de vários
+        places = []
+        seen_ids = set()
+        for result in batch['results']:
+            for place in result.get('places', result['data']):
+                if place.get('id') not in seen_ids:
+                    seen_ids.add(place.get('id'))
+                    places.append(place)
+
+        located = corridor.filter_places(merge_places(places))
+        return {
+            'success': True,
+            'data': located[:SearchConfig.CORRIDOR_MAX_RESULTS],
+            'total_results': len(located),
+            'route_km': round(corridor.length_km, 2),
+            'tiles': len(tiles),
+            'stats': batch['stats']
+        }
+
+    async def _fetch_area(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: float,
+        category: str = ''
+    ) -> tuple:
+        """
+        Busca todos os lugares de uma área de lote (até
+        BATCH_AREA_MAX_PLACES, sem gravar no cache); áreas idênticas
+        concorrentes compartilham a execução. Retorna (lugares, exceções
+        dos provedores, se alguma fonte deu a resposta completa).
+        """
+        async def fetch():
+            providers = self._start_providers(
+                query, lat, lng, radius, category, limit=SearchConfig.BATCH_AREA_MAX_PLACES)
+            results = await asyncio.gather(*providers.values(), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            return self._merge_results(results), errors, self._complete(results)
+
+        area_key = 'area:' + self.cache.get_key(query, lat, lng, radius, category)
+        return await self.inflight.do(area_key, fetch)
+
+    async def stream_places(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int = 5,
+        category: str = '',
+        use_cache: bool = True,
+        budget_ms: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Busca lugares emitindo quadros à medida que os resultados chegam
+
+        Quadros (campo 'type'):
+        - 'cache': resultado do cache (fresco, velho ou negativo)
+        - 'results': lugares de um provedor ainda não enviados, por distância;
+          um lugar já enviado que casou com outro provedor volta fundido,
+          com 'merged_ids' listando os ids que ele substitui
+        - 'error': provedor que falhou ou foi pulado por circuito aberto
+        - 'done': resumo final com total, fontes e tempo decorrido
+
+        Usa o mesmo fan-out de search_places: a busca completa continua
+        gravando no cache mesmo que o cliente desconecte ou o orçamento
+        (budget_ms, mesmo significado de search_places) acabe antes.
+        """
+        started = time.perf_counter()
+        cache_key = self.cache.get_key(query, lat, lng, radius, category)
+
+        if use_cache:
+            cached = self._cached_response(
+                cache_key, query, lat, lng, radius, category)
+            if cached:
+                yield {'type': 'cache', **cached}
+                yield {
+                    'type': 'done',
                     'success': True,
-                    'data': cached_result,
-                    'cached': True,
-                    'source': 'cache'
+                    'total_results': len(cached['data']),
+                    'cached': cached['cached'],
+                    'partial': False,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
                 }
+                return
+
+        providers = self._start_fetch(
+            cache_key, query, lat, lng, radius, category)
+        names = {task: name for name, task in providers.items()}
+
+        if budget_ms is None:
+            budget_ms = SearchConfig.SEARCH_LATENCY_BUDGET_MS
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms > 0 else None
+
+        sources = {'included': [], 'pending': [], 'failed': [], 'skipped': []}
+        seen_ids = set()
+        merger = PlaceMerger()
+        sent_ids = set()
+        pending = set(providers.values())
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for task in done:
+                name = names[task]
+                error = None if task.cancelled() else task.exception()
+                if task.cancelled() or error is not None:
+                    skipped = isinstance(error, ProviderUnavailable)
+                    sources['skipped' if skipped else 'failed'].append(name)
+                    yield {
+                        'type': 'error',
+                        'provider': name,
+                        'skipped': skipped,
+                        'message': str(error) if error else 'cancelada'
+                    }
+                    continue
+
+                # Só o que outro provedor ainda não enviou
+                fresh = []
+                for place in task.result():
+                    place_id = place.get('id', '')
+                    if place_id and place_id not in seen_ids:
+                        seen_ids.add(place_id)
+                        fresh.append(place)
+
+                places = self.cache.localize(merger.add(fresh), lat, lng, radius)
+                sources['included'].append(name)
+                for place in places:
+                    sent_ids.add(place['id'])
+                    sent_ids.difference_update(place.get('merged_ids', []))
+                yield {'type': 'results', 'provider': name, 'data': places}
+
+        sources['pending'] = [names[task] for task in pending]
+        yield {
+            'type': 'done',
+            'success': True,
+            'total_results': len(sent_ids),
+            'cached': False,
+            'partial': bool(pending),
+            'sources': sources,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _cached_response(
+        self,
+        cache_key: str,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = ''
+    ) -> Optional[Dict[str, Any]]:
+        """Resposta servida do cache (positivo ou negativo), se houver"""
+        cached = self.cache.lookup(query, lat, lng, radius, category)
+        if cached is None:
+            return None
+
+        if cached.get('negative'):
+            # Região sem lugares ou APIs falhando há pouco: não repetir a busca
+            return {
+                'success': True,
+                'data': [],
+                'cached': 'negative',
+                'negative': cached['negative'],
+                'source': 'cache'
+            }
+
+        if cached['data']:
+            # Entrada velha: responder já e revalidar em segundo plano
+            if cached['stale']:
+                self._schedule_refresh(
+                    cache_key, query, lat, lng, radius, category)
+
+            # Página cheia: pode haver mais lugares no conjunto da busca
+            next_cursor = None
+            if len(cached['data']) >= SearchConfig.MAX_RESULTS:
+                rs_id = self.cache.get_result_set_id(query, lat, lng, radius, category)
+                if rs_id:
+                    next_cursor = encode_cursor(
+                        rs_id, SearchConfig.MAX_RESULTS, lat, lng, radius)
+            return {
+                'success': True,
+                'data': cached['data'],
+                'cached': 'stale' if cached['stale'] else True,
+                'source': 'cache',
+                'next_cursor': next_cursor
+            }
+        return None
+
+    def _start_fetch(
+        self,
+        cache_key: str,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = ''
+    ) -> Dict[str, asyncio.Task]:
+        """
+        Inicia (ou reaproveita) a busca da chave e retorna as tarefas de
+        cada provedor.
 
-        # Buscar em paralelo usando diferentes APIs
-        tasks = []
+        A tarefa registrada no single-flight aguarda todos os provedores e
+        grava o resultado completo no cache, mesmo que o chamador já tenha
+        respondido com resultados parciais.
+        """
+        def launch():
+            providers = self._start_providers(query, lat, lng, radius, category)
+            self._fanouts[cache_key] = providers
+            rs_id = self._result_set_ids[cache_key] = uuid.uuid4().hex
+            return self._collect_and_cache(
+                providers, query, lat, lng, radius, category, rs_id)
+
+        task = self.inflight.start(cache_key, launch)
+        if task not in self._background_tasks:
+            self._background_tasks.add(task)
+            self._fetch_tasks[cache_key] = task
+            # Registrado depois do callback do single-flight: os dois rodam
+            # em sequência e a chave nunca fica sem provedores em andamento
+            task.add_done_callback(
+                lambda done: (self._fanouts.pop(cache_key, None),
+                              self._result_set_ids.pop(cache_key, None),
+                              self._fetch_tasks.pop(cache_key, None)))
+            task.add_done_callback(self._on_background_done)
+        return self._fanouts[cache_key]
+
+    def _start_providers(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = '',
+        limit: int = SearchConfig.RESULT_SET_MAX
+    ) -> Dict[str, asyncio.Task]:
+        """
+        Dispara as buscas de cada provedor em paralelo
 
-        # Busca usando OpenStreetMap (sempre disponível)
-        tasks.append(self._search_openstreetmap(query, lat, lng, radius))
+        Provedores com circuito aberto viram tarefas que falham na hora com
+        ProviderUnavailable, sem chamada externa. limit é o número de
+        lugares pedido ao OpenStreetMap (base local ou Overpass).
+        """
+        providers = {
+            # OpenStreetMap: base local quando importada, senão Overpass
+            'openstreetmap': asyncio.ensure_future(
+                self._search_osm(query, lat, lng, radius, category, limit=limit))
+        }
 
         # Busca usando SerpAPI se disponível
-        if SearchConfig.SERPAPI_KEY and aiohttp:
-            tasks.append(self._search_serpapi(
-                query, lat, lng, radius, category))
+        if SearchConfig.SERPAPI_KEY:
+            if self.health.is_available('serpapi'):
+                providers['serpapi'] = asyncio.ensure_future(self._search_serpapi(
+                    query, lat, lng, radius, category))
+            else:
+                providers['serpapi'] = asyncio.ensure_future(
+                    self._unavailable('serpapi'))
+
+        return providers
+
+    @staticmethod
+    async def _unavailable(provider: str):
+        """Tarefa de um provedor pulado por circuito aberto"""
+        raise ProviderUnavailable(provider)
+
+    def _schedule_refresh(
+        self,
+        cache_key: str,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = ''
+    ):
+        """Agenda a revalidação de uma entrada velha do cache"""
+        if self.inflight.is_running(cache_key):
+            return
+
+        self._start_fetch(cache_key, query, lat, lng, radius, category)
+
+    def _on_background_done(self, task: asyncio.Task):
+        """Descarta tarefa de segundo plano concluída, registrando falhas"""
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Erro na busca em segundo plano: {task.exception()}")
+
+    async def _collect_and_cache(
+        self,
+        providers: Dict[str, asyncio.Task],
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = '',
+        rs_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aguarda todos os provedores e salva o resultado no cache
 
-        # Executar buscas em paralelo
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        A entrada de cache guarda a primeira página; com mais lugares que
+        isso, o conjunto completo (até RESULT_SET_MAX) fica sob rs_id para
+        as páginas seguintes.
+        """
+        results = await asyncio.gather(
+            *providers.values(), return_exceptions=True)
 
         # Combinar e processar resultados
-        combined_results = self._combine_results(results, lat, lng)
+        all_places = self._merge_results(results)
+        combined_results = heapq.nsmallest(
+            SearchConfig.MAX_RESULTS, all_places, key=rank_key)
+        if rs_id and len(all_places) > SearchConfig.MAX_RESULTS:
+            self.cache.set_result_set(
+                rs_id, query, lat, lng, radius,
+                heapq.nsmallest(SearchConfig.RESULT_SET_MAX, all_places, key=rank_key),
+                category)
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        self._cache_outcome(query, lat, lng, radius, category, combined_results, errors,
+                            self._complete(results))
+        return combined_results
+
+    @staticmethod
+    def _complete(results: List[Any]) -> bool:
+        """Falso se algum provedor devolveu uma resposta truncada"""
+        return not any(isinstance(result, TruncatedPlaces) for result in results)
+
+    def _cache_outcome(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str,
+        combined_results: List[Dict[str, Any]],
+        errors: List[Exception],
+        complete: bool = True
+    ):
+        """
+        Grava no cache o resultado de uma busca concluída, positivo ou negativo
 
-        # Salvar no cache
+        Sem complete (resposta truncada pela fonte), a entrada não serve à
+        busca por contenção.
+        """
         if combined_results:
-            self.cache.set(query, lat, lng, radius, combined_results, category)
+            # Lugares vistos alimentam os índices de vizinhos mais próximos
+            self.nearest.add_places(
+                combined_results, GeocodingService.resolve_category(query, category) or '',
+                ttl=SearchConfig.NEAREST_SEARCH_TTL)
+
+        if combined_results and errors:
+            # Algum provedor falhou ou foi pulado: TTL curto para completar
+            # o resultado assim que ele voltar
+            self.cache.set(query, lat, lng, radius, combined_results, category,
+                           ttl=SearchConfig.PARTIAL_CACHE_TTL, stale_ttl=0,
+                           complete=complete)
+        elif combined_results:
+            self.cache.set(query, lat, lng, radius, combined_results, category,
+                           complete=complete)
+        elif errors and all(isinstance(error, ProviderUnavailable) for error in errors):
+            # Só circuitos abertos: o breaker já evita as chamadas
+            pass
+        elif errors:
+            # Sem resultados porque alguma API falhou: TTL curto
+            self.cache.set_negative(
+                query, lat, lng, radius, category, NEGATIVE_ERROR)
+        else:
+            self.cache.set_negative(
+                query, lat, lng, radius, category, NEGATIVE_EMPTY)
 
-        return {
-            'success': True,
-            'data': combined_results,
-            'cached': False,
-            'source': 'api'
-        }
+    async def _search_osm(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = '',
+        limit: int = SearchConfig.RESULT_SET_MAX
+    ) -> List[Dict[str, Any]]:
+        """Busca na base local de POIs se ela cobre a área; senão no Overpass"""
+        if self.poi_store is not None:
+            try:
+                places = await asyncio.to_thread(
+                    self._search_local, query, lat, lng, radius, category, limit)
+                if places is not None:
+                    return places
+            except Exception as e:
+                print(f"Erro na base local de POIs: {e}")
+
+        if not self.health.is_available('overpass'):
+            raise ProviderUnavailable('overpass')
+        return await self._search_openstreetmap(
+            query, lat, lng, radius, category, limit=max(limit, SearchConfig.OVERPASS_RESULT_LIMIT))
+
+    def _search_local(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius: int,
+        category: str = '',
+        limit: int = SearchConfig.RESULT_SET_MAX
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Consulta a base local; None se nenhuma região importada cobre o raio"""
+        if not self.poi_store.covers(lat, lng, radius):
+            return None
+        # Além da primeira página: alimenta a paginação e as áreas em lote
+        return self.poi_store.search(lat, lng, radius, query, category, limit=limit)
 
     async def _search_openstreetmap(
         self,
         query: str,
         lat: float,
         lng: float,
-        radius: int
+        radius: int,
+        category: str = '',
+        limit: int = SearchConfig.OVERPASS_RESULT_LIMIT
     ) -> List[Dict[str, Any]]:
-        """Busca usando OpenStreetMap Overpass API"""
-        try:
-            places = self.geocoding.search_places_nearby(
-                lat, lng, query, radius)
+        """
+        Busca usando OpenStreetMap Overpass API
 
-            # Adicionar distância e classificar
-            for place in places:
-                place['distance'] = self.geocoding.calculate_distance(
-                    lat, lng,
-                    place['coordinates']['lat'],
-                    place['coordinates']['lon']
-                )
+        Exceções são propagadas para que _collect_and_cache diferencie falha
+        de busca vazia.
+        """
+        places = await self.geocoding.search_places_nearby(
+            lat, lng, query, radius, category, limit)
 
-            # Ordenar por distância
-            places.sort(key=lambda x: x['distance'])
+        # Adicionar distância (uma passada para todos) e classificar
+        distances = self.geocoding.calculate_place_distances(lat, lng, places)
+        for place, distance in zip(places, distances):
+            place['distance'] = distance
 
-            return places
+        # Ordenar por distância
+        places.sort(key=lambda x: x['distance'])
 
-        except Exception as e:
-            print(f"Erro na busca OpenStreetMap: {e}")
-            return []
+        return places
 
     async def _search_serpapi(
         self,
@@ -108,39 +784,30 @@ class SearchEngine:
         radius: int,
         category: str
     ) -> List[Dict[str, Any]]:
-        """Busca usando SerpAPI"""
-        if not aiohttp:
-            print("aiohttp não disponível, pulando SerpAPI")
-            return []
-
-        try:
-            # Determinar query baseada na categoria
-            search_query = query
-            if category and category in SearchConfig.CATEGORIES:
-                category_config = SearchConfig.get_category_config(category)
-                search_query = category_config['keywords'][0]
-
-            url = "https://serpapi.com/search.json"
-            params = {
-                'api_key': SearchConfig.SERPAPI_KEY,
-                'engine': 'google_maps',
-                'q': search_query,
-                'll': f"@{lat},{lng},{radius}km",
-                'type': 'search'
-            }
+        """
+        Busca usando SerpAPI
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=30) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._process_serpapi_results(data, lat, lng)
-                    else:
-                        print(f"SerpAPI error: {response.status}")
-                        return []
+        Erros HTTP e de rede são propagados como exceção (ver
+        _search_openstreetmap).
+        """
+        # Determinar query baseada na categoria
+        search_query = query
+        if category and category in SearchConfig.CATEGORIES:
+            category_config = SearchConfig.get_category_config(category)
+            search_query = category_config['keywords'][0]
+
+        url = SearchConfig.SERPAPI_URL
+        params = {
+            'api_key': SearchConfig.SERPAPI_KEY,
+            'engine': 'google_maps',
+            'q': search_query,
+            'll': f"@{lat},{lng},{radius}km",
+            'type': 'search'
+        }
 
-        except Exception as e:
-            print(f"Erro na busca SerpAPI: {e}")
-            return []
+        # Sessão compartilhada: conexões com serpapi.com ficam abertas
+        data = await get_http_client().get_json(url, params=params, timeout=30)
+        return self._process_serpapi_results(data, lat, lng)
 
     def _process_serpapi_results(
         self,
@@ -174,28 +841,21 @@ class SearchEngine:
                     'source': 'serpapi'
                 }
 
-                # Calcular distância
-                place['distance'] = self.geocoding.calculate_distance(
-                    user_lat, user_lng,
-                    coords.get('latitude', 0),
-                    coords.get('longitude', 0)
-                )
-
                 places.append(place)
 
             except Exception as e:
                 print(f"Erro ao processar resultado SerpAPI: {e}")
                 continue
 
+        # Calcular distâncias numa única passada
+        distances = self.geocoding.calculate_place_distances(user_lat, user_lng, places)
+        for place, distance in zip(places, distances):
+            place['distance'] = distance
+
         return places
 
-    def _combine_results(
-        self,
-        results: List[Any],
-        user_lat: float,
-        user_lng: float
-    ) -> List[Dict[str, Any]]:
-        """Combina resultados de diferentes APIs"""
+    def _merge_results(self, results: List[Any]) -> List[Dict[str, Any]]:
+        """Junta os resultados dos provedores, sem duplicados e sem ordenar"""
         all_places = []
         seen_ids = set()
 
@@ -211,11 +871,8 @@ class SearchEngine:
                         seen_ids.add(place_id)
                         all_places.append(place)
 
-        # Ordenar por distância
-        all_places.sort(key=lambda x: x.get('distance', float('inf')))
-
-        # Limitar resultados
-        return all_places[:SearchConfig.MAX_RESULTS]
+        # O mesmo estabelecimento vindo do OSM e da SerpAPI vira um registro
+        return merge_places(all_places)
 
     async def get_autocomplete_suggestions(
         self,
@@ -224,7 +881,7 @@ class SearchEngine:
     ) -> List[Dict[str, str]]:
         """Obtém sugestões de autocomplete"""
         try:
-            suggestions = self.geocoding.get_place_suggestions(query, limit)
+            suggestions = await self.geocoding.get_place_suggestions(query, limit)
             return suggestions
         except Exception as e:
             print(f"Erro ao obter sugestões: {e}")
@@ -252,9 +909,27 @@ class SearchEngine:
 
         return await self.search_places(query, lat, lng, search_radius, category)
 
-    def get_cache_stats(self) -> Dict[str, Any]:
+    async def nearest_places(
+        self,
+        category: str,
+        lat: float,
+        lng: float,
+        k: int = SearchConfig.NEAREST_DEFAULT_K
+    ) -> Dict[str, Any]:
+        """
+        Os k lugares da categoria mais próximos, a qualquer distância.
+
+        Consulta só o índice em memória (base local e resultados já vistos),
+        sem raio e sem ir às APIs.
+        """
+        return await self.nearest.nearest(category, lat, lng, k)
+
+    def get_cache_stats(self, detailed: bool = False) -> Dict[str, Any]:
         """Retorna estatísticas do cache"""
-        return self.cache.get_stats()
+        return {
+            **self.cache.get_stats(detailed),
+            'inflight': self.inflight.get_stats()
+        }
 
     def clear_cache(self, category: Optional[str] = None) -> int:
         """Limpa cache"""
@@ -20,14 +20,26 @@ def setup_database():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    # Permite que o janitor devolva espaço com incremental_vacuum
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
     # Tabela de cache de busca
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS search_cache (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             cache_key TEXT UNIQUE NOT NULL,
-            data TEXT NOT NULL,
+            data BLOB NOT NULL,
             category TEXT,
             location TEXT,
+            cell_key TEXT,
+            cell_id INTEGER,
+            lat REAL,
+            lng REAL,
+            radius REAL,
+            coverage REAL,
+            fresh_until TIMESTAMP,
+            last_accessed TIMESTAMP,
+            hit_count INTEGER DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             expires_at TIMESTAMP NOT NULL
         )
@@ -48,6 +60,12 @@ def setup_database():
         'CREATE INDEX IF NOT EXISTS idx_cache_key ON search_cache (cache_key)')
     cursor.execute(
         'CREATE INDEX IF NOT EXISTS idx_cache_expires ON search_cache (expires_at)')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_cache_cell ON search_cache (cell_key, radius)')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_cache_cell_id ON search_cache (cell_id)')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_cache_accessed ON search_cache (last_accessed)')
     cursor.execute(
         'CREATE INDEX IF NOT EXISTS idx_rate_client ON rate_limits (client_id, endpoint, request_time)')
 
@@ -0,0 +1,58 @@
+"""
+Coalescência de requisições concorrentes idênticas (single-flight)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Garante no máximo uma execução em andamento por chave"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa func uma única vez por chave; chamadas concorrentes com a
+        mesma chave aguardam o mesmo resultado (ou a mesma exceção).
+        """
+        # shield: o cancelamento de um chamador não cancela a busca compartilhada
+        return await asyncio.shield(self.start(key, func))
+
+    def start(self, key: str, func: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Inicia (ou reaproveita) a execução da chave sem aguardá-la"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """Remove a chamada concluída do registro"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marca a exceção como consumida mesmo se todos os chamadores saíram
+        if not task.cancelled():
+            task.exception()
+
+    def is_running(self, key: str) -> bool:
+        """Indica se já há execução em andamento para a chave"""
+        return key in self._calls
+
+    def in_flight(self) -> int:
+        """Número de chaves com execução em andamento"""
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de coalescência"""
+        return {
+            'in_flight': len(self._calls),
+            'executions': self.executions,
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,366 @@
+"""
+Divisão do espaço em células (geohash) com ids inteiros
+
+Uma célula é um inteiro: os bits do geohash (longitude e latitude
+intercalados) precedidos de um bit sentinela que identifica a precisão.
+Assim o id cabe numa coluna INTEGER, as células de uma mesma célula-mãe
+formam um intervalo contínuo de ids e a conversão para o geohash em texto
+é direta.
+
+Sem dependências do resto do pacote: também é usado pelos scripts.
+"""
+import math
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+MAX_PRECISION = 12  # 60 bits, 30 por eixo
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# Abaixo disso o laço em Python é mais rápido que montar arrays
+_VECTORIZE_MIN_POINTS = 16
+
+# Ponto (lat, lng) e círculo (lat, lng, raio em km)
+Point = Tuple[float, float]
+Circle = Tuple[float, float, float]
+
+
+def _axis_bits(precision: int) -> Tuple[int, int]:
+    """Bits de latitude e de longitude de uma precisão (a longitude vem primeiro)"""
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError(f"Precisão deve estar entre 1 e {MAX_PRECISION}")
+    total = 5 * precision
+    return total // 2, (total + 1) // 2
+
+
+def _spread(value: int) -> int:
+    """Espalha os bits de um inteiro de 32 bits nas posições pares"""
+    value &= 0xFFFFFFFF
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
+def _compact(value: int) -> int:
+    """Inverso de _spread: junta os bits das posições pares"""
+    value &= 0x5555555555555555
+    value = (value | (value >> 1)) & 0x3333333333333333
+    value = (value | (value >> 2)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value >> 4)) & 0x00FF00FF00FF00FF
+    value = (value | (value >> 8)) & 0x0000FFFF0000FFFF
+    value = (value | (value >> 16)) & 0x00000000FFFFFFFF
+    return value
+
+
+def _join(lat_index: int, lng_index: int, precision: int) -> int:
+    """Id da célula a partir dos índices de linha e coluna"""
+    total = 5 * precision
+    if total % 2:
+        # Número ímpar de bits: o último é de longitude
+        bits = _spread(lng_index) | (_spread(lat_index) << 1)
+    else:
+        bits = (_spread(lng_index) << 1) | _spread(lat_index)
+    return (1 << total) | bits
+
+
+def _split(cell: int) -> Tuple[int, int, int]:
+    """Índices de linha e coluna e a precisão de uma célula"""
+    precision = cell_precision(cell)
+    total = 5 * precision
+    bits = cell ^ (1 << total)
+    if total % 2:
+        return _compact(bits >> 1), _compact(bits), precision
+    return _compact(bits), _compact(bits >> 1), precision
+
+
+def _index(value: float, low: float, span: float, bits: int) -> int:
+    """Índice da faixa de tamanho span / 2^bits que contém value"""
+    count = 1 << bits
+    return min(max(int((value - low) / span * count), 0), count - 1)
+
+
+def cell_precision(cell: int) -> int:
+    """Precisão de uma célula (número de caracteres do geohash)"""
+    total = cell.bit_length() - 1
+    if cell <= 0 or total % 5 or not 1 <= total // 5 <= MAX_PRECISION:
+        raise ValueError(f"Célula inválida: {cell}")
+    return total // 5
+
+
+def encode_cell(lat: float, lng: float, precision: int = 7) -> int:
+    """
+    Id da célula que contém as coordenadas.
+
+    Precisão 6 corresponde a células de ~1,2 km x 0,6 km e precisão 7 a
+    ~150 m x 150 m.
+    """
+    lat_bits, lng_bits = _axis_bits(precision)
+    return _join(_index(lat, -90.0, 180.0, lat_bits),
+                 _index(lng, -180.0, 360.0, lng_bits), precision)
+
+
+def encode_cells(lats: Sequence[float], lngs: Sequence[float],
+                 precision: int = 7) -> List[int]:
+    """Ids das células de vários pontos, numa única passada com NumPy"""
+    if np is None or len(lats) < _VECTORIZE_MIN_POINTS:
+        return [encode_cell(lat, lng, precision) for lat, lng in zip(lats, lngs)]
+
+    lat_bits, lng_bits = _axis_bits(precision)
+    lat_index = np.clip(((np.asarray(lats, dtype=np.float64) + 90.0) / 180.0
+                         * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    lng_index = np.clip(((np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0
+                         * (1 << lng_bits)).astype(np.int64), 0, (1 << lng_bits) - 1)
+
+    def spread(values):
+        values = values.astype(np.uint64)
+        for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                            (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333),
+                            (1, 0x5555555555555555)):
+            values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+        return values
+
+    total = 5 * precision
+    if total % 2:
+        bits = spread(lng_index) | (spread(lat_index) << np.uint64(1))
+    else:
+        bits = (spread(lng_index) << np.uint64(1)) | spread(lat_index)
+    return (bits | np.uint64(1 << total)).tolist()
+
+
+def cell_bounds(cell: int) -> Tuple[float, float, float, float]:
+    """Limites (sul, oeste, norte, leste) da célula"""
+    lat_index, lng_index, precision = _split(cell)
+    lat_bits, lng_bits = _axis_bits(precision)
+    lat_step = 180.0 / (1 << lat_bits)
+    lng_step = 360.0 / (1 << lng_bits)
+    south = -90.0 + lat_index * lat_step
+    west = -180.0 + lng_index * lng_step
+    return south, west, south + lat_step, west + lng_step
+
+
+def decode_cell(cell: int) -> Point:
+    """Centro da célula"""
+    south, west, north, east = cell_bounds(cell)
+    return (south + north) / 2, (west + east) / 2
+
+
+def cell_to_geohash(cell: int) -> str:
+    """Geohash em texto da célula"""
+    precision = cell_precision(cell)
+    return ''.join(_BASE32[(cell >> (5 * (precision - 1 - position))) & 0x1f]
+                   for position in range(precision))
+
+
+def geohash_to_cell(geohash: str) -> int:
+    """Id da célula de um geohash em texto"""
+    _axis_bits(len(geohash))
+    cell = 1
+    for char in geohash.lower():
+        if char not in _BASE32_INDEX:
+            raise ValueError(f"Geohash inválido: {geohash}")
+        cell = (cell << 5) | _BASE32_INDEX[char]
+    return cell
+
+
+def encode_geohash(lat: float, lng: float, precision: int = 7) -> str:
+    """Codifica coordenadas em um geohash com a precisão informada"""
+    return cell_to_geohash(encode_cell(lat, lng, precision))
+
+
+def parent_cell(cell: int, precision: int) -> int:
+    """Célula de precisão menor que contém a célula"""
+    current = cell_precision(cell)
+    if precision > current:
+        raise ValueError("A célula-mãe deve ter precisão menor ou igual")
+    return cell >> (5 * (current - precision))
+
+
+def child_range(cell: int, precision: int) -> Tuple[int, int]:
+    """Intervalo fechado dos ids das células de uma precisão maior contidas na célula"""
+    shift = 5 * (precision - cell_precision(cell))
+    if shift < 0:
+        raise ValueError("As células contidas devem ter precisão maior ou igual")
+    return cell << shift, ((cell + 1) << shift) - 1
+
+
+def cell_ranges(cells: Iterable[int], precision: int) -> List[Tuple[int, int]]:
+    """
+    Intervalos de ids, na precisão informada, cobertos pelas células.
+
+    Células vizinhas na curva do geohash viram um único intervalo, o que
+    reduz o número de faixas consultadas num índice (BETWEEN).
+    """
+    ranges: List[Tuple[int, int]] = []
+    for low, high in sorted(child_range(cell, precision) for cell in set(cells)):
+        if ranges and low <= ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], high))
+        else:
+            ranges.append((low, high))
+    return ranges
+
+
+def neighbours(cell: int) -> List[int]:
+    """
+    As até 8 células vizinhas (N, NE, L, SE, S, SO, O, NO).
+
+    A longitude dá a volta no antimeridiano; nos polos não há vizinhos ao
+    norte ou ao sul.
+    """
+    lat_index, lng_index, precision = _split(cell)
+    lat_bits, lng_bits = _axis_bits(precision)
+    rows = 1 << lat_bits
+    columns = 1 << lng_bits
+
+    found: List[int] = []
+    for d_lat, d_lng in ((1, 0), (1, 1), (0, 1), (-1, 1),
+                         (-1, 0), (-1, -1), (0, -1), (1, -1)):
+        row = lat_index + d_lat
+        if not 0 <= row < rows:
+            continue
+        neighbour = _join(row, (lng_index + d_lng) % columns, precision)
+        if neighbour != cell and neighbour not in found:
+            found.append(neighbour)
+    return found
+
+
+def _distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distância Haversine em km, sem arredondar"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _rows_and_columns(south: float, west: float, north: float, east: float,
+                      precision: int) -> Tuple[range, Optional[range]]:
+    """
+    Faixas de linhas e colunas que cobrem o retângulo.
+
+    As colunas não são reduzidas ao intervalo válido: quem usa aplica o
+    módulo para dar a volta no antimeridiano. None indica todas as colunas.
+    """
+    lat_bits, lng_bits = _axis_bits(precision)
+    rows = range(_index(max(south, -90.0), -90.0, 180.0, lat_bits),
+                 _index(min(north, 90.0), -90.0, 180.0, lat_bits) + 1)
+    if east - west >= 360.0:
+        return rows, None
+
+    lng_step = 360.0 / (1 << lng_bits)
+    return rows, range(int(math.floor((west + 180.0) / lng_step)),
+                       int(math.floor((east + 180.0) / lng_step)) + 1)
+
+
+def cover_circle(lat: float, lng: float, radius_km: float,
+                 precision: int = 7) -> Set[int]:
+    """
+    Células que tocam o círculo de raio radius_km.
+
+    Cada célula da caixa envolvente entra se o ponto dela mais próximo do
+    centro está no raio. O número de células cresce com (raio / lado)^2:
+    raios grandes pedem precisões menores.
+    """
+    lat_bits, lng_bits = _axis_bits(precision)
+    lat_step = 180.0 / (1 << lat_bits)
+    lng_step = 360.0 / (1 << lng_bits)
+    columns_count = 1 << lng_bits
+
+    dlat = radius_km / KM_PER_DEGREE
+    south, north = lat - dlat, lat + dlat
+    # A caixa é mais larga na latitude mais afastada do equador
+    widest = max(math.cos(math.radians(min(max(abs(south), abs(north)), 90.0))), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE * widest), 180.0)
+    rows, columns = _rows_and_columns(south, lng - dlng, north, lng + dlng, precision)
+    if columns is None:
+        columns = range(columns_count)
+
+    cells: Set[int] = set()
+    for row in rows:
+        row_south = -90.0 + row * lat_step
+        nearest_lat = min(max(lat, row_south), row_south + lat_step)
+        for column in columns:
+            # Coordenadas sem dar a volta, comparáveis com lng
+            column_west = -180.0 + column * lng_step
+            nearest_lng = min(max(lng, column_west), column_west + lng_step)
+            if _distance(lat, lng, nearest_lat, nearest_lng) <= radius_km:
+                cells.add(_join(row, column % columns_count, precision))
+
+    if not cells:
+        cells.add(encode_cell(lat, lng, precision))
+    return cells
+
+
+def cover_circles(circles: Iterable[Circle], precision: int = 7) -> Set[int]:
+    """União das células que cobrem vários círculos"""
+    cells: Set[int] = set()
+    for lat, lng, radius_km in circles:
+        cells |= cover_circle(lat, lng, radius_km, precision)
+    return cells
+
+
+def cover_polyline(points: Sequence[Point], buffer_km: float,
+                   precision: int = 7) -> Set[int]:
+    """
+    Células que tocam o corredor de buffer_km em torno da polilinha.
+
+    Para cada segmento, as células da caixa envolvente (ampliada pelo
+    buffer) entram se o centro está a até buffer_km mais meia diagonal da
+    célula do segmento: o resultado pode ter algumas células a mais na
+    borda, nunca a menos.
+    """
+    if not points:
+        return set()
+    if len(points) == 1:
+        return cover_circle(points[0][0], points[0][1], buffer_km, precision)
+
+    lat_bits, lng_bits = _axis_bits(precision)
+    lat_step = 180.0 / (1 << lat_bits)
+    lng_step = 360.0 / (1 << lng_bits)
+    columns_count = 1 << lng_bits
+
+    cells: Set[int] = set()
+    for start, end in zip(points, points[1:]):
+        end_lng = end[1]
+        # Segmento que cruza o antimeridiano: longitude contínua
+        if end_lng - start[1] > 180.0:
+            end_lng -= 360.0
+        elif start[1] - end_lng > 180.0:
+            end_lng += 360.0
+
+        dlat = buffer_km / KM_PER_DEGREE
+        south = min(start[0], end[0]) - dlat
+        north = max(start[0], end[0]) + dlat
+        widest = max(math.cos(math.radians(min(max(abs(south), abs(north)), 90.0))), 1e-6)
+        dlng = min(buffer_km / (KM_PER_DEGREE * widest), 180.0)
+        rows, columns = _rows_and_columns(
+            south, min(start[1], end_lng) - dlng, north, max(start[1], end_lng) + dlng,
+            precision)
+        if columns is None:
+            columns = range(columns_count)
+
+        for row in rows:
+            center_lat = -90.0 + (row + 0.5) * lat_step
+            km_per_lng = KM_PER_DEGREE * math.cos(math.radians(center_lat))
+            half_diagonal = math.hypot(lat_step * KM_PER_DEGREE, lng_step * km_per_lng) / 2
+            # Plano local com origem no início do segmento
+            dx = (end_lng - start[1]) * km_per_lng
+            dy = (end[0] - start[0]) * KM_PER_DEGREE
+            length_sq = dx * dx + dy * dy
+            py = (center_lat - start[0]) * KM_PER_DEGREE
+
+            for column in columns:
+                px = (-180.0 + (column + 0.5) * lng_step - start[1]) * km_per_lng
+                t = 0.0 if length_sq == 0 else max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                if math.hypot(px - t * dx, py - t * dy) <= buffer_km + half_diagonal:
+                    cells.add(_join(row, column % columns_count, precision))
+
+    return cells
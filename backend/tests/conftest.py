@@ -0,0 +1,17 @@
+"""Configuração comum dos testes do backend"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def fixture_path():
+    """Caminho de um arquivo em tests/fixtures"""
+    return lambda name: os.path.join(FIXTURES_DIR, name)
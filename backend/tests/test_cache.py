@@ -0,0 +1,113 @@
+"""Testes do reaproveitamento de entradas do cache de busca"""
+import pytest
+
+from search.cache import SearchCache
+from search.cache_backends import MemoryBackend
+from search.config import SearchConfig
+from search.geocoding import GeocodingService, TruncatedPlaces
+
+CENTER = (-23.5620, -46.6560)
+
+
+@pytest.fixture
+def cache():
+    return SearchCache(backend=MemoryBackend())
+
+
+def _places(count, step=0.001):
+    """Lugares em fila ao norte do centro, com a distância vista do centro"""
+    lat, lng = CENTER
+    places = []
+    for i in range(count):
+        coords = {'lat': lat + i * step, 'lon': lng}
+        places.append({
+            'id': f'osm_{i}',
+            'coordinates': coords,
+            'distance': round(GeocodingService.calculate_distance(
+                lat, lng, coords['lat'], coords['lon']), 2)
+        })
+    return places
+
+
+def _same_cell_point(cache):
+    """Outro ponto da célula do centro (mesma chave exata)"""
+    lat, lng = CENTER
+    key = cache.get_key('posto', lat, lng, 5)
+    for dy in range(-9, 10):
+        for dx in range(-9, 10):
+            point = (lat + dy * 0.0001, lng + dx * 0.0001)
+            if point != CENTER and cache.get_key('posto', *point, 5) == key:
+                return point
+    pytest.skip('sem outro ponto na célula')
+
+
+def test_exact_entry_from_center(cache):
+    cache.set('posto', *CENTER, 5, _places(5))
+    assert len(cache.lookup('posto', *CENTER, 5)['data']) == 5
+
+
+def test_exact_entry_needs_coverage(cache):
+    # Entrada completa até 5 km do centro não contém o círculo de 5 km de
+    # outro ponto da célula
+    cache.set('posto', *CENTER, 5, _places(5))
+    assert cache.lookup('posto', *_same_cell_point(cache), 5) is None
+
+
+def test_truncated_entry_serves_own_point(cache):
+    page = _places(SearchConfig.MAX_RESULTS)
+    cache.set('posto', *CENTER, 5, page)
+
+    cached = cache.lookup('posto', *CENTER, 5)
+    assert [place['id'] for place in cached['data']] == [place['id'] for place in page]
+
+
+def test_larger_entry_contains_circle(cache):
+    cache.set('posto', *CENTER, 10, _places(5))
+    point = _same_cell_point(cache)
+
+    cached = cache.lookup('posto', *point, 5)
+    assert len(cached['data']) == 5
+    assert cache.containment_hits == 1
+
+
+def test_source_truncated_entry_not_reused(cache):
+    # Overpass cortado em ordem de quadtile: nenhum raio é garantido
+    cache.set('posto', *CENTER, 10, _places(5), complete=False)
+    point = _same_cell_point(cache)
+
+    assert cache.lookup('posto', *point, 5) is None
+    assert cache.lookup('posto', *point, 10) is None
+    assert cache.containment_hits == 0
+    assert len(cache.lookup('posto', *CENTER, 10)['data']) == 5
+
+
+def test_overpass_limit_marks_truncated():
+    lat, lng = CENTER
+    data = {'elements': [
+        {'type': 'node', 'id': i, 'lat': lat, 'lon': lng, 'tags': {'amenity': 'fuel'}}
+        for i in range(3)
+    ]}
+
+    assert isinstance(GeocodingService._parse_overpass(data, limit=3), TruncatedPlaces)
+    assert not isinstance(GeocodingService._parse_overpass(data, limit=4), TruncatedPlaces)
+    assert not isinstance(GeocodingService._parse_overpass(data), TruncatedPlaces)
+
+
+def test_negative_hit_counted_once(cache):
+    cache.set_negative('posto', *CENTER, 5, 'gasolina')
+
+    assert cache.lookup('posto', *CENTER, 5, 'gasolina') == {'negative': 'empty'}
+    single = cache.metrics.get_stats()
+    assert (single['negative'], single['miss']) == (1, 0)
+
+    [batched] = cache.lookup_many([('posto', *CENTER, 5, 'gasolina')])
+    assert batched == {'negative': 'empty'}
+    assert cache.metrics.get_stats()['negative'] == 2
+    assert cache.metrics.get_stats()['miss'] == 0
+
+
+def test_unknown_categories_share_one_class(cache):
+    for category in ('gasolina', 'x1', 'x2', ''):
+        cache.lookup('posto', *CENTER, 5, category)
+
+    assert set(cache.metrics.get_stats()['by_category']) == {'gasolina', 'other', '_'}
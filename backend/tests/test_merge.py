@@ -0,0 +1,28 @@
+"""Testes da semelhança de nomes usada na fusão de lugares"""
+import pytest
+
+from search.config import SearchConfig
+from search.merge import _normalize_name, name_similarity
+
+
+def _similarity(a, b):
+    return name_similarity(_normalize_name(a), _normalize_name(b))
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Posto Shell', 'Auto Posto Shell Centro'),
+    ('Restaurante Dona Maria', 'Dona Maria Restaurante e Lanchonete'),
+    ('Drogaria São Paulo', 'Drogaria Sao Paulo Ltda'),
+    ("McDonald's", 'Mc Donalds'),
+])
+def test_same_place(a, b):
+    assert _similarity(a, b) >= SearchConfig.MERGE_NAME_SIMILARITY
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Hotel Ibis', 'Hotel Ibis Budget'),
+    ('Posto Shell', 'Posto Ipiranga'),
+    ('Farmácia Pague Menos', 'Drogasil'),
+])
+def test_different_places(a, b):
+    assert _similarity(a, b) < SearchConfig.MERGE_NAME_SIMILARITY
@@ -0,0 +1,107 @@
+"""Testes da base local de POIs: importação, regiões e busca"""
+import pytest
+
+from search.poi_store import POIStore, import_file, iter_osm_xml
+
+
+# Av. Paulista, dentro do extrato de SP
+PAULISTA = (-23.5620, -46.6560)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return POIStore(str(tmp_path / 'poi.db'))
+
+
+@pytest.fixture
+def sp_store(store, fixture_path):
+    import_file(store, fixture_path('overpass_sp.json'), 'SP')
+    return store
+
+
+def test_import_overpass_json(store, fixture_path):
+    result = import_file(store, fixture_path('overpass_sp.json'), 'SP')
+
+    assert result['stored'] == 5
+    assert result['skipped'] == 2
+    assert result['osm_base'] == '2024-05-01T12:00:00Z'
+    # Sem <bounds>: retângulo dos elementos importados
+    assert result['bbox'] == [-23.5650, -46.6600, -23.5590, -46.6520]
+
+
+def test_import_osm_xml(store, fixture_path):
+    result = import_file(store, fixture_path('osm_df.osm'), 'DF')
+
+    # Posto, farmácia e a via do hotel; o semáforo não tem categoria e a
+    # relação é ignorada
+    assert result['stored'] == 3
+    assert result['skipped'] == 1
+    assert result['osm_base'] == '2024-05-02T08:30:00Z'
+    assert result['bbox'] == [-15.85, -47.95, -15.75, -47.85]
+
+    hotel = store.search(-15.80, -47.90, 2, category='hospedagem')
+    assert [place['name'] for place in hotel] == ['Hotel Nacional']
+    # Centro do retângulo dos nós da via
+    assert hotel[0]['coordinates'] == pytest.approx({'lat': -15.801, 'lon': -47.898})
+
+
+def test_iter_osm_xml_elements(fixture_path):
+    elements = list(iter_osm_xml(fixture_path('osm_df.osm')))
+
+    assert [(element['type'], element['id']) for element in elements] == [
+        ('node', 3001), ('node', 3004), ('node', 3005), ('way', 4001)]
+    assert elements[0]['tags'] == {'amenity': 'fuel', 'name': 'Posto BR Eixo Monumental'}
+
+
+def test_region_bookkeeping(sp_store, store, fixture_path):
+    import_file(store, fixture_path('osm_df.osm'), 'DF')
+
+    regions = {region['name']: region for region in store.get_regions()}
+    assert set(regions) == {'DF', 'SP'}
+    assert regions['SP']['poi_count'] == 5
+    assert regions['DF']['poi_count'] == 3
+    assert regions['DF']['osm_base'] == '2024-05-02T08:30:00Z'
+
+    assert store.region_for_point(*PAULISTA) == 'SP'
+    assert store.region_for_point(-15.80, -47.90) == 'DF'
+    assert store.region_for_point(-22.90, -43.20) is None
+
+    assert store.covers(-15.80, -47.90, 1)
+    assert not store.covers(-15.80, -47.90, 20)
+
+    # Marca mais antiga não volta a sincronização
+    store.set_watermark('DF', '2024-01-01T00:00:00Z')
+    assert store.get_region('DF')['osm_base'] == '2024-05-02T08:30:00Z'
+    store.set_watermark('DF', '2024-06-01T00:00:00Z')
+    assert store.get_region('DF')['osm_base'] == '2024-06-01T00:00:00Z'
+
+
+def test_search_by_category(sp_store):
+    places = sp_store.search(*PAULISTA, 2, query='posto de gasolina')
+
+    assert [place['name'] for place in places] == [
+        'Posto Shell Paulista', 'Posto Ipiranga Consolação']
+    assert places[0]['distance'] <= places[1]['distance']
+    assert all(place['category'] == 'gasolina' for place in places)
+
+    same = sp_store.search(*PAULISTA, 2, category='gasolina')
+    assert [place['id'] for place in same] == [place['id'] for place in places]
+
+
+def test_search_by_name(sp_store):
+    # Sem categoria: nome sem diferenciar maiúsculas e acentos
+    names = {place['name'] for place in sp_store.search(*PAULISTA, 2, query='shell')}
+    assert names == {'Posto Shell Paulista', 'Lanchonete Shell'}
+
+    assert [place['name'] for place in sp_store.search(*PAULISTA, 2, query='sao joao')] == [
+        'Padaria São João']
+
+
+def test_search_by_name_within_category(sp_store):
+    places = sp_store.search(*PAULISTA, 2, query='Shell', category='gasolina')
+    assert [place['name'] for place in places] == ['Posto Shell Paulista']
+
+
+def test_search_radius_and_limit(sp_store):
+    assert sp_store.search(*PAULISTA, 0.05, category='hospedagem') == []
+    assert len(sp_store.search(*PAULISTA, 2, limit=2)) == 2
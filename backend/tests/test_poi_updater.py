@@ -0,0 +1,115 @@
+"""Testes do atualizador da base local de POIs"""
+import pytest
+
+from search.poi_store import POIStore, import_file
+from search.poi_updater import POIUpdater
+
+
+OSC = """<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6">
+  <modify>
+    <node id="1001" lat="-23.5612" lon="-46.6561" timestamp="2024-05-03T10:00:00Z">
+      <tag k="amenity" v="fuel"/>
+      <tag k="name" v="Posto Shell Paulista 24h"/>
+    </node>
+    <node id="1004" lat="-23.5590" lon="-46.6600" timestamp="2024-05-03T10:01:00Z">
+      <tag k="name" v="Padaria São João"/>
+    </node>
+    <node id="9001" lat="-23.5600" lon="-46.6590" timestamp="2024-05-03T10:02:00Z"/>
+    <node id="9002" lat="-22.9000" lon="-43.2000" timestamp="2024-05-03T10:03:00Z"/>
+  </modify>
+  <delete>
+    <node id="1002" lat="-23.5650" lon="-46.6520" timestamp="2024-05-03T10:04:00Z"/>
+    <node id="9003" lat="-23.5650" lon="-46.6520" timestamp="2024-05-03T10:05:00Z"/>
+  </delete>
+</osmChange>
+"""
+
+
+class RecordingCache:
+    """Guarda os pontos enviados para invalidação"""
+
+    def __init__(self):
+        self.points = []
+
+    def invalidate_points(self, points):
+        points = list(points)
+        self.points.extend(points)
+        return len(points)
+
+
+@pytest.fixture
+def store(tmp_path, fixture_path):
+    store = POIStore(str(tmp_path / 'poi.db'))
+    import_file(store, fixture_path('overpass_sp.json'), 'SP')
+    import_file(store, fixture_path('osm_df.osm'), 'DF')
+    return store
+
+
+def _write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def test_apply_change_file(store, tmp_path):
+    cache = RecordingCache()
+
+    result = POIUpdater(store, cache=cache).apply_change_file(
+        _write(tmp_path, 'changes.osc', OSC), '2024-05-03T10:06:00Z')
+
+    # Posto alterado; padaria perdeu a tag e saiu; 1002 excluído. Nós sem
+    # tags (9001, 9003) e fora das regiões (9002) não tocam a base
+    assert result['upserted'] == 1
+    assert result['deleted'] == 2
+    assert result['skipped'] == 1
+
+    assert store.get_location('node', 1002) is None
+    assert store.get_location('node', 1004) is None
+    assert store.get_location('node', 1001) == (-23.5612, -46.6561)
+
+    # Só posições de POIs, antigas e novas, invalidam o cache
+    assert set(cache.points) == {
+        (-23.5650, -46.6520), (-23.5590, -46.6600),
+        (-23.5610, -46.6560), (-23.5612, -46.6561)}
+
+
+def test_change_file_advances_only_touched_regions(store, tmp_path):
+    path = _write(tmp_path, '456.osc', OSC)
+    _write(tmp_path, '456.state.txt',
+           '#Fri May 03 10:06:02 UTC 2024\n'
+           'sequenceNumber=456\n'
+           'timestamp=2024-05-03T10\\:06\\:02Z\n')
+
+    result = POIUpdater(store).apply_change_file(path)
+
+    assert result['regions'] == ['SP']
+    assert result['osm_base'] == '2024-05-03T10:06:02Z'
+    assert store.get_region('SP')['osm_base'] == '2024-05-03T10:06:02Z'
+    # DF não foi tocada: a próxima atualização pelo Overpass parte da marca dela
+    assert store.get_region('DF')['osm_base'] == '2024-05-02T08:30:00Z'
+
+
+def test_change_file_deletion_touches_its_region(store, tmp_path):
+    osc = """<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6">
+  <delete>
+    <node id="3004" lat="-15.8010" lon="-47.8950" timestamp="2024-05-03T11:00:00Z"/>
+  </delete>
+</osmChange>
+"""
+    result = POIUpdater(store).apply_change_file(
+        _write(tmp_path, 'df.osc', osc), '2024-05-03T11:00:00Z')
+
+    assert result['deleted'] == 1
+    assert result['regions'] == ['DF']
+    assert store.get_region('DF')['osm_base'] == '2024-05-03T11:00:00Z'
+    assert store.get_region('SP')['osm_base'] == '2024-05-01T12:00:00Z'
+
+
+def test_change_file_without_timestamp_keeps_watermarks(store, tmp_path):
+    result = POIUpdater(store).apply_change_file(_write(tmp_path, 'changes.osc', OSC))
+
+    assert result['osm_base'] is None
+    assert store.get_region('SP')['osm_base'] == '2024-05-01T12:00:00Z'
+    assert store.get_region('DF')['osm_base'] == '2024-05-02T08:30:00Z'
@@ -0,0 +1,175 @@
+"""Testes do backend Redis do cache de busca (fakeredis em processo)"""
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from search.cache import SearchCache
+from search.cache_backends import MemoryCache, RedisBackend
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def backend(client):
+    return RedisBackend(client=client, prefix='test:')
+
+
+@pytest.fixture
+def cache(backend):
+    return SearchCache(memory_cache=MemoryCache(max_size=0), backend=backend)
+
+
+def _record(cache, query='posto', lat=-23.5620, lng=-46.6560, radius=5,
+            category='gasolina', ttl=60):
+    data = [{'id': f'osm_{i}', 'name': f'Posto {i}',
+             'coordinates': {'lat': lat, 'lon': lng}} for i in range(3)]
+    return cache._build_record(query, lat, lng, radius, data, category, ttl, 0)
+
+
+def test_set_and_get(backend, cache):
+    record = _record(cache)
+    assert backend.set(record)
+
+    stored = backend.get(record['key'])
+    assert stored['data'] == record['data']
+    assert stored['category'] == 'gasolina'
+    assert stored['cell_id'] == record['cell_id']
+    assert backend.get('inexistente') is None
+
+    assert backend.get_many([record['key'], 'inexistente']).keys() == {record['key']}
+
+
+def test_expire(backend, cache, client):
+    record = _record(cache, ttl=60)
+    assert backend.set(record)
+    assert 0 < client.ttl(f"test:entry:{record['key']}") <= 60
+
+    # Registro já vencido não é gravado
+    expired = {**_record(cache, query='hotel'), 'expires_at': time.time() - 1}
+    assert not backend.set(expired)
+    assert backend.get(expired['key']) is None
+
+
+def test_count_entries_ignores_indexes(backend, cache, client):
+    backend.set(_record(cache))
+    backend.set(_record(cache, query='hotel', category='hospedagem'))
+
+    # Entradas, sets de célula e categoria e o índice global de células
+    assert client.dbsize() > 2
+    assert backend.count_entries() == 2
+
+    # Chaves de outro prefixo no mesmo banco não contam
+    client.set('outro:entry:x', 1)
+    assert backend.count_entries() == 2
+
+
+def test_delete_removes_index_members(backend, cache, client):
+    record = _record(cache)
+    other = _record(cache, query='shell')
+    backend.set(record)
+    backend.set(other)
+
+    assert backend.delete(record['key'])
+    assert not backend.delete(record['key'])
+
+    key = record['key'].encode()
+    assert backend.get(record['key']) is None
+    assert client.zscore(f"test:cell:{record['cell_key']}", key) is None
+    assert not client.sismember('test:category:gasolina', key)
+    assert client.zscore('test:cells', key) is None
+
+    # A outra entrada e seus índices continuam
+    assert client.sismember('test:category:gasolina', other['key'].encode())
+    assert client.zscore('test:cells', other['key'].encode()) is not None
+    assert backend.count_entries() == 1
+
+
+def test_delete_many_and_clear_category(backend, cache, client):
+    records = [_record(cache, query=f'posto {i}') for i in range(3)]
+    hotel = _record(cache, query='hotel', category='hospedagem')
+    backend.set_many(records + [hotel])
+
+    assert backend.delete_many([records[0]['key'], 'inexistente']) == 1
+    assert client.zscore('test:cells', records[0]['key'].encode()) is None
+
+    assert backend.clear_category('gasolina') == 2
+    assert not client.exists('test:category:gasolina')
+    assert client.zcard('test:cells') == 1
+    assert backend.count_entries() == 1
+
+
+def test_find_containing_and_cells(backend, cache):
+    record = _record(cache, radius=10)
+    backend.set(record)
+
+    assert [found['key'] for found in backend.find_containing(record['cell_key'], 5)] == [
+        record['key']]
+    assert backend.find_containing(record['cell_key'], 20) == []
+
+    cell_id = record['cell_id']
+    assert [found['key'] for found in backend.find_in_cells([(cell_id, cell_id)])] == [
+        record['key']]
+
+
+def test_search_cache_roundtrip(cache, backend):
+    places = [{'id': 'osm_1', 'name': 'Posto Shell',
+               'coordinates': {'lat': -23.5620, 'lon': -46.6560}}]
+    assert cache.set('posto', -23.5620, -46.6560, 5, places, 'gasolina')
+
+    cached = cache.lookup('posto', -23.5620, -46.6560, 5, 'gasolina')
+    assert [place['id'] for place in cached['data']] == ['osm_1']
+    assert cache.count_entries() == backend.count_entries() == 1
+
+
+def test_short_entry_keeps_index_ttl(backend, cache, client):
+    long_entry = _record(cache, ttl=90000)
+    backend.set(long_entry)
+    # Entrada curta na mesma célula e categoria
+    cache.set('posto', -23.5620, -46.6560, 3, [], 'gasolina', ttl=60, stale_ttl=0)
+    cache.set_negative('posto', -23.5620, -46.6560, 7, 'gasolina', ttl=60)
+
+    assert client.ttl('test:category:gasolina') > 89000
+    assert client.ttl(f"test:cell:{long_entry['cell_key']}") > 89000
+
+    # Uma entrada mais longa ainda estende o índice
+    backend.set(_record(cache, query='shell', ttl=100000))
+    assert client.ttl('test:category:gasolina') > 99000
+
+
+def test_purge_expired_prunes_global_index(backend, cache, client):
+    expired = _record(cache, query='hotel', category='hospedagem')
+    live = _record(cache)
+    backend.set_many([expired, live])
+
+    # Simula a expiração nativa do hash
+    client.delete(f"test:entry:{expired['key']}")
+    client.zadd('test:expiry', {expired['key']: time.time() - 1})
+
+    assert backend.purge_expired(100) == 1
+    assert client.zrange('test:cells', 0, -1) == [live['key'].encode()]
+    assert client.zrange('test:expiry', 0, -1) == [live['key'].encode()]
+    assert backend.purge_expired(100) == 0
+
+    backend.delete(live['key'])
+    assert client.zcard('test:cells') == 0
+    assert client.zcard('test:expiry') == 0
+
+
+def test_stats_scan_only_when_detailed(backend, cache, client, monkeypatch):
+    backend.set(_record(cache))
+    scans = []
+    original = client.scan_iter
+    monkeypatch.setattr(client, 'scan_iter', lambda *a, **k: scans.append(1) or original(*a, **k))
+
+    stats = backend.get_stats()
+    assert 'total_keys' not in stats
+    assert stats['writes'] == 1
+    assert scans == []
+
+    assert backend.get_stats(detailed=True)['total_keys'] == 1
+    assert scans == [1]